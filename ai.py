@@ -1,92 +1,269 @@
-import os
-import json
-from quoridor_board import QuoridorBoard
+from quoridor_board import UNREACHABLE
+from transposition import TranspositionTable
+from fence_kernel import HAS_NUMPY, batch_fence_distances
+from opening_book import OpeningBook
+from endgame import RaceSolver, WIN, LOSS
+import telemetry
+from telemetry import logger
 import heapq
+import multiprocessing
+import random
+import time
 
-class AI:
-    """Class that handles AI decision-making in Quoridor."""
+WIN_SCORE = 10000  # Score of a reached goal row, plus the remaining depth to prefer quick wins
+CHECK_INTERVAL = 256  # Nodes searched between two budget checks
+RACE_SOLVE_SHARE = 0.5  # Share of the time limit a race table may take to solve before searching instead
 
-    def __init__(self, board):
-        """Initialize the AI agent and load the game state."""
-        self.board = board  # Create an instance of the game board
-        self.game_state = {}
-        self.game_state = self.read_game_state()  # Ensure game state is loaded or initialized
-        self.fences_player2 = 10  # Counter for fences placed by player 2
-
-    def read_game_state(self):
-        """Reads the latest game state from the JSON file or initializes a new one if the file does not exist."""
-        try:
-            with open("game_state.json", "r") as file:
-                return json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            print("Error reading game_state.json. Recreating the game state...")
-            return self.game_state
 
-    def get_valid_moves(self, player):
-        """Returns a list of valid moves for the given player based on the current game state."""
-        if not self.game_state:
-            return []
+class SearchAborted(Exception):
+    """Raised inside the search when the time or node budget runs out or a stop is requested."""
 
-        player_position = self.game_state["player_positions"].get(f"player{player}", None)
-        if not player_position:
-            return []
 
-        x, y = player_position
-        possible_moves = [
-            (x, y - 1),  # Up
-            (x, y + 1),  # Down
-            (x - 1, y),  # Left
-            (x + 1, y)   # Right
-        ]
+def relative_score(score, bound, maximizing_player):
+    """
+    Converts a score and bound between the AI's point of view and the point of
+    view of the side to move, which is how the transposition table stores them.
+    The conversion is its own inverse.
+    """
+    if maximizing_player:
+        return score, bound
+    if bound == TranspositionTable.LOWER:
+        bound = TranspositionTable.UPPER
+    elif bound == TranspositionTable.UPPER:
+        bound = TranspositionTable.LOWER
+    return -score, bound
 
-        valid_moves = []
-        for nx, ny in possible_moves:
-            if 0 <= nx < 9 and 0 <= ny < 9:  # Ensure the move is inside the board
-                if not self.board.is_fence_blocking(x, y, nx, ny):
-                    valid_moves.append((nx, ny))
 
-        return valid_moves
+class AI:
+    """Class that handles AI decision-making in Quoridor."""
 
+    def __init__(self, board, tt_megabytes=16, time_limit=1.0, node_limit=None, max_depth=64,
+                 fence_pruning="path", fence_radius=1, fence_ordering=False, workers=1, tt=None,
+                 telemetry_log=None, book=None, endgame=True):
+        """
+        Initialize the AI agent and load the game state.
+
+        Args:
+            board (QuoridorBoard): The board the AI plays and simulates moves on.
+            tt_megabytes (float): Memory cap of the transposition table.
+            time_limit (float): Seconds the search may run per move (None for no limit).
+            node_limit (int): Nodes the search may visit per move (None for no limit).
+            max_depth (int): Deepest iteration of the iterative deepening search.
+            fence_pruning (str): Fences searched at each node: "path" (fences blocking
+                either player's shortest path or next to a pawn), "all" (every free
+                fence slot) or "none" (pawn moves only).
+            fence_radius (int): With "path" pruning, fences within this many cells of
+                a pawn are searched too.
+            fence_ordering (bool): Score the fence candidates at the root and at nodes
+                at least three plies from the horizon with the batched NumPy kernel (see
+                fence_kernel), search them best first and skip the ones that cut
+                off a player. Ignored when NumPy is not installed.
+            workers (int): Number of search processes. Above 1, choose_move runs a
+                Lazy SMP search (see parallel_search) sharing one transposition table;
+                close() stops the processes. Not allowed in a daemonic process (a
+                worker of the arena or analyzer pools), which cannot start children.
+            tt (TranspositionTable, optional): Table to use instead of allocating
+                a private one of tt_megabytes.
+            telemetry_log (TelemetryLog, optional): Log that receives one record per
+                move played by make_move (see telemetry_record).
+            book (OpeningBook or str, optional): Opening book (or its path)
+                consulted by make_move before searching.
+            endgame (bool): Solve race endgames (no fences left on either side)
+                exactly with RaceSolver: choose_move plays the solved move without
+                searching, and the search scores race nodes whose pawns can no longer
+                meet as terminal (see RaceSolver.separated_result).
+        """
+        if workers > 1 and multiprocessing.current_process().daemon:
+            raise ValueError("A search with workers > 1 cannot run in a daemonic (pool worker) process")
+        self.board = board  # Create an instance of the game board
+        self.tt_megabytes = tt_megabytes
+        self.tt = tt if tt is not None else TranspositionTable(int(tt_megabytes * 1024 * 1024))
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.max_depth = max_depth
+        self.fence_pruning = fence_pruning
+        self.fence_radius = fence_radius
+        self.fence_ordering = fence_ordering and HAS_NUMPY
+        self.workers = workers
+        self.parallel = None  # LazySMPSearch, started on first use
+        self.radius_fences = {}  # Cell index -> fence slots within fence_radius of it
+        self.free_fence_counts = {}  # Fence mask -> number of free fence slots
+        self.stop_event = None
+        self.deadline = None
+        self.search_node_limit = None
+        self.search_stop_event = None
+        self.nodes = 0
+        self.next_check = CHECK_INTERVAL
+        self.interior_nodes = 0
+        self.children = 0
+        self.full_children = 0
+        self.leaves = 0
+        self.race_exits = 0  # Race nodes scored exactly by RaceSolver.separated_result
+        self.path_searches = 0
+        self.kernel_batches = 0
+        self.telemetry_log = telemetry_log
+        self.book = OpeningBook(book) if isinstance(book, str) else book
+        self.search_times = []  # Seconds of the searches made after a book miss
+        self.endgame = RaceSolver() if endgame else None
+        self.pondered = None  # (hash, action, value, depth, seconds) promoted by pondering.Ponderer
+        self.last_search = {}
+
+    def close(self):
+        """Stops the Lazy SMP worker processes, if started, and frees their shared table."""
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def game_state(self):
+        """Snapshot of the board's current position (see QuoridorBoard.state)."""
+        return self.board.state
 
+    def get_valid_moves(self, player):
+        """Returns the positions the player's pawn can move to, jumps included (see QuoridorBoard.pawn_targets)."""
+        positions = self.board.tables.cell_positions
+        return [positions[cell] for cell in self.board.pawn_targets(player)]
 
     def get_valid_fences(self,player):
-        """Returns a list of valid fences the AI can place."""
-        valid_fences = []
-
-        # Assume that self.game_state is already defined and contains the "walls" key.
-        walls = self.game_state.get("walls", [])  # Get the list of walls from game state (default empty list)
-
-        # Convert walls from lists to tuples for proper comparison
-        walls_set = {tuple(wall) for wall in walls}  # Convert walls to a set of tuples for efficient comparison
-
-        valid_fences = []  # List to store valid fences
-
-        # Iterate through the possible fence locations and orientations
-        for x in range(8):  # From 0 to 7 because a fence is placed between two squares
-            for y in range(8):
-                for orientation in ["H", "V"]:  # Horizontal or Vertical fence
-                    if orientation == "H":
-                        # Check if the horizontal fence at (x, y) is valid (not blocked by a wall)
-                        if (x, y, orientation) not in walls_set and (x + 1, y, orientation) not in walls_set and (x - 1, y, orientation) not in walls_set and (x,y,'V') not in walls_set:
-                            valid_fences.append((x, y, orientation))  # Add valid horizontal fence
-                    if orientation == "V":
-                        # Check if the vertical fence at (x, y) is valid (not blocked by a wall)
-                        if (x, y, orientation) not in walls_set and (x, y + 1, orientation) not in walls_set and (x, y - 1, orientation) not in walls_set and (x,y,'H') not in walls_set:
-                            valid_fences.append((x, y, orientation))  # Add valid vertical fence
-        return valid_fences
+        """Returns the legal fences the AI can place: free of overlaps and cutting off no player."""
+        tables = self.board.tables
+        return [tables.slot_to_fence(slot) for slot in self.board.legal_fence_slots()]
+
+    def path_length(self, player):
+        """Returns the shortest path length to the goal row, read from the board's distance grid."""
+        distance = self.board.distance_to_goal(player)
+        return distance if distance < UNREACHABLE else float('inf')
+
+    def get_fence_candidates(self, player):
+        """
+        Returns the fence slots worth searching for the player, following fence_pruning.
+        With "all" every legal fence is returned (see QuoridorBoard.is_fence_legal);
+        otherwise only overlap is checked here, and fences that cut off a player
+        are rejected later by QuoridorBoard.make_fence.
+        """
+        board = self.board
+        if self.fence_pruning == "none" or board.fences_left[player] <= 0:
+            return []
+
+        tables = board.tables
+        if self.fence_pruning == "all":
+            slots = board.legal_fence_slots()
+        else:
+            slots = set()
+            for pawn in (1, 2):
+                # Fences blocking an edge of the pawn's current shortest path
+                path = board.path_to_goal(pawn)
+                self.path_searches += 1
+                for cell, next_cell in zip(path, path[1:]):
+                    for bit, neighbour in tables.neighbours[cell]:
+                        if neighbour == next_cell:
+                            slots.update(tables.edge_fences[cell][bit])
+                            break
+
+                # Fences in the neighbourhood of the pawn
+                slots.update(self.get_radius_fences(board.pawn_cells[pawn]))
+
+        mask = board.fence_mask
+        conflicts = tables.fence_conflicts
+        return [slot for slot in sorted(slots) if not mask & conflicts[slot]]
+
+    def get_radius_fences(self, cell):
+        """Returns (and caches) the fence slots along the sides of the cells within fence_radius of a cell."""
+        if cell not in self.radius_fences:
+            size = self.board.size
+            x, y = cell % size, cell // size
+            slots = set()
+            for ny in range(max(0, y - self.fence_radius), min(size, y + self.fence_radius + 1)):
+                for nx in range(max(0, x - self.fence_radius), min(size, x + self.fence_radius + 1)):
+                    slots.update(self.board.tables.cell_fences[ny * size + nx])
+            self.radius_fences[cell] = slots
+        return self.radius_fences[cell]
+
+    def count_free_fences(self):
+        """Returns the number of free fence slots on the board, cached per fence mask."""
+        mask = self.board.fence_mask
+        if mask not in self.free_fence_counts:
+            conflicts = self.board.tables.fence_conflicts
+            self.free_fence_counts[mask] = sum(1 for slot_conflicts in conflicts if not mask & slot_conflicts)
+        return self.free_fence_counts[mask]
+
+    def order_fences(self, player, slots):
+        """
+        Scores a batch of fence candidates with one call to the NumPy kernel and
+        sorts them by how much longer they make the opponent's shortest path
+        compared to the player's own. Fences that cut off a player are dropped.
+
+        Args:
+            player (int): Player placing the fences.
+            slots (list): Candidate fence slots.
+
+        Returns:
+            list: The legal candidate slots, most promising first.
+        """
+        player1_distances, player2_distances, disconnected = batch_fence_distances(self.board, slots)
+        self.kernel_batches += 1
+        gains = player2_distances - player1_distances if player == 1 else player1_distances - player2_distances
+        gains = gains.tolist()
+        disconnected = disconnected.tolist()
+        order = sorted((index for index in range(len(slots)) if not disconnected[index]),
+                       key=lambda index: gains[index], reverse=True)
+        return [slots[index] for index in order]
+
+    def get_actions(self, player, depth=None):
+        """
+        Returns the actions searched for the player, as action codes (see
+        QuoridorBoard.encode_action): pawn moves first, then the pruned fence
+        candidates. Also records the branching-factor statistics.
+
+        Args:
+            player (int): Player to move.
+            depth (int, optional): Remaining search depth. The fences are ordered
+                with order_fences when it is at least 3 (or None, at the root).
+        """
+        board = self.board
+        actions = list(board.pawn_targets(player))  # A pawn move's code is its destination cell
+        pawn_moves = len(actions)
+        slots = self.get_fence_candidates(player)
+        if slots and self.fence_ordering and (depth is None or depth >= 3):
+            slots = self.order_fences(player, slots)
+        cells = board.size * board.size
+        actions.extend([cells + slot for slot in slots])
+
+        self.interior_nodes += 1
+        self.children += len(actions)
+        self.full_children += pawn_moves + (self.count_free_fences() if self.board.fences_left[player] > 0 else 0)
+        return actions
+
+    def apply_action(self, player, code):
+        """
+        Simulates an action, given as its action code, with the board's make API.
+
+        Returns:
+            bool: False if the fence is illegal (nothing was applied).
+        """
+        board = self.board
+        cells = board.size * board.size
+        if code < cells:
+            board.make_cell_move(player, code)
+            return True
+        return board.make_fence_slot(code - cells, player)
 
     def heuristic(self, player):
-        """Evaluates the game state based on A* shortest paths."""
+        """Evaluates the game state based on the shortest paths to the goal rows."""
         opponent = 2 if player == 1 else 1
+        self.leaves += 1
 
-        player_path = self.find_shortest_path(player)
-        opponent_path = self.find_shortest_path(opponent)
-
-        player_distance = len(player_path)-1 if player_path else float('inf')
-        opponent_distance = len(opponent_path)-1 if opponent_path else float('inf')
+        player_distance = self.path_length(player)
+        opponent_distance = self.path_length(opponent)
         # Include the number of walls placed as a factor in the heuristic
-        player_walls = self.game_state.get("walls_remaining", {}).get(f"player_{player}", 0)
-        opponent_walls = self.game_state.get("walls_remaining", {}).get(f"player_{opponent}", 0)
+        player_walls = self.board.fences_left[player]
+        opponent_walls = self.board.fences_left[opponent]
 
         # Adjust the heuristic to consider the impact of walls more significantly
         heuristic_value = opponent_distance - player_distance + (player_walls - opponent_walls) * 0.5
@@ -97,78 +274,350 @@ class AI:
         return opponent_distance - player_distance # AI wants a larger gap in its favor
 
     def minimax(self, depth, alpha, beta, maximizing_player, player):
+        """
+        Alpha-beta search over pawn moves and fences, simulated with the board's make/unmake.
+        Scores are from the point of view of the maximizing player; results are
+        cached in the transposition table under the board's Zobrist hash.
+        """
+        opponent = 2 if player == 1 else 1
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self.check_budget()
+
+        # The player who just moved may have reached their goal row
+        if self.board.has_won(opponent):
+            return -WIN_SCORE - depth if maximizing_player else WIN_SCORE + depth
+
+        # Without fences left, a race whose pawns can no longer meet is decided
+        # by the path lengths: score it like the goal row the search would reach
+        # after that many plies. (Solving the layout's race table instead costs
+        # tens of milliseconds, too much for every fence layout the search reaches.)
+        if self.endgame is not None and self.board.fences_left[1] == 0 and self.board.fences_left[2] == 0:
+            solved = self.endgame.separated_result(self.board, player)
+            if solved is not None:
+                self.race_exits += 1
+                result, plies = solved
+                score = WIN_SCORE + depth - plies
+                return score if (result == WIN) == maximizing_player else -score
+
         if depth == 0:
-            return self.heuristic(player)  # We evaluate the state with heuristics
+            # We evaluate the state with heuristics, from the maximizing player's side
+            return self.heuristic(player if maximizing_player else opponent)
+
+        key = self.board.hash
+        alpha_original, beta_original = alpha, beta
+        tt_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            entry_depth, score, bound, tt_move = entry
+            if entry_depth >= depth:
+                score, bound = relative_score(score, bound, maximizing_player)
+                if bound == TranspositionTable.EXACT:
+                    return score
+                if bound == TranspositionTable.LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return score
 
-        valid_moves = self.get_valid_moves(player)
-        if not valid_moves:
+        actions = self.get_actions(player, depth)
+        if not actions:
             return -1000  # If there are no valid moves, bad score
 
-        if maximizing_player:
-            max_eval = -float('inf')
-            for move in valid_moves:
-                original_position = self.game_state["player_positions"][f"player{player}"]
-                self.game_state["player_positions"][f"player{player}"] = move  # Simulate the move
-
-                eval = self.minimax(depth - 1, alpha, beta, False, 2 if player == 1 else 1)
+        # Search the best action found previously for this position first
+        if tt_move is not None and tt_move in actions:
+            actions.remove(tt_move)
+            actions.insert(0, tt_move)
 
-                self.game_state["player_positions"][f"player{player}"] = original_position  # Reset the move
-                max_eval = max(max_eval, eval)
+        best_move = None
+        if maximizing_player:
+            best_eval = -float('inf')
+            for action in actions:
+                if not self.apply_action(player, action):  # Simulate the action
+                    continue  # Illegal fence
+                eval = self.minimax(depth - 1, alpha, beta, False, opponent)
+                self.board.unmake()  # Reset the action
+
+                if eval > best_eval:
+                    best_eval = eval
+                    best_move = action
                 alpha = max(alpha, eval)
                 if beta <= alpha:
                     break  # Pruning
-            return max_eval
         else:
-            min_eval = float('inf')
-            for move in valid_moves:
-                original_position = self.game_state["player_positions"][f"player{player}"]
-                self.game_state["player_positions"][f"player{player}"] = move  
-
-                eval = self.minimax(depth - 1, alpha, beta, True, 2 if player == 1 else 1)
-
-                self.game_state["player_positions"][f"player{player}"] = original_position 
-                min_eval = min(min_eval, eval)
+            best_eval = float('inf')
+            for action in actions:
+                if not self.apply_action(player, action):
+                    continue
+                eval = self.minimax(depth - 1, alpha, beta, True, opponent)
+                self.board.unmake()
+
+                if eval < best_eval:
+                    best_eval = eval
+                    best_move = action
                 beta = min(beta, eval)
                 if beta <= alpha:
                     break  # Pruning
-            return min_eval
+
+        if best_eval <= alpha_original:
+            bound = TranspositionTable.UPPER
+        elif best_eval >= beta_original:
+            bound = TranspositionTable.LOWER
+        else:
+            bound = TranspositionTable.EXACT
+        score, bound = relative_score(best_eval, bound, maximizing_player)
+        self.tt.store(key, depth, score, bound, best_move)
+        return best_eval
+
+    def check_budget(self):
+        """
+        Aborts the running search when the node budget or the deadline is
+        exhausted, or when the stop event has been set.
+
+        Raises:
+            SearchAborted: If the search must stop.
+        """
+        if self.search_node_limit is not None and self.nodes >= self.search_node_limit:
+            raise SearchAborted()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchAborted()
+        if self.search_stop_event is not None and self.search_stop_event.is_set():
+            raise SearchAborted()
+
+        self.next_check = self.nodes + CHECK_INTERVAL
+        if self.search_node_limit is not None:
+            self.next_check = min(self.next_check, self.search_node_limit)
+
+    def search_root(self, player, depth, root_actions):
+        """
+        Runs one fixed-depth Minimax iteration over the root actions.
+
+        Args:
+            player (int): Player to move.
+            depth (int): Plies to search, including the root action.
+            root_actions (list): Legal root action codes, searched in this order.
+
+        Returns:
+            list: (value, action code) pairs for the root actions, best first.
+        """
+        opponent = 2 if player == 1 else 1
+        alpha = -float('inf')
+        scored = []
+        for action in root_actions:
+            self.apply_action(player, action)
+            value = self.minimax(depth - 1, alpha, float('inf'), False, opponent)
+            self.board.unmake()
+
+            scored.append((value, action))
+            alpha = max(alpha, value)
+
+        # Stable sort, so equal values keep their previous order
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return scored
+
+    def search(self, player, time_limit=None, node_limit=None, stop_event=None, excluded=None,
+               start_depth=1, ordering_seed=None):
+        """
+        Anytime iterative deepening search over pawn moves and fences. Each iteration
+        is one ply deeper and searches the previous iteration's best actions first.
+        The search stops when the time or node budget runs out, the stop event
+        is set, max_depth is reached or a forced win is found.
+
+        Args:
+            player (int): Player to move.
+            time_limit (float, optional): Seconds to search; defaults to self.time_limit.
+            node_limit (int, optional): Nodes to search; defaults to self.node_limit.
+            stop_event (optional): Object with an is_set() method (e.g. threading.Event)
+                requesting a cooperative stop; defaults to self.stop_event.
+            excluded (set, optional): Action codes that must not be chosen at the root.
+            start_depth (int): Depth of the first iteration.
+            ordering_seed (int, optional): If given, the root actions are shuffled
+                with this seed before the first iteration.
+
+        Returns:
+            tuple: (action code, value, depth) from the deepest completed iteration
+            (see QuoridorBoard.decode_action). If not even the first iteration
+            completed, the first action is returned with depth 0. The action is
+            None if the player has no legal action.
+        """
+        time_limit = self.time_limit if time_limit is None else time_limit
+        self.search_node_limit = self.node_limit if node_limit is None else node_limit
+        self.search_stop_event = self.stop_event if stop_event is None else stop_event
+        start = time.perf_counter()
+        self.deadline = start + time_limit if time_limit is not None else None
+        self.nodes = 0
+        self.next_check = 0
+        self.interior_nodes = 0
+        self.children = 0
+        self.full_children = 0
+        self.leaves = 0
+        self.race_exits = 0
+        self.path_searches = 0
+        self.kernel_batches = 0
+        distance_searches = self.board.distance_searches
+        tt_hits, tt_misses = self.tt.hits, self.tt.misses
+        self.free_fence_counts = {}
+        self.tt.new_search()
+
+        # Keep only the legal root actions, so every iteration can apply them blindly
+        cells = self.board.size * self.board.size
+        root_actions = [action for action in self.get_actions(player)
+                        if not (excluded and action in excluded)
+                        and (action < cells or self.board.is_fence_legal(action - cells))]
+
+        if ordering_seed is not None:
+            random.Random(ordering_seed).shuffle(root_actions)
+
+        history_length = len(self.board.history)
+        best = (root_actions[0] if root_actions else None, -float('inf'), 0)
+        depth_times = []
+        if not root_actions:
+            return best
+
+        # A result pondered for this position during the opponent's turn: keep
+        # deepening from it, and count the pondering time against the budget
+        pondered, self.pondered = self.pondered, None
+        ponder_hit = pondered is not None and pondered[0] == self.board.hash and pondered[1] in root_actions
+        if ponder_hit:
+            _, action, value, depth, seconds = pondered
+            root_actions.remove(action)
+            root_actions.insert(0, action)
+            best = (action, value, depth)
+            start_depth = max(start_depth, depth + 1)
+            if self.deadline is not None:
+                self.deadline = max(self.deadline - seconds, start)
+            if abs(value) >= WIN_SCORE:
+                start_depth = self.max_depth + 1  # Already decided
+
+        for depth in range(start_depth, self.max_depth + 1):
+            try:
+                scored = self.search_root(player, depth, root_actions)
+            except SearchAborted:
+                # Unwind the moves the aborted iteration left on the board
+                while len(self.board.history) > history_length:
+                    self.board.unmake()
+                break
+
+            best_value, best_action = scored[0]
+            best = (best_action, best_value, depth)
+            root_actions = [action for _, action in scored]
+            depth_times.append((depth, time.perf_counter() - start))
+            if abs(best_value) >= WIN_SCORE:
+                break  # A forced win or loss was found, deeper search won't change it
+
+        interior = max(self.interior_nodes, 1)
+        tt_hits, tt_misses = self.tt.hits - tt_hits, self.tt.misses - tt_misses
+        self.last_search = {
+            "depth": best[2],
+            "value": best[1],
+            "nodes": self.nodes,
+            "leaves": self.leaves,
+            "race_exits": self.race_exits,
+            "path_searches": self.path_searches,
+            "distance_searches": self.board.distance_searches - distance_searches,
+            "kernel_batches": self.kernel_batches,
+            "tt_hits": tt_hits,
+            "tt_misses": tt_misses,
+            "tt_hit_rate": tt_hits / (tt_hits + tt_misses) if tt_hits + tt_misses else 0.0,
+            "time": time.perf_counter() - start,
+            "branching_factor": self.children / interior,
+            "unpruned_branching_factor": self.full_children / interior,
+            "branching_reduction": 1 - self.children / self.full_children if self.full_children else 0.0,
+            "depth_times": depth_times,
+            "pondered": ponder_hit,
+        }
+        return best
+
+    def principal_variation(self, player, action, max_length=None):
+        """
+        Returns the line of play the search expects after choosing an action:
+        the action, then the best action stored in the transposition table for
+        each following position (or the solved move in a race endgame), as
+        long as it is legal.
+
+        Args:
+            player (int): Player choosing the action.
+            action (int): Root action code returned by search.
+            max_length (int, optional): Longest line; defaults to max_depth.
+
+        Returns:
+            list: The action codes of the line, starting with action.
+        """
+        board = self.board
+        cells = board.size * board.size
+        max_length = max_length or self.max_depth
+        line = []
+        seen = set()
+        while action is not None and len(line) < max_length and board.hash not in seen:
+            seen.add(board.hash)
+            if action < cells:
+                legal = action in board.pawn_targets(player)
+            else:
+                legal = board.fences_left[player] > 0
+            if not legal or not self.apply_action(player, action):
+                break
+            line.append(action)
+            if board.has_won(player):
+                break
+
+            player = 2 if player == 1 else 1
+            action = None
+            if self.endgame is not None and self.endgame.is_race(board) \
+                    and self.endgame.table(board, solve=False) is not None:
+                solved = self.endgame.best_move(board, player)
+                if solved is not None:
+                    action = board.encode_action(("move", solved[0]))
+            else:
+                entry = self.tt.probe(board.hash)
+                if entry is not None:
+                    action = entry[3]
+
+        for _ in line:
+            board.unmake()
+        return line
 
     def find_shortest_path(self, player):
         """Find the shortest path for the player by avoiding walls using A*."""
-        start = tuple(self.game_state["player_positions"][f"player{player}"])
-        goal_y = 8 if player == 1 else 0  # Winning row
+        size = self.board.size
+        start = self.board.pawn_cells[player]
+        goal_y = self.board.goal_row(player)  # Winning row
+
+        neighbours = self.board.tables.neighbours
+        blocked = self.board.blocked
+        self.path_searches += 1
 
         queue = []
-        heapq.heappush(queue, (0, start))  # (estimated cost, location)
+        heapq.heappush(queue, (0, start))  # (estimated cost, cell index)
         came_from = {start: None}
         cost_so_far = {start: 0}
+        goal = None
 
         while queue:
             _, current = heapq.heappop(queue)
 
-            if current[1] == goal_y:
+            if current // size == goal_y:
+                goal = current
                 break  # Arrived at the destination
 
-            for dx, dy in [(0, -1), (0, 1), (-1, 0), (1, 0)]:  # Up, down, left, right
-                next_pos = (current[0] + dx, current[1] + dy)
-
-                if 0 <= next_pos[0] < 9 and 0 <= next_pos[1] < 9:  # Inside the limits of the board
-                    if not self.board.is_fence_blocking(current[0], current[1], next_pos[0], next_pos[1]):
-                        new_cost = cost_so_far[current] + 1
-                        if next_pos not in cost_so_far or new_cost < cost_so_far[next_pos]:
-                            cost_so_far[next_pos] = new_cost
-                            priority = new_cost + abs(goal_y - next_pos[1])  # Distance heuristics
-                            heapq.heappush(queue, (priority, next_pos))
-                            came_from[next_pos] = current
-
-        if goal_y not in [pos[1] for pos in cost_so_far.keys()]:  
-            print(" No possible path found!")
+            walls = blocked[current]
+            new_cost = cost_so_far[current] + 1
+            for bit, next_cell in neighbours[current]:  # Only neighbours inside the board
+                if not walls & bit:
+                    if next_cell not in cost_so_far or new_cost < cost_so_far[next_cell]:
+                        cost_so_far[next_cell] = new_cost
+                        priority = new_cost + abs(goal_y - next_cell // size)  # Distance heuristics
+                        heapq.heappush(queue, (priority, next_cell))
+                        came_from[next_cell] = current
+
+        if goal is None:
+            logger.debug(" No possible path found!")
             return []
 
         path = []
-        current = min(cost_so_far.keys(), key=lambda pos: abs(goal_y - pos[1]))  
+        current = goal
         while current is not None:
-            path.append(current)
+            path.append((current % size, current // size))
             current = came_from[current]
 
         path.reverse()
@@ -180,12 +629,11 @@ class AI:
             tried_fences = set()
         """Selects the best move using A* for the shortest path and Minimax for strategic decisions."""
 
-        valid_moves = self.get_valid_moves(player)
-        valid_fences = self.get_valid_fences(player)
+        start = time.perf_counter()
+        if self.race_solved():
+            return self.choose_race_move(player)
 
-        if not valid_moves and not valid_fences:
-            print("No valid moves or fences available.")
-            return None  # No possible action
+        valid_moves = self.get_valid_moves(player)
 
         # 1. Use A* to find the shortest path
         path = self.find_shortest_path(player)
@@ -195,132 +643,182 @@ class AI:
             if next_step in valid_moves:
                 a_star_move = ("move", next_step)  # Save the best A* move (don't return yet!)
         
-        print(f"A* path for player {a_star_move}")  # Debugging
-
-
-        # 2. Use Minimax to evaluate if another move is better
-        best_action = None
-        best_value = -float('inf')
-
-        # Test all possible pawn moves with Minimax
-        for move in valid_moves:
-            original_position = self.game_state["player_positions"][f"player{player}"]
-            self.game_state["player_positions"][f"player{player}"] = move
-
-            move_value = self.minimax(depth=5, alpha=-float('inf'), beta=float('inf'),
-                                        maximizing_player=False, player=2 if player == 1 else 1)
-
-            self.game_state["player_positions"][f"player{player}"] = original_position  # Reset
-
-            if move_value > best_value:
-                best_value = move_value
-                best_action = ("move", move)
-                print(f"🔍 Best move value from Minimax: {move_value}, {best_value}, {best_action}")
-
-
-        # Test all possible fences, but now evaluate them properly
-
-        for fence in valid_fences:
-            x, y, orientation = fence
-            opponent = 2 if player == 1 else 1
-
-            # Store original paths before placing the fence
-            original_opponent_path = self.find_shortest_path(opponent)
-            original_player_path = self.find_shortest_path(player)
-
-            original_opponent_distance = len(original_opponent_path) if original_opponent_path else float('inf')
-            original_player_distance = len(original_player_path) if original_player_path else float('inf')
-
-            # Save the original fences state
-            original_fences = self.board.fences.copy()
-            original_fences_gui = self.board.fences_gui.copy()
-            original_fences_left = self.board.fences_left.copy()
-
-            # Attempt fence placement simulation
-            fence_successful = self.board.place_fence(x, y, orientation, player)
-
-            # Restore fences left count
-            self.board.fences_left = original_fences_left
-
-            if fence_successful:
-                # Evaluate new path lengths if fence placement succeeded
-                new_opponent_path = self.find_shortest_path(opponent)
-                new_player_path = self.find_shortest_path(player)
-
-                new_opponent_distance = len(new_opponent_path) if new_opponent_path else float('inf')
-                new_player_distance = len(new_player_path) if new_player_path else float('inf')
-
-                # Restore previous fence state after evaluation
-                self.board.fences = original_fences
-                self.board.fences_gui = original_fences_gui
-                self.board.update_gui_game_state()
-
-                # Calculate net benefit (opponent slowdown minus player slowdown)
-                opponent_slowdown = new_opponent_distance - original_opponent_distance
-                player_slowdown = new_player_distance - original_player_distance
-                net_benefit = opponent_slowdown - player_slowdown
+        if telemetry.DEBUG:
+            logger.debug(f"A* path for player {a_star_move}")
+
+
+        # 2. Use Minimax over pawn moves and fences to evaluate if another action is better
+        excluded = {self.board.encode_action(("fence", fence)) for fence in tried_fences}
+        # Time spent on a race table that could not be solved comes out of the budget
+        time_limit = max(self.time_limit - (time.perf_counter() - start), 0.0) if self.time_limit is not None else None
+        if self.workers > 1:
+            if self.parallel is None:
+                from parallel_search import LazySMPSearch
+                self.parallel = LazySMPSearch(self.workers, tt_megabytes=self.tt_megabytes,
+                                              time_limit=self.time_limit, node_limit=self.node_limit,
+                                              max_depth=self.max_depth, fence_pruning=self.fence_pruning,
+                                              fence_radius=self.fence_radius,
+                                              fence_ordering=self.fence_ordering,
+                                              endgame=self.endgame is not None)
+            best_code, best_value, depth = self.parallel.search(self.board, player, time_limit=time_limit,
+                                                                excluded=excluded)
+            self.last_search = self.parallel.last_search
+        else:
+            best_code, best_value, depth = self.search(player, time_limit=time_limit, excluded=excluded)
 
-                fence_value = net_benefit * 5  # Assign a weight to net slowdown
+        if best_code is None:
+            logger.info("No valid moves or fences available.")
+            return None  # No possible action
+        best_action = self.board.decode_action(best_code)
 
-                # Evaluate if this fence is the new best action
-                if fence_value > best_value and fence not in tried_fences:
-                    best_value = fence_value
-                    best_action = ("fence", fence)
-            else:
-                # If fence placement simulation failed, revert state
-                self.board.fences = original_fences
-                self.board.fences_gui = original_fences_gui
-                self.board.update_gui_game_state()
+        if telemetry.DEBUG:
+            logger.debug(f"🔍 Best action value from Minimax: {best_value} at depth {depth}, {best_action}")
 
         # 3. Compare A* move vs. Minimax move
-        if a_star_move:
+        if a_star_move and best_action[0] == "move":
             # If Minimax doesn't suggest a better alternative, use A* move
 
-            if best_action is None or best_value <= 0:
+            if best_value <= 0:
                 return a_star_move  
 
         return best_action  # If A* was skipped, return Minimax best action
 
 
+    def race_solved(self):
+        """
+        Returns True if the position is a race endgame whose table is solved,
+        solving it first if needed. With a time limit, the solve may take
+        RACE_SOLVE_SHARE of it; a table that does not finish in time (large
+        boards) returns False, and the move is searched instead.
+        """
+        if self.endgame is None or not self.endgame.is_race(self.board):
+            return False
+        deadline = time.perf_counter() + self.time_limit * RACE_SOLVE_SHARE if self.time_limit is not None else None
+        return self.endgame.table(self.board, deadline=deadline) is not None
+
+    def choose_race_move(self, player):
+        """
+        Chooses the solved move of a race endgame (see RaceSolver), without
+        searching. The table must be solved already (see race_solved).
+
+        Returns:
+            tuple or None: The pawn move, or None if the pawn cannot move.
+        """
+        start = time.perf_counter()
+        solved = self.endgame.best_move(self.board, player)
+        if solved is None:
+            return None
+
+        target, result, plies = solved
+        value = WIN_SCORE - plies if result == WIN else -WIN_SCORE + plies if result == LOSS else 0
+        self.last_search = {"endgame": True, "depth": plies, "value": value, "nodes": 0,
+                            "time": time.perf_counter() - start, "endgame_solves": self.endgame.solves}
+        if telemetry.DEBUG:
+            logger.debug(f"Race endgame: {target} ({value:+d}, {plies} plies to the end)")
+        return ("move", target)
+
+    def telemetry_record(self, player, action, wall_time):
+        """
+        Builds the telemetry record of a move: the statistics of the search that
+        chose it (nodes, leaves evaluated, path searches, TT hits, branching
+        factor, depth reached) and the wall time of the whole turn.
+
+        Args:
+            player (int): Player who moved.
+            action (tuple): Action played.
+            wall_time (float): Seconds the turn took.
+
+        Returns:
+            dict: JSON-serializable record for TelemetryLog.write.
+        """
+        record = {key: value for key, value in self.last_search.items() if key != "depth_times"}
+        record.update({
+            "engine": "minimax",
+            "player": player,
+            "ply": len(self.board.history),
+            "action": [action[0], list(action[1])] if action else None,
+            "wall_time": wall_time,
+        })
+        return record
+
+    def play_book_move(self, player):
+        """
+        Plays the opening book's action for the current position, if the book
+        has one and it is legal here.
+
+        Returns:
+            tuple or None: The action played, or None on a book miss.
+        """
+        start = time.perf_counter()
+        entry = self.book.probe(self.board)
+        if entry is None:
+            return None
+
+        action, depth, score = entry
+        if action[0] == "move":
+            if action[1] not in self.get_valid_moves(player) or not self.board.move_pawn(player, action[1]):
+                return None
+        elif not self.board.place_fence(*action[1], player):
+            return None
+
+        # Credit the book with the average search it replaced
+        self.book.time_saved += (sum(self.search_times) / len(self.search_times) if self.search_times
+                                 else self.time_limit or 0.0)
+        self.last_search = {"book": True, "depth": depth, "value": score, "nodes": 0,
+                            "time": time.perf_counter() - start, "book_hit_rate": self.book.stats()["hit_rate"],
+                            "book_time_saved": self.book.time_saved}
+        logger.info(f"AI1 played {action} from the opening book.")
+        return action
+
     def make_move(self, player):
         """Applies a move for the AI and updates the game state using the board functions."""
-        self.game_state = self.read_game_state()
+        start = time.perf_counter()
         tried_fences = set()
 
+        if self.book is not None:
+            action = self.play_book_move(player)
+            if action is not None:
+                if self.telemetry_log is not None:
+                    self.telemetry_log.write(self.telemetry_record(player, action, time.perf_counter() - start))
+                return
+
         while True:  # Keep looking for a valid move until found
             action = self.choose_move(player, tried_fences)
+            if self.book is not None:
+                self.search_times.append(self.last_search.get("time", 0.0))
 
             if action is None:
-                print(f"AI has no valid moves for player {player}")
+                logger.info(f"AI has no valid moves for player {player}")
                 return
 
             if action[0] == "move":
                 new_position = action[1]
                 if self.board.move_pawn(player, new_position):
-                    self.game_state = self.read_game_state()
-                    print(f"AI1 moved to {new_position}.")
+                    logger.info(f"AI1 moved to {new_position}.")
                     break  # Exits loop after valid move
                 else:
-                    print(f"AI tried to move to {new_position}, but it was invalid. Retrying...")
+                    logger.info(f"AI tried to move to {new_position}, but it was invalid. Retrying...")
 
             elif action[0] == "fence":
                 x, y, orientation = action[1]
 
                 if self.board.place_fence(x, y, orientation, player):
-                    self.game_state = self.read_game_state()
-                    print(f"AI1 placed fence at ({x}, {y}, {orientation}).")
+                    logger.info(f"AI1 placed fence at ({x}, {y}, {orientation}).")
                     break  # Esce dal ciclo dopo aver piazzato correttamente
                 else:
-                    print(f"AI failed placing fence at ({x}, {y}, {orientation}). Changing strategy...")
+                    logger.info(f"AI failed placing fence at ({x}, {y}, {orientation}). Changing strategy...")
                     tried_fences.add((x, y, orientation))
 
                     path = self.find_shortest_path(player)
                     if len(path) > 1:
                         next_step = path[1]
                         if self.board.move_pawn(player, next_step):
-                            self.game_state = self.read_game_state()
+                            action = ("move", next_step)
                             break
                         else:
-                            print(f"AI tried to move to {next_step} using A*, but it was invalid. Retrying...")
+                            logger.info(f"AI tried to move to {next_step} using A*, but it was invalid. Retrying...")
                     else:
-                        print("A* found no valid moves. Retrying...")
+                        logger.info("A* found no valid moves. Retrying...")
+
+        if self.telemetry_log is not None:
+            self.telemetry_log.write(self.telemetry_record(player, action, time.perf_counter() - start))
@@ -0,0 +1,205 @@
+import argparse
+import json
+import multiprocessing
+import multiprocessing.util
+import os
+import sys
+import time
+from collections import deque
+
+from ai import AI
+from positions import CORPUS_MAGIC, CorpusReader, decode_position, state_to_position
+
+# AI of a worker process, created by init_worker and reused for every position
+worker_ai = None
+
+
+def read_positions(path, start=0, size=9):
+    """
+    Streams encoded positions from a binary corpus (see positions) or a
+    JSON-lines file of game states, one at a time.
+
+    Args:
+        path (str): Corpus or JSON-lines file. A JSON line is either a game
+            state dict (as built by QuoridorBoard.update_gui_game_state) or an
+            object holding one under "state".
+        start (int): Positions to skip, e.g. the ones analyzed before a resume.
+        size (int): Board size of a JSON-lines file (a corpus records its own).
+
+    Yields:
+        tuple: (position index, encoded position, board size).
+    """
+    with open(path, "rb") as file:
+        is_corpus = file.read(len(CORPUS_MAGIC)) == CORPUS_MAGIC
+
+    if is_corpus:
+        with CorpusReader(path) as reader:
+            for index in range(start, len(reader)):
+                yield index, reader.record(index), reader.size
+        return
+
+    with open(path) as file:
+        index = 0
+        for line in file:
+            if not line.strip():
+                continue
+            if index >= start:
+                state = json.loads(line)
+                yield index, state_to_position(state.get("state", state), size), size
+            index += 1
+
+
+def init_worker(ai_options):
+    """Creates the worker process's AI (see analyze), closed when the worker exits."""
+    global worker_ai
+    worker_ai = AI(None, **ai_options)
+    multiprocessing.util.Finalize(None, worker_ai.close, exitpriority=10)
+
+
+def analyze_position(index, record, size=9):
+    """
+    Searches one position with the worker's AI, from an empty transposition
+    table so the result does not depend on the positions analyzed before.
+
+    Args:
+        index (int): Position index, copied to the result.
+        record (bytes): Encoded position (see positions.encode_position).
+        size (int): Board size of the position.
+
+    Returns:
+        dict: index, best action, score (side to move's point of view),
+        depth, principal variation, nodes and time.
+    """
+    ai = worker_ai
+    board = decode_position(record, size)
+    ai.board = board
+    ai.tt.clear()
+    player = board.turn
+    start = time.perf_counter()
+
+    if ai.race_solved():
+        action = ai.choose_race_move(player)
+        code = board.encode_action(action) if action is not None else None
+        value, depth = ai.last_search["value"], ai.last_search["depth"]
+    else:
+        code, value, depth = ai.search(player)
+        action = board.decode_action(code) if code is not None else None
+
+    line = [board.decode_action(move) for move in ai.principal_variation(player, code)] if code is not None else []
+    return {
+        "index": index,
+        "action": [action[0], list(action[1])] if action is not None else None,
+        "score": value if action is not None else None,
+        "depth": depth,
+        "pv": [[kind, list(target)] for kind, target in line],
+        "nodes": ai.last_search.get("nodes", 0),
+        "time": time.perf_counter() - start,
+    }
+
+
+def read_checkpoint(path):
+    """Returns the (positions done, output offset) saved in a checkpoint file, or (0, 0)."""
+    if not os.path.exists(path):
+        return 0, 0
+    with open(path) as file:
+        checkpoint = json.load(file)
+    return checkpoint["done"], checkpoint["offset"]
+
+
+def write_checkpoint(path, done, offset):
+    """Saves the progress atomically (temporary file and rename)."""
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as file:
+        json.dump({"done": done, "offset": offset}, file)
+    os.replace(temporary_path, path)
+
+
+def analyze(input_path, output_path, workers=None, in_flight=None, checkpoint_every=100, resume=False,
+            progress=True, size=9, **ai_options):
+    """
+    Analyzes every position of a file on a worker pool and streams the results
+    to a JSON-lines file in input order.
+
+    At most in_flight positions are read ahead of the output, so memory stays
+    bounded however large the input. Every checkpoint_every results the
+    output is flushed and the number of positions done, with the output's
+    length, is saved next to it; resume=True continues from there, dropping
+    any output written after the checkpoint.
+
+    Args:
+        input_path (str): Corpus or JSON-lines file (see read_positions).
+        output_path (str): JSON-lines file of results (see analyze_position).
+        workers (int, optional): Worker processes; defaults to the CPU count.
+        in_flight (int, optional): Positions submitted but not written; defaults to 4 per worker.
+        checkpoint_every (int): Results between two checkpoints.
+        resume (bool): Continue from the checkpoint of output_path.
+        progress (bool): Print the throughput at every checkpoint.
+        size (int): Board size of a JSON-lines input (see read_positions).
+        **ai_options: AI keyword arguments (time_limit, max_depth, fence_pruning, ...).
+
+    Returns:
+        int: Positions analyzed by this run.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    in_flight = in_flight or 4 * workers
+    checkpoint_path = output_path + ".checkpoint"
+    done, offset = read_checkpoint(checkpoint_path) if resume else (0, 0)
+
+    output = open(output_path, "r+" if resume and os.path.exists(output_path) else "w")
+    output.seek(offset)
+    output.truncate()
+    start = time.perf_counter()
+    analyzed = 0
+    try:
+        with multiprocessing.Pool(workers, initializer=init_worker, initargs=(ai_options,)) as pool:
+            pending = deque()
+
+            def write_oldest():
+                nonlocal done, analyzed
+                result = pending.popleft().get()
+                output.write(json.dumps(result, separators=(",", ":")) + "\n")
+                done += 1
+                analyzed += 1
+                if done % checkpoint_every == 0:
+                    output.flush()
+                    os.fsync(output.fileno())
+                    write_checkpoint(checkpoint_path, done, output.tell())
+                    if progress:
+                        elapsed = time.perf_counter() - start
+                        print(f"{done} positions ({analyzed / elapsed:.1f}/s)", file=sys.stderr)
+
+            for index, record, board_size in read_positions(input_path, done, size):
+                pending.append(pool.apply_async(analyze_position, (index, record, board_size)))
+                if len(pending) >= in_flight:
+                    write_oldest()
+            while pending:
+                write_oldest()
+            # Let the workers exit on their own, so their AIs are closed (leaving the block terminates them)
+            pool.close()
+            pool.join()
+        output.flush()
+        write_checkpoint(checkpoint_path, done, output.tell())
+    finally:
+        output.close()
+    return analyzed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Best move, score and principal variation for a set of positions")
+    parser.add_argument("input", help="position corpus or JSON-lines file of game states")
+    parser.add_argument("output", help="JSON-lines file of results, in input order")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--in-flight", type=int, help="positions read ahead of the output (default: 4 per worker)")
+    parser.add_argument("--time-limit", type=float, help="search seconds per position (default: no limit)")
+    parser.add_argument("--depth", type=int, default=3, help="search depth per position")
+    parser.add_argument("--fence-pruning", choices=["path", "all", "none"], default="path")
+    parser.add_argument("--checkpoint-every", type=int, default=100)
+    parser.add_argument("--resume", action="store_true", help="continue from the output's checkpoint")
+    parser.add_argument("--size", type=int, default=9, help="board size of a JSON-lines input")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = analyze(args.input, args.output, workers=args.workers, in_flight=args.in_flight,
+                    checkpoint_every=args.checkpoint_every, resume=args.resume, size=args.size,
+                    time_limit=args.time_limit, max_depth=args.depth, fence_pruning=args.fence_pruning)
+    print(f"Analyzed {count} positions in {time.perf_counter() - start:.1f}s", file=sys.stderr)
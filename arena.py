@@ -0,0 +1,317 @@
+import argparse
+import ast
+import json
+import math
+import multiprocessing
+import random
+import time
+
+from engines import ENGINES, create_engine
+from quoridor_board import QuoridorBoard
+
+
+def parse_engine_spec(spec):
+    """
+    Parses an engine configuration written as "name" or
+    "name:option=value,option=value", e.g. "minimax:time_limit=0.2,max_depth=4".
+
+    Args:
+        spec (str): Engine configuration.
+
+    Returns:
+        tuple: (engine name, options dict). Option values are Python literals
+        where possible and strings otherwise.
+    """
+    name, _, option_text = spec.partition(":")
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine '{name}', expected one of: {', '.join(sorted(ENGINES))}")
+    options = {}
+    for item in filter(None, option_text.split(",")):
+        key, _, value = item.partition("=")
+        try:
+            options[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            options[key] = value
+    return name, options
+
+
+def play_game(job):
+    """
+    Plays one headless game between two engine configurations on a private
+    in-memory board (no GUI, no JSON file). Runs in the arena's worker processes.
+
+    Args:
+        job (tuple): (game index, first spec, second spec, seed, random plies, max plies,
+            board size, fences per player). The first spec plays player 1. The game opens with the given number of
+            random pawn moves chosen with the seed, so repeated games differ.
+
+    Returns:
+        dict: Game record with the specs, the encoded moves, the per-move
+        latencies, the winner (1, 2 or None for a draw) and the duration.
+    """
+    index, first, second, seed, random_plies, max_plies, size, fences = job
+    start = time.perf_counter()
+    board = QuoridorBoard(size=size, fences=fences)
+    engines = {}
+    for player, spec in ((1, first), (2, second)):
+        name, options = parse_engine_spec(spec)
+        engines[player] = create_engine(name, board, **options)
+    rng = random.Random(seed)
+
+    moves = []
+    latencies = {1: [], 2: []}
+    winner = None
+    player = 1
+    try:
+        for ply in range(max_plies):
+            history_length = len(board.history)
+            if ply < random_plies:
+                cell = rng.choice(board.pawn_targets(player))
+                board.make_cell_move(player, cell)
+            else:
+                move_start = time.perf_counter()
+                engines[player].make_move(player)
+                latencies[player].append(time.perf_counter() - move_start)
+
+            if len(board.history) == history_length:
+                winner = 2 if player == 1 else 1  # No legal action: the player loses
+                break
+
+            entry = board.history[-1]
+            if entry[0] == "move":
+                moves.append(board.pawn_cells[player])  # A pawn move's code is its destination cell
+            else:
+                moves.append(board.encode_action(("fence", board.tables.slot_to_fence(entry[2]))))
+
+            if board.has_won(player):
+                winner = player
+                break
+            player = 2 if player == 1 else 1
+    finally:
+        for engine in engines.values():
+            engine.close()  # Stops an engine's search processes, if any
+
+    return {
+        "game": index,
+        "player1": first,
+        "player2": second,
+        "seed": seed,
+        "size": size,
+        "winner": winner,
+        "plies": len(moves),
+        "moves": moves,
+        "latencies": {"player1": latencies[1], "player2": latencies[2]},
+        "duration": time.perf_counter() - start,
+    }
+
+
+def elo_difference(score):
+    """Returns the Elo difference that makes score the expected score (0 < score < 1)."""
+    return -400 * math.log10(1 / score - 1)
+
+
+def elo_interval(wins, draws, losses, z=1.96):
+    """
+    Estimates the Elo difference of an engine over its opponent from a match
+    result, with a normal-approximation confidence interval.
+
+    Args:
+        wins (int): Games won.
+        draws (int): Games drawn.
+        losses (int): Games lost.
+        z (float): Normal quantile of the interval (1.96 for 95%).
+
+    Returns:
+        tuple: (elo, low, high). Perfect scores are clamped half a game away
+        from 0 and 1 so the values stay finite.
+    """
+    games = wins + draws + losses
+    if not games:
+        return 0.0, -math.inf, math.inf
+    score = (wins + 0.5 * draws) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = z * math.sqrt(variance / games)
+    clamp = 0.5 / games
+
+    def to_elo(value):
+        return elo_difference(min(max(value, clamp), 1 - clamp))
+
+    return to_elo(score), to_elo(score - margin), to_elo(score + margin)
+
+
+class Arena:
+    """
+    Headless self-play arena: plays round-robin matches between engine
+    configurations on a process pool, with colours alternating every game, and
+    streams every finished game record to a JSON-lines file.
+
+    Attributes:
+        specs (list): Engine configurations (see parse_engine_spec).
+        results (dict): (spec, opponent spec) -> [wins, draws, losses].
+        latencies (dict): Spec -> list of move latencies in seconds.
+    """
+
+    def __init__(self, specs, workers=None, random_plies=4, max_plies=200, seed=0, size=9, fences=10):
+        """
+        Args:
+            specs (list): At least two distinct engine configurations.
+            workers (int, optional): Worker processes; defaults to the CPU count.
+            random_plies (int): Random pawn moves opening every game.
+            max_plies (int): Plies after which a game is scored as a draw.
+            seed (int): Base seed of the random openings.
+            size (int): Board size of the games; small boards make quick regression matches.
+            fences (int): Fences each player starts with.
+        """
+        if len(specs) < 2:
+            raise ValueError("The arena needs at least two engine configurations")
+        if len(set(specs)) < len(specs):
+            # Results are kept per spec string, so both sides of a self-match would share one counter
+            raise ValueError("Each engine configuration may be given only once")
+        for spec in specs:
+            _, options = parse_engine_spec(spec)  # Fail early on a bad configuration
+            if options.get("workers", 1) > 1:
+                # The games run in daemonic pool processes, which cannot start search processes
+                raise ValueError(f"'{spec}': engines cannot use workers > 1 in the arena")
+        self.specs = specs
+        self.workers = workers or multiprocessing.cpu_count()
+        self.random_plies = random_plies
+        self.max_plies = max_plies
+        self.seed = seed
+        self.size = size
+        self.fences = fences
+        self.results = {}
+        self.latencies = {spec: [] for spec in specs}
+        self.plies = []
+        self.elapsed = 0.0
+
+    def jobs(self, games):
+        """Yields the games of every pairing, alternating who plays first."""
+        index = 0
+        for a in range(len(self.specs)):
+            for b in range(a + 1, len(self.specs)):
+                for game in range(games):
+                    first, second = (self.specs[a], self.specs[b]) if game % 2 == 0 else (self.specs[b], self.specs[a])
+                    # Both colour assignments of a pair share the opening
+                    yield (index, first, second, self.seed + index // 2, self.random_plies, self.max_plies,
+                           self.size, self.fences)
+                    index += 1
+
+    def record(self, game):
+        """Adds a finished game to the match results."""
+        first, second = game["player1"], game["player2"]
+        for spec, opponent, player in ((first, second, 1), (second, first, 2)):
+            counts = self.results.setdefault((spec, opponent), [0, 0, 0])
+            if game["winner"] is None:
+                counts[1] += 1
+            else:
+                counts[0 if game["winner"] == player else 2] += 1
+            self.latencies[spec].extend(game["latencies"][f"player{player}"])
+        self.plies.append(game["plies"])
+
+    def run(self, games, output=None, progress=True):
+        """
+        Plays the matches and streams the game records.
+
+        Args:
+            games (int): Games per pairing.
+            output (str, optional): JSON-lines file to append the game records to.
+            progress (bool): Print a line per finished game.
+
+        Returns:
+            dict: The report (see report).
+        """
+        start = time.perf_counter()
+        records = open(output, "a") if output else None
+        total = games * len(self.specs) * (len(self.specs) - 1) // 2
+        try:
+            with multiprocessing.Pool(self.workers) as pool:
+                for done, game in enumerate(pool.imap_unordered(play_game, self.jobs(games)), 1):
+                    self.record(game)
+                    if records is not None:
+                        records.write(json.dumps(game, separators=(",", ":")) + "\n")
+                        records.flush()
+                    if progress:
+                        print(f"[{done}/{total}] game {game['game']}: winner {game['winner']} "
+                              f"in {game['plies']} plies ({game['duration']:.1f}s)")
+        finally:
+            if records is not None:
+                records.close()
+        self.elapsed = time.perf_counter() - start
+        return self.report()
+
+    def report(self):
+        """
+        Summarizes the games played so far.
+
+        Returns:
+            dict: Per pairing the score, win rate and Elo with its 95% interval;
+            per configuration the mean and p99 move latency; games per hour.
+        """
+        pairings = []
+        for (spec, opponent), (wins, draws, losses) in sorted(self.results.items()):
+            if self.specs.index(spec) > self.specs.index(opponent):
+                continue  # Each pairing once, from the first configuration's side
+            games = wins + draws + losses
+            elo, low, high = elo_interval(wins, draws, losses)
+            pairings.append({
+                "engine": spec, "opponent": opponent, "games": games,
+                "wins": wins, "draws": draws, "losses": losses,
+                "win_rate": wins / games if games else 0.0,
+                "elo": elo, "elo_low": low, "elo_high": high,
+            })
+
+        latency = {}
+        for spec, values in self.latencies.items():
+            values = sorted(values)
+            latency[spec] = {
+                "moves": len(values),
+                "mean": sum(values) / len(values) if values else 0.0,
+                "p99": values[min(len(values) - 1, int(len(values) * 0.99))] if values else 0.0,
+            }
+
+        games = len(self.plies)
+        return {
+            "games": games,
+            "games_per_hour": games * 3600 / self.elapsed if self.elapsed else 0.0,
+            "mean_plies": sum(self.plies) / games if games else 0.0,
+            "pairings": pairings,
+            "latency": latency,
+        }
+
+
+def print_report(report):
+    """Prints an arena report as a table."""
+    print(f"\n{report['games']} games, {report['games_per_hour']:.0f} games/hour, "
+          f"{report['mean_plies']:.1f} plies per game")
+    for pairing in report["pairings"]:
+        print(f"{pairing['engine']} vs {pairing['opponent']}: "
+              f"+{pairing['wins']} ={pairing['draws']} -{pairing['losses']} "
+              f"(win rate {pairing['win_rate']:.1%}), Elo {pairing['elo']:+.0f} "
+              f"[{pairing['elo_low']:+.0f}, {pairing['elo_high']:+.0f}]")
+    for spec, latency in report["latency"].items():
+        print(f"{spec}: {latency['moves']} moves, mean {latency['mean'] * 1000:.1f} ms, "
+              f"p99 {latency['p99'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless AI-vs-AI arena")
+    parser.add_argument("--engine", action="append", required=True, metavar="SPEC",
+                        help='engine configuration, e.g. "minimax:time_limit=0.2" (give at least two)')
+    parser.add_argument("--games", type=int, default=100, help="games per pairing")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--random-plies", type=int, default=4, help="random pawn moves opening each game")
+    parser.add_argument("--max-plies", type=int, default=200, help="plies after which a game is a draw")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size", type=int, default=9, help="cells per side of the board")
+    parser.add_argument("--fences", type=int, default=10, help="fences each player starts with")
+    parser.add_argument("--output", metavar="PATH", help="append the game records to this JSON-lines file")
+    parser.add_argument("--report", metavar="PATH", help="also save the report as JSON")
+    args = parser.parse_args()
+
+    arena = Arena(args.engine, workers=args.workers, random_plies=args.random_plies,
+                  max_plies=args.max_plies, seed=args.seed, size=args.size, fences=args.fences)
+    report = arena.run(args.games, output=args.output)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as file:
+            json.dump(report, file, indent=2)
@@ -0,0 +1,366 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from ai import AI
+from quoridor_board import BoardTables, QuoridorBoard
+
+# Fixed benchmark corpus: action sequences played from the initial position,
+# alternating players starting with player 1
+POSITIONS = {
+    "opening": [
+        ("move", (4, 1)), ("move", (4, 7)),
+    ],
+    "midgame": [
+        ("fence", (3, 2, "H")), ("fence", (4, 5, "H")), ("fence", (2, 4, "V")), ("fence", (5, 3, "V")),
+        ("move", (4, 1)), ("move", (4, 7)), ("move", (4, 2)), ("move", (4, 6)),
+    ],
+    "fence_heavy": [
+        ("fence", (0, 3, "H")), ("fence", (6, 4, "H")), ("fence", (2, 3, "H")), ("fence", (4, 4, "H")),
+        ("fence", (4, 2, "V")), ("fence", (3, 5, "V")), ("fence", (6, 1, "V")), ("fence", (1, 6, "V")),
+        ("move", (4, 1)), ("move", (4, 7)), ("fence", (1, 1, "H")), ("fence", (5, 6, "H")),
+        ("move", (3, 1)), ("move", (3, 7)), ("fence", (6, 6, "V")), ("fence", (0, 5, "H")),
+    ],
+}
+
+
+def build_position(name):
+    """
+    Plays a corpus position's actions on a new board.
+
+    Args:
+        name (str): Key of POSITIONS.
+
+    Returns:
+        QuoridorBoard: The position.
+    """
+    board = QuoridorBoard()
+    player = 1
+    for kind, target in POSITIONS[name]:
+        if kind == "move":
+            board.make_pawn_move(player, target)
+        elif not board.make_fence(*target, player):
+            raise ValueError(f"Illegal fence {target} in benchmark position '{name}'")
+        player = 2 if player == 1 else 1
+    return board
+
+
+def bench_is_fence_blocking(board, ai):
+    """Every orthogonal step on the board."""
+    steps = [(x, y, x + dx, y + dy) for y in range(board.size) for x in range(board.size)
+             for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0))
+             if 0 <= x + dx < board.size and 0 <= y + dy < board.size]
+
+    def run():
+        for x1, y1, x2, y2 in steps:
+            board.is_fence_blocking(x1, y1, x2, y2)
+        return len(steps), 0
+    return run
+
+
+def bench_pawn_targets(board, ai):
+    """Both players' pawn move generation, jumps included."""
+    def run():
+        board.pawn_targets(1)
+        board.pawn_targets(2)
+        return 2, 0
+    return run
+
+
+def bench_has_path_to_goal(board, ai):
+    """Both players' path checks."""
+    def run():
+        board.has_path_to_goal(1)
+        board.has_path_to_goal(2)
+        return 2, 0
+    return run
+
+
+def bench_find_shortest_path(board, ai):
+    """A* for both players."""
+    def run():
+        ai.find_shortest_path(1)
+        ai.find_shortest_path(2)
+        return 2, 0
+    return run
+
+
+def bench_get_valid_fences(board, ai):
+    """The AI's legal fence list (AI.get_valid_fences), as (x, y, orientation) triples."""
+    def run():
+        ai.get_valid_fences(board.turn)
+        return 1, 0
+    return run
+
+
+def bench_legal_fence_slots(board, ai):
+    """Every legal fence of the position, from the contact counts and local searches."""
+    def run():
+        board.legal_fence_slots()
+        return 1, 0
+    return run
+
+
+def bench_make_unmake_fence(board, ai):
+    """Placing and taking back every free fence, with the path check and distance repair."""
+    fences = [board.tables.slot_to_fence(slot) for slot in range(2 * board.tables.slots)
+              if not board.fence_mask & board.tables.fence_conflicts[slot]]
+    player = board.turn
+
+    def run():
+        for x, y, orientation in fences:
+            if board.make_fence(x, y, orientation, player):
+                board.unmake()
+        return len(fences), 0
+    return run
+
+
+def bench_minimax(board, ai):
+    """A fixed-depth alpha-beta search from an empty transposition table."""
+    def run():
+        ai.tt.clear()
+        ai.nodes = 0
+        ai.next_check = float('inf')
+        ai.minimax(3, -float('inf'), float('inf'), True, board.turn)
+        return 1, ai.nodes
+    return run
+
+
+def bench_choose_move(board, ai):
+    """A full move decision (A* plus a depth-3 iterative deepening search)."""
+    def run():
+        ai.tt.clear()
+        ai.choose_move(board.turn)
+        return 1, ai.last_search["nodes"]
+    return run
+
+
+BENCHMARKS = {
+    "is_fence_blocking": (bench_is_fence_blocking, 200),
+    "pawn_targets": (bench_pawn_targets, 2000),
+    "has_path_to_goal": (bench_has_path_to_goal, 2000),
+    "find_shortest_path": (bench_find_shortest_path, 100),
+    "get_valid_fences": (bench_get_valid_fences, 50),
+    "legal_fence_slots": (bench_legal_fence_slots, 20),
+    "make_unmake_fence": (bench_make_unmake_fence, 5),
+    "minimax": (bench_minimax, 1),
+    "choose_move": (bench_choose_move, 1),
+}  # Name -> (factory, calls per sample)
+
+
+def percentile(values, fraction):
+    """Returns the value at a fraction (0..1) of the sorted values (nearest rank)."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_benchmarks(names=None, positions=None, samples=30):
+    """
+    Runs the benchmarks on the corpus positions.
+
+    Every sample calls the benchmark a fixed number of times; latencies are per
+    operation (e.g. per is_fence_blocking call or per search).
+
+    Args:
+        names (list, optional): Benchmarks to run; defaults to all of BENCHMARKS.
+        positions (list, optional): Positions to run them on; defaults to all of POSITIONS.
+        samples (int): Timed samples per benchmark and position.
+
+    Returns:
+        dict: "meta" (interpreter and date) and "results", keyed
+        "benchmark/position", each with ops_per_second, nodes_per_second and
+        p50/p99 latency in seconds.
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        factory, calls = BENCHMARKS[name]
+        for position in positions or POSITIONS:
+            board = build_position(position)
+            ai = AI(board, time_limit=None, max_depth=3)
+            run = factory(board, ai)
+            run()  # Warm-up: caches, lazy tables
+
+            latencies = []
+            total_ops = total_nodes = 0
+            total_time = 0.0
+            for _ in range(samples):
+                ops = nodes = 0
+                start = time.perf_counter()
+                for _ in range(calls):
+                    sample_ops, sample_nodes = run()
+                    ops += sample_ops
+                    nodes += sample_nodes
+                elapsed = time.perf_counter() - start
+                latencies.append(elapsed / ops)
+                total_ops += ops
+                total_nodes += nodes
+                total_time += elapsed
+
+            results[f"{name}/{position}"] = {
+                "ops_per_second": total_ops / total_time,
+                "nodes_per_second": total_nodes / total_time if total_nodes else None,
+                "p50": percentile(latencies, 0.5),
+                "p99": percentile(latencies, 0.99),
+                "samples": samples,
+            }
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+        },
+        "results": results,
+    }
+
+
+def run_scaling(sizes, fences=10, moves=8, depth=3):
+    """
+    Measures how the engine scales with the board size: both sides play the
+    first moves of a game with fixed-depth searches, and the move latency,
+    search speed and memory are recorded per size.
+
+    Args:
+        sizes (list): Board sizes to measure.
+        fences (int): Fences each player starts with, on every size.
+        moves (int): Moves searched per size (fewer if the game ends first).
+        depth (int): Search depth of every move.
+
+    Returns:
+        dict: Per size (as a string): cells, fence slots, moves, mean and p99
+        move latency in seconds, mean nodes per move, nodes_per_second, and the
+        bytes of the board's lookup tables (tables_bytes) and the peak
+        bytes allocated by a search (search_peak_bytes), the transposition
+        table excluded.
+    """
+    results = {}
+    for size in sizes:
+        tracemalloc.start()
+        tables = BoardTables(size)  # A private copy, since the shared tables may be built already
+        tables_bytes = tracemalloc.get_traced_memory()[0]
+        del tables
+        board = QuoridorBoard(size=size, fences=min(fences, (size - 1) ** 2))
+        ai = AI(board, time_limit=None, max_depth=depth)
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        ai.choose_move(1)
+        search_peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+
+        ai.tt.clear()
+        latencies = []
+        nodes = 0
+        player = 1
+        for _ in range(moves):
+            start = time.perf_counter()
+            ai.make_move(player)
+            latencies.append(time.perf_counter() - start)
+            nodes += ai.last_search.get("nodes", 0)
+            if board.has_won(player):
+                break
+            player = 2 if player == 1 else 1
+
+        elapsed = sum(latencies)
+        results[str(size)] = {
+            "cells": size * size,
+            "fence_slots": 2 * board.tables.slots,
+            "moves": len(latencies),
+            "mean_latency": elapsed / len(latencies),
+            "p99_latency": percentile(latencies, 0.99),
+            "nodes_per_move": nodes / len(latencies),
+            "nodes_per_second": nodes / elapsed if elapsed else 0.0,
+            "tables_bytes": tables_bytes,
+            "search_peak_bytes": search_peak,
+        }
+    return results
+
+
+def print_scaling(results):
+    """Prints scaling results as a table."""
+    print(f"{'size':>5s} {'slots':>6s} {'moves':>6s} {'mean':>10s} {'p99':>10s} {'nodes/move':>11s} "
+          f"{'nodes/s':>9s} {'tables':>9s} {'search':>9s}")
+    for size, result in results.items():
+        print(f"{size + 'x' + size:>5s} {result['fence_slots']:6d} {result['moves']:6d} "
+              f"{result['mean_latency'] * 1000:8.1f}ms {result['p99_latency'] * 1000:8.1f}ms "
+              f"{result['nodes_per_move']:11.0f} {result['nodes_per_second']:9.0f} "
+              f"{result['tables_bytes'] / 1024:7.0f}kB {result['search_peak_bytes'] / 1024:7.0f}kB")
+
+
+def compare(current, baseline, threshold=0.10):
+    """
+    Compares benchmark results with a stored baseline. The speed compared is
+    the inverse of the median latency, which is less sensitive to a noisy
+    machine than the mean throughput.
+
+    Args:
+        current (dict): Output of run_benchmarks.
+        baseline (dict): Earlier output of run_benchmarks.
+        threshold (float): Largest allowed relative drop in speed.
+
+    Returns:
+        list: (key, baseline median ops/sec, current median ops/sec, relative change, regressed)
+        for every benchmark present in both; regressed is True when the speed
+        dropped by more than threshold.
+    """
+    rows = []
+    for key, result in current["results"].items():
+        if key not in baseline["results"]:
+            continue
+        before = 1 / baseline["results"][key]["p50"]
+        after = 1 / result["p50"]
+        change = after / before - 1
+        rows.append((key, before, after, change, change < -threshold))
+    return rows
+
+
+def print_results(results):
+    """Prints benchmark results as a table."""
+    print(f"{'benchmark':34s} {'ops/s':>12s} {'nodes/s':>10s} {'p50':>10s} {'p99':>10s}")
+    for key, result in results["results"].items():
+        nodes = f"{result['nodes_per_second']:10.0f}" if result["nodes_per_second"] else f"{'-':>10s}"
+        print(f"{key:34s} {result['ops_per_second']:12.1f} {nodes} "
+              f"{result['p50'] * 1e6:8.1f}us {result['p99'] * 1e6:8.1f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Engine hot-path benchmarks and regression gate")
+    parser.add_argument("--benchmark", action="append", choices=sorted(BENCHMARKS), help="run only these")
+    parser.add_argument("--position", action="append", choices=sorted(POSITIONS), help="use only these positions")
+    parser.add_argument("--samples", type=int, default=30)
+    parser.add_argument("--output", metavar="PATH", help="save the results as JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="fail if a benchmark regressed against this JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative drop in median speed")
+    parser.add_argument("--scaling", metavar="SIZES",
+                        help='comma-separated board sizes, e.g. "5,9,13,17": measure the scaling instead')
+    parser.add_argument("--moves", type=int, default=8, help="moves searched per size with --scaling")
+    parser.add_argument("--depth", type=int, default=3, help="search depth with --scaling")
+    parser.add_argument("--fences", type=int, default=10, help="fences per player with --scaling")
+    args = parser.parse_args()
+
+    if args.scaling:
+        scaling = run_scaling([int(size) for size in args.scaling.split(",")], args.fences, args.moves, args.depth)
+        print_scaling(scaling)
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(scaling, file, indent=2)
+        sys.exit(0)
+
+    results = run_benchmarks(args.benchmark, args.position, args.samples)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = 0
+        print(f"\nCompared with {args.compare} (threshold {args.threshold:.0%}):")
+        for key, before, after, change, regressed in compare(results, baseline, args.threshold):
+            regressions += regressed
+            print(f"{key:34s} {before:12.1f} -> {after:12.1f} ({change:+.1%}){'  REGRESSION' if regressed else ''}")
+        if regressions:
+            print(f"{regressions} benchmark(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
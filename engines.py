@@ -0,0 +1,25 @@
+from ai import AI
+from mcts import MCTS
+
+# Engines selectable by name; all of them expose make_move(player) and close()
+ENGINES = {
+    "minimax": AI,
+    "mcts": MCTS,
+}
+
+
+def create_engine(name, board, **options):
+    """
+    Creates the AI backend selected by configuration.
+
+    Args:
+        name (str): Engine name, a key of ENGINES.
+        board (QuoridorBoard): The board the engine plays on.
+        **options: Keyword arguments passed to the engine's constructor.
+
+    Returns:
+        AI or MCTS: The engine instance.
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine '{name}', expected one of: {', '.join(sorted(ENGINES))}")
+    return ENGINES[name](board, **options)
@@ -0,0 +1,144 @@
+from functools import lru_cache
+
+from quoridor_board import NORTH, SOUTH, WEST, EAST, UNREACHABLE, get_board_tables
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; callers check HAS_NUMPY and fall back to the board
+    np = None
+
+HAS_NUMPY = np is not None
+
+
+@lru_cache(maxsize=None)
+def get_kernel_tables(size: int):
+    """
+    Returns the per-size NumPy tables of the kernel: for every fence slot, the
+    four cells it touches and the direction bit it blocks on each of them.
+
+    Args:
+        size (int): Board size.
+
+    Returns:
+        tuple: (edge_cells, edge_bits), both int arrays of shape (slots, 4).
+    """
+    tables = get_board_tables(size)
+    edge_cells = np.array([[cell for cell, _ in edges] for edges in tables.fence_edges], dtype=np.intp)
+    edge_bits = np.array([[bit for _, bit in edges] for edges in tables.fence_edges], dtype=np.uint8)
+    return edge_cells, edge_bits
+
+
+def batch_fence_distances(board, slots):
+    """
+    Computes both players' shortest-path lengths for a batch of candidate
+    fences in one vectorized pass.
+
+    Every candidate gets its own copy of the blocked-edge grid with the
+    candidate's edges added, and a breadth-first wavefront is expanded from
+    each player's goal row over the whole (2 * candidates, size, size) stack
+    one layer at a time, until every pawn is reached or no cell is added.
+    The candidates are not checked for overlap with placed fences.
+
+    Args:
+        board (QuoridorBoard): Current position.
+        slots (list): Fence slot indices to evaluate.
+
+    Returns:
+        tuple: (player1_distances, player2_distances, disconnected) arrays of
+        length len(slots). Distances are UNREACHABLE where the fence cuts a
+        player off, which is also flagged in disconnected.
+    """
+    size = board.size
+    count = len(slots)
+    edge_cells, edge_bits = get_kernel_tables(size)
+    slots = np.asarray(slots, dtype=np.intp)
+
+    # Blocked-edge masks per candidate, with the candidate's own four edges added
+    blocked = np.empty((count, size * size), dtype=np.uint8)
+    blocked[:] = np.asarray(board.blocked, dtype=np.uint8)
+    rows = np.repeat(np.arange(count), 4)
+    blocked[rows, edge_cells[slots].ravel()] |= edge_bits[slots].ravel()
+
+    # Stack the batch twice: first half searched from player 1's goal row, second from player 2's
+    blocked = np.concatenate((blocked, blocked)).reshape(2 * count, size, size)
+    open_north = (blocked & NORTH) == 0
+    open_south = (blocked & SOUTH) == 0
+    open_west = (blocked & WEST) == 0
+    open_east = (blocked & EAST) == 0
+
+    reached = np.zeros((2 * count, size, size), dtype=bool)
+    reached[:count, board.goal_row(1), :] = True
+    reached[count:, board.goal_row(2), :] = True
+    distances = np.full((2 * count, size, size), UNREACHABLE, dtype=np.int32)
+    distances[reached] = 0
+
+    # Cells whose distance decides the answer: each player's pawn
+    (x1, y1), (x2, y2) = board.player_positions[1], board.player_positions[2]
+    pawn_y = np.concatenate((np.full(count, y1), np.full(count, y2)))
+    pawn_x = np.concatenate((np.full(count, x1), np.full(count, x2)))
+    batch = np.arange(2 * count)
+
+    frontier = reached.copy()
+    layer = 0
+    while not reached[batch, pawn_y, pawn_x].all():
+        layer += 1
+        grown = np.zeros_like(frontier)
+        # A cell joins the wavefront if a frontier neighbour can step into it
+        grown[:, :-1, :] |= frontier[:, 1:, :] & open_north[:, 1:, :]
+        grown[:, 1:, :] |= frontier[:, :-1, :] & open_south[:, :-1, :]
+        grown[:, :, :-1] |= frontier[:, :, 1:] & open_west[:, :, 1:]
+        grown[:, :, 1:] |= frontier[:, :, :-1] & open_east[:, :, :-1]
+        grown &= ~reached
+        if not grown.any():
+            break
+        distances[grown] = layer
+        reached |= grown
+        frontier = grown
+
+    pawn_distances = distances[batch, pawn_y, pawn_x]
+    player1_distances, player2_distances = pawn_distances[:count], pawn_distances[count:]
+    disconnected = (player1_distances >= UNREACHABLE) | (player2_distances >= UNREACHABLE)
+    return player1_distances, player2_distances, disconnected
+
+
+def scalar_fence_distances(board, slots):
+    """
+    Reference implementation of batch_fence_distances: places every candidate
+    on the board with the incremental distance repair and removes it again.
+
+    Args:
+        board (QuoridorBoard): Current position.
+        slots (list): Fence slot indices to evaluate.
+
+    Returns:
+        tuple: (player1_distances, player2_distances, disconnected) lists.
+    """
+    player1_distances, player2_distances, disconnected = [], [], []
+    for slot in slots:
+        repaired = board.add_fence_slot(slot)
+        player1 = board.distance_to_goal(1)
+        player2 = board.distance_to_goal(2)
+        board.remove_fence_slot(slot, repaired)
+        player1_distances.append(player1)
+        player2_distances.append(player2)
+        disconnected.append(player1 >= UNREACHABLE or player2 >= UNREACHABLE)
+    return player1_distances, player2_distances, disconnected
+
+
+if __name__ == "__main__":
+    import time
+    from parallel_search import benchmark_board
+
+    board = benchmark_board()
+    conflicts = board.tables.fence_conflicts
+    candidates = [slot for slot in range(2 * board.tables.slots) if not board.fence_mask & conflicts[slot]]
+    for name, kernel in (("numpy batch", batch_fence_distances), ("incremental loop", scalar_fence_distances)):
+        if kernel is batch_fence_distances and not HAS_NUMPY:
+            print(f"{name}: NumPy is not installed")
+            continue
+        start = time.perf_counter()
+        for _ in range(100):
+            result = kernel(board, candidates)
+        elapsed = (time.perf_counter() - start) / 100
+        print(f"{name}: {len(candidates)} candidates in {elapsed * 1000:.2f} ms, "
+              f"{sum(map(bool, result[2]))} disconnecting")
@@ -0,0 +1,325 @@
+import argparse
+import json
+import os
+import random
+import struct
+import time
+import zlib
+
+from positions import decode_state, encode_state, record_size
+from quoridor_board import QuoridorBoard
+
+LOG_MAGIC = b"QLOG"
+LOG_VERSION = 2
+# File header: magic, version, board size, fences per player, padded to 16 bytes
+LOG_HEADER = struct.Struct("<4sHHH6x")
+# Action record: the acting player (1 or 2, which doubles as the record tag)
+# and the action code (see QuoridorBoard.encode_action)
+ACTION_RECORD = struct.Struct("<BH")
+# Checkpoint record: tag, ply, CRC-32 of the action records since the previous
+# checkpoint and of the encoded position, and the Zobrist hash of the
+# position; the encoded position follows (see positions.encode_state)
+CHECKPOINT_TAG = 0xC0
+CHECKPOINT_RECORD = struct.Struct("<BIIQ")
+
+
+class GameLogWriter:
+    """
+    Append-only game log: a 16-byte header, then one 3-byte record per action
+    and, every checkpoint_every actions, a checkpoint record holding the
+    position and a checksum of it and of the actions before it. The first record is a
+    checkpoint of the starting position, so a log can start anywhere.
+
+    Records are flushed as they are appended, so a crashed game loses at most
+    the record being written; checkpoints are also synced to disk. Opening an
+    existing log resumes it after its last complete record (see GameLogReader).
+
+    Attributes:
+        path (str): Log file.
+        size (int): Board size of the game.
+        plies (int): Actions in the log.
+        checkpoint_every (int): Actions between two checkpoints.
+    """
+
+    def __init__(self, path, board, checkpoint_every=16):
+        """
+        Opens a log for appending, creating it if needed.
+
+        Args:
+            path (str): Log file.
+            board (QuoridorBoard): Board of the game. A new log starts from its
+                position; when resuming, the board must already be in the log's
+                final position (see GameLogReader.replay).
+            checkpoint_every (int): Actions between two checkpoints.
+        """
+        self.path = path
+        self.size = board.size
+        self.checkpoint_every = checkpoint_every
+        self.history_length = len(board.history)  # Board actions logged so far
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            reader = GameLogReader(path)
+            if reader.size != board.size:
+                raise ValueError(f"Log of a {reader.size}x{reader.size} game, the board is {board.size}x{board.size}")
+            if reader.final_state() != board.state:
+                raise ValueError("The board is not in the log's final position")
+            self.plies = len(reader)
+            self.crc = reader.pending_crc
+            self.since_checkpoint = self.plies - reader.checkpoints[-1][0]
+            self.file = open(path, "r+b")
+            self.file.seek(reader.length)
+            self.file.truncate()  # Drop a record torn by a crash
+        else:
+            self.plies = 0
+            self.crc = 0
+            self.since_checkpoint = 0
+            self.file = open(path, "wb")
+            self.file.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, board.size, board.fences_per_player))
+            self.write_checkpoint(board)
+
+    def write_action(self, player, code):
+        """
+        Appends one action.
+
+        Args:
+            player (int): Player who acted.
+            code (int): Encoded action (see QuoridorBoard.encode_action).
+        """
+        data = ACTION_RECORD.pack(player, code)
+        self.file.write(data)
+        self.file.flush()
+        self.crc = zlib.crc32(data, self.crc)
+        self.plies += 1
+        self.since_checkpoint += 1
+
+    def write_checkpoint(self, board):
+        """Appends a checkpoint of the board's position and syncs the file to disk."""
+        position = encode_state(board.state)
+        self.file.write(CHECKPOINT_RECORD.pack(CHECKPOINT_TAG, self.plies, zlib.crc32(position, self.crc), board.hash))
+        self.file.write(position)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.crc = 0
+        self.since_checkpoint = 0
+
+    def sync(self, board):
+        """
+        Appends the actions applied to the board since the previous call (or
+        since the log was opened), read from its undo history, then a
+        checkpoint if one is due.
+
+        Args:
+            board (QuoridorBoard): The game's board, with its actions applied.
+        """
+        history = board.history
+        if len(history) < self.history_length:
+            raise ValueError("Actions were undone on the board; an append-only log cannot record that")
+        for index in range(self.history_length, len(history)):
+            entry = history[index]
+            player = entry[1]
+            if entry[0] == "move":
+                # A move's destination is the cell the next move of the same pawn started
+                # from, or its cell now; a pawn move's code is that cell
+                code = next((later[2] for later in history[index + 1:] if later[0] == "move" and later[1] == player),
+                            board.pawn_cells[player])
+            else:
+                code = board.size * board.size + entry[2]
+            self.write_action(player, code)
+        self.history_length = len(history)
+        if self.since_checkpoint >= self.checkpoint_every:
+            self.write_checkpoint(board)
+
+    def close(self):
+        """Flushes and closes the file."""
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GameLogReader:
+    """
+    Reads a game log written by GameLogWriter. The whole log is parsed at
+    once (a game is a few hundred bytes); a record cut short by a crash at
+    the end of the file is ignored.
+
+    Attributes:
+        path (str): Log file.
+        size (int): Board size of the game.
+        fences (int): Fences each player started with.
+        actions (list): (player, action code) per ply.
+        checkpoints (list): (ply, Zobrist hash, GameState) per checkpoint, in ply order.
+        pending_crc (int): CRC-32 of the actions after the last checkpoint.
+        length (int): Bytes of the complete records, header included.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Log file.
+
+        Raises:
+            ValueError: If the file is not a game log or a checksum does not match.
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, version, self.size, self.fences = LOG_HEADER.unpack_from(data)
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            raise ValueError("Not a game log (or an unsupported version)")
+
+        position_size = record_size(self.size)
+        self.actions = []
+        self.checkpoints = []
+        crc = 0
+        offset = LOG_HEADER.size
+        while offset < len(data):
+            tag = data[offset]
+            if tag in (1, 2):
+                if offset + ACTION_RECORD.size > len(data):
+                    break
+                self.actions.append(ACTION_RECORD.unpack_from(data, offset))
+                crc = zlib.crc32(data[offset:offset + ACTION_RECORD.size], crc)
+                offset += ACTION_RECORD.size
+            elif tag == CHECKPOINT_TAG:
+                end = offset + CHECKPOINT_RECORD.size + position_size
+                if end > len(data):
+                    break
+                _, ply, checksum, key = CHECKPOINT_RECORD.unpack_from(data, offset)
+                crc = zlib.crc32(data[offset + CHECKPOINT_RECORD.size:end], crc)
+                if ply != len(self.actions) or checksum != crc:
+                    raise ValueError(f"{path}: checksum mismatch at ply {ply}")
+                state = decode_state(data, self.size, offset + CHECKPOINT_RECORD.size)
+                self.checkpoints.append((ply, key, state))
+                crc = 0
+                offset = end
+            else:
+                raise ValueError(f"{path}: unknown record at byte {offset}")
+        if not self.checkpoints:
+            raise ValueError(f"{path}: no starting position")
+        self.pending_crc = crc
+        self.length = offset
+
+    def __len__(self):
+        """Returns the number of actions (plies) in the log."""
+        return len(self.actions)
+
+    def new_board(self):
+        """Returns a board of the log's size and fence count, in the starting position of the log."""
+        board = QuoridorBoard(size=self.size, fences=self.fences)
+        board.restore(self.checkpoints[0][2])
+        return board
+
+    def replay(self, board, ply, from_ply=None):
+        """
+        Brings a board to the position after a number of plies, through the
+        board's make and unmake: backwards with unmake while the undo history
+        reaches, otherwise forwards from the nearest checkpoint (or from the
+        board's current position, when that is closer).
+
+        Args:
+            board (QuoridorBoard): Board of the log's size.
+            ply (int): Plies played in the position wanted (0 to len(self)).
+            from_ply (int, optional): Ply the board is at now; None restores a
+                checkpoint whatever the board holds.
+
+        Returns:
+            QuoridorBoard: The board, in the position after ply plies.
+        """
+        if not 0 <= ply <= len(self.actions):
+            raise ValueError(f"Ply {ply} is outside the log (0 to {len(self.actions)})")
+        if from_ply is not None and ply <= from_ply <= ply + len(board.history):
+            for _ in range(from_ply - ply):
+                board.unmake()
+            return board
+
+        checkpoint_ply, _, state = next(checkpoint for checkpoint in reversed(self.checkpoints)
+                                        if checkpoint[0] <= ply)
+        if from_ply is None or from_ply > ply or from_ply < checkpoint_ply:
+            board.restore(state)
+            from_ply = checkpoint_ply
+        for player, code in self.actions[from_ply:ply]:
+            kind, target = board.decode_action(code)
+            if kind == "move":
+                board.make_pawn_move(player, target)
+            elif not board.make_fence(*target, player):
+                raise ValueError(f"{self.path}: illegal fence {target} at ply {from_ply}")
+            from_ply += 1
+        return board
+
+    def final_state(self):
+        """Returns the GameState after the last action."""
+        return self.replay(self.new_board(), len(self.actions)).state
+
+    def verify(self):
+        """
+        Replays the whole game from its start and checks every checkpoint's
+        position and hash, and that every pawn move was legal.
+
+        Returns:
+            int: Plies verified.
+
+        Raises:
+            ValueError: At the first action or checkpoint that does not match.
+        """
+        board = self.new_board()
+        if board.hash != self.checkpoints[0][1]:
+            raise ValueError(f"{self.path}: position mismatch at the starting checkpoint")
+        checkpoints = iter(self.checkpoints[1:])
+        checkpoint = next(checkpoints, None)
+        for ply, (player, code) in enumerate(self.actions, 1):
+            kind, target = board.decode_action(code)
+            if kind == "move":
+                if not board.move_pawn(player, target):
+                    raise ValueError(f"{self.path}: illegal pawn move {target} at ply {ply - 1}")
+            elif not board.make_fence(*target, player):
+                raise ValueError(f"{self.path}: illegal fence {target} at ply {ply - 1}")
+            if checkpoint is not None and checkpoint[0] == ply:
+                if board.hash != checkpoint[1] or board.state != checkpoint[2]:
+                    raise ValueError(f"{self.path}: position mismatch at the checkpoint of ply {ply}")
+                checkpoint = next(checkpoints, None)
+        return len(self.actions)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect, verify and replay game logs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    show = subparsers.add_parser("show", help="print the game state after a ply as JSON")
+    show.add_argument("log")
+    show.add_argument("--ply", type=int, help="plies played (default: the whole game)")
+    verify = subparsers.add_parser("verify", help="replay the whole game and check every checkpoint")
+    verify.add_argument("log")
+    bench = subparsers.add_parser("bench", help="time random seeks against replaying from the start")
+    bench.add_argument("log")
+    bench.add_argument("--seeks", type=int, default=200)
+    args = parser.parse_args()
+
+    reader = GameLogReader(args.log)
+    if args.command == "show":
+        ply = len(reader) if args.ply is None else args.ply
+        print(json.dumps(reader.replay(reader.new_board(), ply).state.to_json()))
+    elif args.command == "verify":
+        print(f"{reader.verify()} plies, {len(reader.checkpoints)} checkpoints: OK")
+    else:
+        rng = random.Random(0)
+        targets = [rng.randint(0, len(reader)) for _ in range(args.seeks)]
+        board = reader.new_board()
+        start = time.perf_counter()
+        current = None
+        for ply in targets:
+            reader.replay(board, ply, current)
+            current = ply
+        seek_time = (time.perf_counter() - start) / args.seeks
+        start = time.perf_counter()
+        for ply in targets:
+            board = reader.new_board()
+            for player, code in reader.actions[:ply]:
+                kind, target = board.decode_action(code)
+                if kind == "move":
+                    board.make_pawn_move(player, target)
+                else:
+                    board.make_fence(*target, player)
+        full_time = (time.perf_counter() - start) / args.seeks
+        print(f"{len(reader)} plies: seek {seek_time * 1e6:.0f}us, replay from the start {full_time * 1e6:.0f}us")
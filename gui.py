@@ -1,14 +1,27 @@
 import pygame
+import argparse
 import json
 import os
+import threading
 import time
+from state_channel import DEFAULT_ADDRESS, StateSubscriber
+
+# Posted by the listener thread when a new game state arrives; carries it as event.state
+STATE_EVENT = pygame.USEREVENT + 1
 
 class QuoridorGame:
     """
     GUI class for rendering the Quoridor board and handling visual updates
-    based on the current game state stored in a JSON file.
+    based on the game state pushed by the game through the state channel
+    (or, optionally, polled from a JSON snapshot file).
+
+    The window is redrawn only when something happens: a listener thread turns
+    every state change into a pygame event, and the main loop blocks on the
+    event queue. The grid and its labels are pre-rendered once, and a state
+    change redraws only the cells, walls and sidebar it touched.
     """
-    def __init__(self, window_size=700, grid_size=9):
+    def __init__(self, window_size=700, grid_size=9, channel_address=DEFAULT_ADDRESS, snapshot_path=None,
+                 fps=60):
         """
         Initializes the graphical interface for the game board, including grid,
         player visuals, wall thickness, and display window.
@@ -16,12 +29,19 @@ class QuoridorGame:
         Args:
             window_size (int): Pixel dimension of the window width and height.
             grid_size (int): Number of grid cells (default is 9 for Quoridor).
+            channel_address (str): Unix socket the game publishes its state on.
+            snapshot_path (str, optional): Poll this JSON snapshot file instead
+                of using the channel.
+            fps (int): Maximum number of redraws per second; state changes
+                arriving faster are merged into one frame.
         """
         self.window_size = window_size
         self.grid_size = grid_size
         self.cell_size = window_size // grid_size
         self.player_radius = self.cell_size // 3
         self.wall_thickness = 10
+        self.sidebar_width = 250
+        self.fps = fps
         self.white = (255, 255, 255)
         self.black = (0, 0, 0)
         self.red = (200, 0, 0)
@@ -30,29 +50,76 @@ class QuoridorGame:
         # Initialize player positions and previous positions
         self.last_player1_pos = None
         self.last_player2_pos = None
+        self.state = None  # Game state currently on screen
+        self.dirty = []  # Screen rectangles to redraw in the next frame
+
+        self.snapshot_path = snapshot_path
+        self.channel = StateSubscriber(channel_address) if snapshot_path is None else None
+        self.running = False
 
         # Initialize Pygame
         pygame.init()
-        self.screen = pygame.display.set_mode((self.window_size + 250, self.window_size))
+        self.screen = pygame.display.set_mode((self.window_size + self.sidebar_width, self.window_size))
         pygame.display.set_caption("Quoridor Game")
+        self.label_font = pygame.font.Font(None, 24)
+        self.sidebar_font = pygame.font.Font(None, 30)
+        self.clock = pygame.time.Clock()
+
+        # Empty board with the grid and labels, blitted back wherever something moved away
+        self.background = pygame.Surface(self.screen.get_size())
+        self.background.fill(self.white)
+        self.draw_grid(self.background)
+        self.sidebar_rect = pygame.Rect(self.window_size, 0, self.sidebar_width, self.window_size)
 
-    def read_game_state(self):
+    def read_game_state(self, timeout=1.0):
         """
-        Reads the game state from the game_state.json file. If the file does
-        not exist or is corrupted, returns None to signal the need for
-        initialization.
+        Waits up to timeout seconds for the game state pushed through the
+        channel and returns the latest one. In snapshot mode, sleeps and then
+        reads the snapshot file instead. Returns None if no game state is
+        available, to signal the need for initialization.
+
+        Args:
+            timeout (float): Seconds to wait for a state change.
 
         Returns:
-            dict or None: Parsed game state or None if unavailable.
+            dict or None: Latest game state or None if unavailable.
         """
-        if not os.path.exists("game_state.json"):
+        if self.channel is not None:
+            self.channel.receive(timeout)
+            return self.channel.state
+
+        time.sleep(timeout)
+        if not os.path.exists(self.snapshot_path):
             return None
         try:
-            with open("game_state.json", "r") as file:
+            with open(self.snapshot_path, "r") as file:
                 return json.load(file)
         except (FileNotFoundError, json.JSONDecodeError):
             return None
 
+    def listen(self):
+        """
+        Listener thread: waits for game states and posts a STATE_EVENT with a
+        copy of every new one, which wakes up the main loop.
+        """
+        last_state = None
+        while self.running:
+            game_state = self.read_game_state(timeout=0.5)
+            if game_state != last_state:
+                last_state = json.loads(json.dumps(game_state))  # Copy, the channel updates its state in place
+                pygame.event.post(pygame.event.Event(STATE_EVENT, state=last_state))
+
+    def cell_rect(self, position):
+        """Returns the screen rectangle of a board cell."""
+        x, y = position
+        return pygame.Rect(x * self.cell_size, y * self.cell_size, self.cell_size, self.cell_size)
+
+    def wall_rect(self, x, y, orientation):
+        """Returns the screen rectangle covered by a wall."""
+        if orientation == "H":
+            return pygame.Rect(x * self.cell_size, y * self.cell_size + self.cell_size - self.wall_thickness, self.cell_size * 2, self.wall_thickness)
+        return pygame.Rect(x * self.cell_size + self.cell_size - self.wall_thickness, y * self.cell_size, self.wall_thickness, self.cell_size * 2)
+
     def draw_split_circle(self, position):
         """
         Renders a split-colored circle to represent both players standing on
@@ -72,21 +139,23 @@ class QuoridorGame:
             [(center_x, center_y - radius), (center_x, center_y + radius), (center_x + radius, center_y)]
         )
 
-    def draw_grid(self):
+    def draw_grid(self, surface=None):
         """
         Draws the board grid and labels with row and column numbers.
+
+        Args:
+            surface (pygame.Surface, optional): Surface to draw on; defaults to the screen.
         """
-        font = pygame.font.Font(None, 24)
+        surface = self.screen if surface is None else surface
 
         for i in range(self.grid_size + 1):
-            pygame.draw.line(self.screen, self.black, (0, i * self.cell_size), (self.window_size, i * self.cell_size), 3)
-            pygame.draw.line(self.screen, self.black, (i * self.cell_size, 0), (i * self.cell_size, self.window_size), 3)
+            pygame.draw.line(surface, self.black, (0, i * self.cell_size), (self.window_size, i * self.cell_size), 3)
+            pygame.draw.line(surface, self.black, (i * self.cell_size, 0), (i * self.cell_size, self.window_size), 3)
 
             if i < self.grid_size:
-                row_text = font.render(str(i), True, self.black)
-                self.screen.blit(row_text, (5, i * self.cell_size + self.cell_size // 3))
-                col_text = font.render(str(i), True, self.black)
-                self.screen.blit(col_text, (i * self.cell_size + self.cell_size // 3, 5))
+                label = self.label_font.render(str(i), True, self.black)
+                surface.blit(label, (5, i * self.cell_size + self.cell_size // 3))
+                surface.blit(label, (i * self.cell_size + self.cell_size // 3, 5))
 
     def draw_player(self, position, color):
         """
@@ -110,10 +179,8 @@ class QuoridorGame:
             y (int): Y-coordinate on the grid.
             orientation (str): 'H' for horizontal, 'V' for vertical.
         """
-        if orientation == "H":
-            pygame.draw.rect(self.screen, self.black, (x * self.cell_size, y * self.cell_size + self.cell_size - self.wall_thickness, self.cell_size * 2, self.wall_thickness))
-        elif orientation == "V":
-            pygame.draw.rect(self.screen, self.black, (x * self.cell_size + self.cell_size - self.wall_thickness, y * self.cell_size, self.wall_thickness, self.cell_size * 2))
+        if orientation in ("H", "V"):
+            pygame.draw.rect(self.screen, self.black, self.wall_rect(x, y, orientation))
 
     def draw_wall_count(self, player1_walls, player2_walls):
         """
@@ -124,80 +191,118 @@ class QuoridorGame:
             player1_walls (int): Walls left for Player 1.
             player2_walls (int): Walls left for Player 2.
         """
-        font = pygame.font.Font(None, 30)
-        pygame.draw.rect(self.screen, self.white, (self.window_size, 0, 250, self.window_size))
+        pygame.draw.rect(self.screen, self.white, self.sidebar_rect)
 
-        player1_text = font.render(f"Player 1 Walls: {player1_walls}", True, self.red)
+        player1_text = self.sidebar_font.render(f"Player 1 Walls: {player1_walls}", True, self.red)
         self.screen.blit(player1_text, (self.window_size + 20, 50))
 
-        player2_text = font.render(f"Player 2 Walls: {player2_walls}", True, self.blue)
+        player2_text = self.sidebar_font.render(f"Player 2 Walls: {player2_walls}", True, self.blue)
         self.screen.blit(player2_text, (self.window_size + 20, 100))
 
+    def apply_state(self, game_state):
+        """
+        Makes a new game state the one on screen and marks the regions it
+        changed as dirty: the cells the pawns left and entered, the new walls
+        and the sidebar. A new game (or the first state) redraws everything.
+
+        Args:
+            game_state (dict or None): New game state.
+        """
+        old_state, self.state = self.state, game_state
+        if game_state is None or old_state is None:
+            self.dirty = [self.screen.get_rect()]
+            return
+
+        old_walls = {tuple(wall) for wall in old_state["walls"]}
+        new_walls = {tuple(wall) for wall in game_state["walls"]}
+        if not old_walls <= new_walls:
+            self.dirty = [self.screen.get_rect()]  # Walls removed: the game restarted
+            return
+
+        for player in ("player1", "player2"):
+            old_position = old_state["player_positions"][player]
+            new_position = game_state["player_positions"][player]
+            if old_position != new_position:
+                self.dirty.append(self.cell_rect(old_position))
+                self.dirty.append(self.cell_rect(new_position))
+        for wall in new_walls - old_walls:
+            self.dirty.append(self.wall_rect(*wall))
+        if old_state["walls_remaining"] != game_state["walls_remaining"]:
+            self.dirty.append(self.sidebar_rect)
+
+    def render(self):
+        """
+        Redraws the dirty regions from the cached background, the walls and the
+        pawns, and pushes only those regions to the display.
+        """
+        if not self.dirty:
+            return
+
+        state = self.state
+        for rect in self.dirty:
+            self.screen.set_clip(rect)
+            self.screen.blit(self.background, rect, rect)
+            if state is None:
+                continue
+
+            for x, y, orientation in state["walls"]:
+                if rect.colliderect(self.wall_rect(x, y, orientation)):
+                    self.draw_wall(x, y, orientation)
+
+            player1_pos = tuple(state["player_positions"]["player1"])
+            player2_pos = tuple(state["player_positions"]["player2"])
+            if player1_pos == player2_pos:
+                self.draw_split_circle(player1_pos)
+            else:
+                self.draw_player(player1_pos, self.red)
+                self.draw_player(player2_pos, self.blue)
+
+            if rect.colliderect(self.sidebar_rect):
+                self.draw_wall_count(state["walls_remaining"]["player_1"], state["walls_remaining"]["player_2"])
+        self.screen.set_clip(None)
+
+        if state is not None:
+            self.last_player1_pos = state["player_positions"]["player1"]
+            self.last_player2_pos = state["player_positions"]["player2"]
+        pygame.display.update(self.dirty)
+        self.dirty = []
+
     def update_game_state(self):
         """
-        Main loop to update the GUI by polling the game state JSON file. 
-        Redraws the board, players, and walls based on changes.
+        Main loop of the GUI. Blocks until a window event or a state change
+        arrives, handles every pending event, then redraws the dirty regions at
+        most fps times per second.
         """
-        running = True
-        last_state = None
-        self.screen.fill(self.white)
-
-        while running:
-            self.draw_grid()
-            game_state = self.read_game_state()
-
-            if game_state and game_state != last_state:
-                last_state = game_state
-                print("New game state loaded:", game_state)
-
-                player1_pos = game_state["player_positions"]["player1"]
-                player2_pos = game_state["player_positions"]["player2"]
-
-                if self.last_player1_pos != player1_pos:
-                    if self.last_player1_pos:
-                        self.draw_player(self.last_player1_pos, self.white)
-                    if player1_pos == player2_pos:
-                        self.draw_split_circle(player1_pos)
-                        self.last_player1_pos = player1_pos
-                        self.last_player2_pos = player2_pos
-                    else:
-                        self.draw_player(player1_pos, self.red)
-                        self.draw_player(player2_pos, self.blue)
-                        self.last_player1_pos = player1_pos
-
-                if self.last_player2_pos != player2_pos:
-                    if self.last_player2_pos:
-                        self.draw_player(self.last_player2_pos, self.white)
-                    if player1_pos == player2_pos:
-                        self.draw_split_circle(player1_pos)
-                        self.last_player1_pos = player1_pos
-                        self.last_player2_pos = player2_pos
-                    else:
-                        self.draw_player(player1_pos, self.red)
-                        self.draw_player(player2_pos, self.blue)
-                        self.last_player2_pos = player2_pos
-
-                for wall in game_state["walls"]:
-                    x1, y1, orientation = wall
-                    self.draw_wall(x1, y1, orientation)
-
-                self.draw_wall_count(game_state["walls_remaining"]["player_1"], game_state["walls_remaining"]["player_2"])
-
-            elif not game_state:
-                self.screen.fill(self.white)
-                self.draw_grid()
-                self.last_player1_pos = None
-                self.last_player2_pos = None
-
-            pygame.display.flip()
-            time.sleep(1)
-
-            for event in pygame.event.get():
+        self.running = True
+        listener = threading.Thread(target=self.listen, daemon=True)
+        listener.start()
+        self.apply_state(None)
+
+        while self.running:
+            events = [pygame.event.wait()] + pygame.event.get()
+            for event in events:
                 if event.type == pygame.QUIT:
-                    running = False
-
+                    self.running = False
+                elif event.type == STATE_EVENT:
+                    self.apply_state(event.state)
+                elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                    self.dirty = [self.screen.get_rect()]
+
+            self.render()
+            self.clock.tick(self.fps)
+
+        listener.join()
+        if self.channel is not None:
+            self.channel.close()
         pygame.quit()
 
 if __name__ == "__main__":
-    game = QuoridorGame()
-    game.update_game_state()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Quoridor board display")
+    parser.add_argument("--channel", default=DEFAULT_ADDRESS, help="Unix socket the game publishes its state on")
+    parser.add_argument("--snapshot", metavar="PATH", help="poll this JSON snapshot file instead of the channel")
+    parser.add_argument("--fps", type=int, default=60, help="maximum redraws per second")
+    parser.add_argument("--size", type=int, default=9, help="cells per side, as the game was started with")
+    args = parser.parse_args()
+
+    game = QuoridorGame(grid_size=args.size, channel_address=args.channel, snapshot_path=args.snapshot, fps=args.fps)
+    game.update_game_state()
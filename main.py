@@ -1,106 +1,188 @@
-from quoridor_board import QuoridorBoard
-import time
-from ai import AI
-
-class MainGame:
-    """
-    Manages the core game loop and handles the interaction between
-    the player and the AI opponent. This class serves as the entry
-    point for gameplay and maintains game state, including move
-    handling, fence placement, and restart logic.
-    """
-
-    def __init__(self, window_size=700, grid_size=9):
-        """
-        Initializes the game logic with a new board, an AI instance,
-        and player-specific attributes such as remaining fences.
-
-        Args:
-            window_size (int): Size of the GUI window (unused here).
-            grid_size (int): Size of the game grid (9 by default).
-        """
-        self.board = QuoridorBoard()
-        self.ai = AI(self.board)
-        self.fences_player1 = 10  # Counter for fences placed by player 1
-
-    def main(self):
-        """
-        Executes the main gameplay loop, alternating turns between the player and AI.
-        Includes logic for pawn movement, fence placement, and game restart.
-        """
-        time.sleep(1)
-        self.board.update_gui_game_state()
-        time.sleep(1)
-
-
-        while True:  
-            current_player = 1  # Player 1 starts
-
-            while True:
-                if current_player == 1:
-                    print(f"Player {current_player}'s turn.")
-
-                    while True:
-                        move_type = input("Move the pawn (M), place a fence (F), or restart game (RESTART)? ").strip().upper()
-                        if move_type == 'RESTART':
-                            print("Restarting the game...")
-                            return  # When the player enters "RESTART" the program terminates and must be manually restarted.  
-
-                        if move_type == 'M':
-                            try:
-                                x, y = map(int, input("Enter the X and Y coordinates of the new position (separated by space): ").split())
-                                if self.board.is_valid_pawn_move(current_player, (x, y)):
-                                    self.board.move_pawn(current_player, (x, y))
-                                    print("Valid move!")
-                                    self.board.update_gui_game_state()  # Save the state in JSON
-
-                                    break
-                                else:
-                                    print("Invalid move, try again.")
-                            except ValueError:
-                                print("Enter valid coordinates (e.g., '4 3').")
-
-                        elif move_type == 'F':
-                            if (self.fences_player1 > 0):  # Check if the user has remaining walls
-                                try:
-                                    x, y = map(int, input("Enter the X and Y coordinates for the fence: ").split())
-                                    orientation = input("Enter orientation (H for horizontal, V for vertical): ").strip().upper()
-
-                                    if self.board.place_fence(x, y, orientation, current_player):
-                                        self.fences_player1 -= 1  # Decrease fence counter for player 1
-                                        print("Fence placed successfully!")
-                                        self.board.update_gui_game_state()  # Save the state in JSON
-                                        break
-                                    else:
-                                        print("Invalid fence position, try again.")
-                                except ValueError:
-                                    print("Enter valid coordinates.")
-                            else:
-                                print("You have already placed 10 fences. You cannot place more.")
-                        else:
-                            print("Invalid input. Use 'M' to move or 'F' to place a fence.")
-                else:
-                    # Let the AI compute and execute its move
-                    self.ai.make_move(current_player)
-                    self.board.update_gui_game_state()  # Save the state in the JSON file
-
-                # Check for victory condition based on goal row
-
-                if self.board.player_positions[current_player][1] == (8 if current_player == 1 else 0):
-                    print(f"Player {current_player} wins!")
-                    self.board.update_gui_game_state()  # Save the final state in the JSON file
-                    break
-
-                # Switch turn between players
-                current_player = 2 if current_player == 1 else 1
-
-
-            restart = input("Press any key to exit").strip().upper()
-            if restart:
-                print("Goodbye!")
-                exit()
-
-if __name__ == "__main__":
-    main_game = MainGame()
-    main_game.main()
-
+from quoridor_board import QuoridorBoard
+import argparse
+import os
+from engines import ENGINES, create_engine
+from telemetry import TelemetryLog, configure_logging
+from state_channel import DEFAULT_ADDRESS, StatePublisher
+from pondering import Ponderer
+from game_log import GameLogReader, GameLogWriter
+
+class MainGame:
+    """
+    Manages the core game loop and handles the interaction between
+    the player and the AI opponent. This class serves as the entry
+    point for gameplay and maintains game state, including move
+    handling, fence placement, and restart logic.
+    """
+
+    def __init__(self, window_size=700, grid_size=9, engine="minimax", publisher=None, snapshot_path=None,
+                 ponder=False, fences=10, log_path=None, resume=False, **engine_options):
+        """
+        Initializes the game logic with a new board, an AI instance,
+        and player-specific attributes such as remaining fences.
+
+        Args:
+            window_size (int): Size of the GUI window (unused here).
+            grid_size (int): Size of the game grid (9 by default).
+            fences (int): Fences each player starts with (10 by default).
+            engine (str): AI backend, "minimax" or "mcts" (see engines.ENGINES).
+            publisher (StatePublisher, optional): Channel pushing the game state to the GUI.
+            snapshot_path (str, optional): JSON file the game state is also saved to.
+            ponder (bool): Let the minimax AI search during the player's turn (see pondering).
+            log_path (str, optional): Append-only game log the actions are streamed to (see game_log).
+            resume (bool): Continue the game recorded in log_path, with its board size and
+                fences, instead of starting a new one.
+            **engine_options: Keyword arguments for the engine's constructor.
+        """
+        reader = None
+        if log_path is not None and os.path.exists(log_path):
+            if resume:
+                reader = GameLogReader(log_path)
+                grid_size, fences = reader.size, reader.fences
+            else:
+                os.remove(log_path)  # A new game starts a new log
+
+        self.board = QuoridorBoard(publisher=publisher, snapshot_path=snapshot_path, size=grid_size, fences=fences)
+        if reader is not None:
+            reader.replay(self.board, len(reader))
+            print(f"Resumed the game after {len(reader)} plies.")
+        self.game_log = GameLogWriter(log_path, self.board) if log_path is not None else None
+        self.ai = create_engine(engine, self.board, **engine_options)
+        self.ponderer = Ponderer(self.ai) if ponder else None
+
+    def record_actions(self):
+        """Streams the actions played since the previous call to the game log, if any."""
+        if self.game_log is not None:
+            self.game_log.sync(self.board)
+
+    def main(self):
+        """
+        Executes the main gameplay loop, alternating turns between the player and AI.
+        Includes logic for pawn movement, fence placement, and game restart.
+        """
+        self.board.update_gui_game_state()  # A GUI connecting later receives this as a snapshot
+        for player in (1, 2):
+            if self.board.has_won(player):
+                print(f"Player {player} has already won this game.")
+                return
+        if self.ponderer is not None and self.board.turn == 1:
+            self.ponderer.start(2)  # The AI thinks while the player does
+
+        while True:  
+            current_player = self.board.turn  # Player 1 starts, unless a resumed game says otherwise
+
+            while True:
+                if current_player == 1:
+                    print(f"Player {current_player}'s turn.")
+
+                    while True:
+                        move_type = input("Move the pawn (M), place a fence (F), or restart game (RESTART)? ").strip().upper()
+                        if move_type == 'RESTART':
+                            print("Restarting the game...")
+                            if self.ponderer is not None:
+                                self.ponderer.stop()
+                            return  # When the player enters "RESTART" the program terminates and must be manually restarted.  
+
+                        if move_type == 'M':
+                            try:
+                                x, y = map(int, input("Enter the X and Y coordinates of the new position (separated by space): ").split())
+                                if self.board.is_valid_pawn_move(current_player, (x, y)):
+                                    self.board.move_pawn(current_player, (x, y))
+                                    print("Valid move!")
+                                    self.board.update_gui_game_state()  # Save the state in JSON
+                                    self.record_actions()
+                                    break
+                                else:
+                                    print("Invalid move, try again.")
+                            except ValueError:
+                                print("Enter valid coordinates (e.g., '4 3').")
+
+                        elif move_type == 'F':
+                            if (self.board.fences_left[1] > 0):  # Check if the user has remaining walls
+                                try:
+                                    x, y = map(int, input("Enter the X and Y coordinates for the fence: ").split())
+                                    orientation = input("Enter orientation (H for horizontal, V for vertical): ").strip().upper()
+
+                                    if self.board.place_fence(x, y, orientation, current_player):
+                                        print("Fence placed successfully!")
+                                        self.board.update_gui_game_state()  # Save the state in JSON
+                                        self.record_actions()
+                                        break
+                                    else:
+                                        print("Invalid fence position, try again.")
+                                except ValueError:
+                                    print("Enter valid coordinates.")
+                            else:
+                                print(f"You have already placed {self.board.fences_per_player} fences. You cannot place more.")
+                        else:
+                            print("Invalid input. Use 'M' to move or 'F' to place a fence.")
+                else:
+                    # Let the AI compute and execute its move
+                    if self.ponderer is not None:
+                        self.ponderer.promote(self.board)
+                    self.ai.make_move(current_player)
+                    self.board.update_gui_game_state()  # Save the state in the JSON file
+                    self.record_actions()
+                    if self.ponderer is not None:
+                        self.ponderer.start(current_player)
+
+                # Check for victory condition based on goal row
+
+                if self.board.has_won(current_player):
+                    if self.ponderer is not None:
+                        self.ponderer.stop()
+                    print(f"Player {current_player} wins!")
+                    self.board.update_gui_game_state()  # Save the final state in the JSON file
+                    break
+
+                # Switch turn between players
+                current_player = 2 if current_player == 1 else 1
+
+
+            restart = input("Press any key to exit").strip().upper()
+            if restart:
+                print("Goodbye!")
+                exit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play Quoridor against the AI")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="minimax", help="AI backend")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="DEBUG also shows the board and search details")
+    parser.add_argument("--telemetry", metavar="PATH", help="append one JSON line of search statistics per AI move")
+    parser.add_argument("--channel", default=DEFAULT_ADDRESS, help="Unix socket the GUI connects to")
+    parser.add_argument("--snapshot", metavar="PATH", help="also save the game state to this JSON file")
+    parser.add_argument("--book", metavar="PATH", help="opening book for the minimax engine (see opening_book)")
+    parser.add_argument("--ponder", action="store_true", help="let the minimax engine think during your turn")
+    parser.add_argument("--size", type=int, default=9, help="cells per side of the board")
+    parser.add_argument("--fences", type=int, default=10, help="fences each player starts with")
+    parser.add_argument("--log", metavar="PATH", help="stream the game's actions to this game log")
+    parser.add_argument("--resume", action="store_true", help="continue the game recorded in --log")
+    args = parser.parse_args()
+    if args.book and args.engine != "minimax":
+        parser.error("--book needs the minimax engine")
+    configure_logging(args.log_level)
+    engine_options = {"book": args.book} if args.book else {}
+
+    telemetry_log = TelemetryLog(args.telemetry) if args.telemetry else None
+    publisher = StatePublisher(args.channel)
+    main_game = None
+    try:
+        main_game = MainGame(grid_size=args.size, fences=args.fences, engine=args.engine, telemetry_log=telemetry_log,
+                             publisher=publisher, snapshot_path=args.snapshot, log_path=args.log, resume=args.resume,
+                             ponder=args.ponder and args.engine == "minimax", **engine_options)
+        main_game.main()
+    finally:
+        if main_game is not None and main_game.ponderer is not None:
+            main_game.ponderer.stop()
+            stats = main_game.ponderer.stats()
+            print(f"Pondering: {stats['hits']}/{stats['hits'] + stats['misses']} ponder hits")
+        if main_game is not None:
+            main_game.ai.close()
+        publisher.close()
+        if main_game is not None and main_game.game_log is not None:
+            main_game.game_log.close()
+        if main_game is not None and args.book:
+            stats = main_game.ai.book.stats()
+            print(f"Opening book: {stats['hits']}/{stats['probes']} hits, {stats['time_saved']:.1f}s of search saved")
+
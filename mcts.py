@@ -0,0 +1,392 @@
+import math
+import random
+import time
+from array import array
+
+from telemetry import logger
+
+
+class MCTS:
+    """
+    Monte Carlo Tree Search engine for Quoridor, usable in place of AI: it
+    shares the make_move(player) contract and plays through the same board.
+
+    Nodes live in a fixed-capacity pool of flat arrays (one entry per node and
+    field), and the children of a node are allocated as one contiguous block.
+    Playouts follow the shortest paths from the board's distance grids, with
+    occasional fences across the opponent's path. The tree is kept between
+    turns and re-rooted at the position reached after the opponent's reply.
+
+    Attributes:
+        board (QuoridorBoard): The board the engine plays and simulates on.
+        policy (str): Selection policy, "uct" or "puct".
+        last_search (dict): Statistics of the latest search (playouts, playouts/sec, ...).
+    """
+
+    def __init__(self, board, time_limit=1.0, playout_limit=None, policy="puct", exploration=1.4,
+                 max_nodes=200000, max_playout_plies=60, fence_probability=0.15, seed=None,
+                 telemetry_log=None):
+        """
+        Initializes the engine.
+
+        Args:
+            board (QuoridorBoard): The board to play on.
+            time_limit (float): Seconds to search per move (None for no limit).
+            playout_limit (int): Playouts per move (None for no limit).
+            policy (str): "uct" (UCB1) or "puct" (UCB with shortest-path priors).
+            exploration (float): Exploration constant of the selection policy.
+            max_nodes (int): Capacity of the node pool.
+            max_playout_plies (int): Playouts longer than this are scored from the
+                remaining path lengths instead of being played out.
+            fence_probability (float): Chance a playout ply places a fence.
+            seed (int, optional): Seed of the playout random generator.
+            telemetry_log (TelemetryLog, optional): Log that receives one record per
+                move played by make_move.
+        """
+        if time_limit is None and playout_limit is None:
+            raise ValueError("MCTS needs a time limit or a playout limit")
+        self.board = board
+        self.time_limit = time_limit
+        self.playout_limit = playout_limit
+        self.policy = policy
+        self.exploration = exploration
+        self.max_nodes = max_nodes
+        self.max_playout_plies = max_playout_plies
+        self.fence_probability = fence_probability
+        self.random = random.Random(seed)
+        self.telemetry_log = telemetry_log
+        self.last_search = {}
+
+        # Node pool
+        self.parent = array('i', [-1]) * max_nodes
+        self.action = array('i', [-1]) * max_nodes  # Encoded action leading to the node
+        self.mover = array('b', [0]) * max_nodes  # Player who played that action
+        self.visits = array('I', [0]) * max_nodes
+        self.wins = array('d', [0.0]) * max_nodes  # Summed reward for the mover
+        self.prior = array('f', [0.0]) * max_nodes
+        self.first_child = array('i', [-1]) * max_nodes
+        self.child_count = array('H', [0]) * max_nodes
+        self.illegal = array('b', [0]) * max_nodes
+        self.hash = array('Q', [0]) * max_nodes
+        self.node_count = 0
+        self.root = -1
+
+    def new_node(self, parent, action, mover, prior):
+        """Takes the next free node of the pool and initializes it."""
+        node = self.node_count
+        self.node_count += 1
+        self.parent[node] = parent
+        self.action[node] = action
+        self.mover[node] = mover
+        self.visits[node] = 0
+        self.wins[node] = 0.0
+        self.prior[node] = prior
+        self.first_child[node] = -1
+        self.child_count[node] = 0
+        self.illegal[node] = 0
+        self.hash[node] = 0
+        return node
+
+    def reset_tree(self, player):
+        """Discards the whole tree and starts a new one at the current position."""
+        self.node_count = 0
+        self.root = self.new_node(-1, -1, 2 if player == 1 else 1, 1.0)
+        self.hash[self.root] = self.board.hash
+
+    def reuse_tree(self, player):
+        """
+        Re-roots the tree at the current position if it was reached during an
+        earlier search (usually a grandchild of the previous root). The rest of
+        the pool stays allocated until the tree is reset.
+
+        Returns:
+            bool: True if the tree was kept.
+        """
+        if self.root < 0 or self.node_count > self.max_nodes * 3 // 4:
+            return False
+
+        key = self.board.hash
+        frontier = [self.root]
+        for _ in range(3):
+            next_frontier = []
+            for node in frontier:
+                if self.hash[node] == key and self.mover[node] != player:
+                    self.root = node
+                    self.parent[node] = -1
+                    return True
+                start = self.first_child[node]
+                if start >= 0:
+                    next_frontier.extend(range(start, start + self.child_count[node]))
+            frontier = next_frontier
+        return False
+
+    def pawn_moves(self, player):
+        """Returns the cells the player's pawn can move to, jumps included (see QuoridorBoard.pawn_targets)."""
+        return self.board.pawn_targets(player)
+
+    def path_fences(self, player):
+        """Returns the free fence slots that block an edge of the player's shortest path."""
+        board = self.board
+        tables = board.tables
+        path = board.path_to_goal(player)
+        slots = []
+        for cell, next_cell in zip(path, path[1:]):
+            for bit, neighbour in tables.neighbours[cell]:
+                if neighbour == next_cell:
+                    for slot in tables.edge_fences[cell][bit]:
+                        if not board.fence_mask & tables.fence_conflicts[slot] and slot not in slots:
+                            slots.append(slot)
+                    break
+        return slots
+
+    def expand(self, node, player):
+        """
+        Creates the children of a node for the player to move: every pawn step
+        and every free fence across the opponent's shortest path. The priors
+        favour steps along the player's own shortest path.
+        """
+        board = self.board
+        distances = board.distances[player]
+        here = distances[board.pawn_cells[player]]
+        cells = board.size * board.size
+
+        candidates = []
+        for cell in self.pawn_moves(player):
+            candidates.append((cell, 1.0 if distances[cell] < here else 0.2))
+        if board.fences_left[player] > 0:
+            opponent = 2 if player == 1 else 1
+            for slot in self.path_fences(opponent):
+                candidates.append((cells + slot, 0.3))
+
+        if self.node_count + len(candidates) > self.max_nodes or not candidates:
+            return False
+
+        total = sum(prior for _, prior in candidates)
+        self.first_child[node] = self.node_count
+        self.child_count[node] = len(candidates)
+        for code, prior in candidates:
+            self.new_node(node, code, player, prior / total)
+        return True
+
+    def select_child(self, node):
+        """Returns the legal child with the best UCT/PUCT score, or -1 if there is none."""
+        start = self.first_child[node]
+        parent_visits = self.visits[node]
+        best, best_score = -1, -float('inf')
+
+        if self.policy == "uct":
+            log_visits = math.log(parent_visits + 1)
+            for child in range(start, start + self.child_count[node]):
+                if self.illegal[child]:
+                    continue
+                visits = self.visits[child]
+                if visits == 0:
+                    return child  # Visit every child once first
+                score = self.wins[child] / visits + self.exploration * math.sqrt(log_visits / visits)
+                if score > best_score:
+                    best, best_score = child, score
+        else:
+            scale = self.exploration * math.sqrt(parent_visits + 1)
+            for child in range(start, start + self.child_count[node]):
+                if self.illegal[child]:
+                    continue
+                visits = self.visits[child]
+                value = self.wins[child] / visits if visits else 0.5
+                score = value + scale * self.prior[child] / (1 + visits)
+                if score > best_score:
+                    best, best_score = child, score
+        return best
+
+    def apply(self, code, player):
+        """Applies an encoded action with the board's make API; False if the fence is illegal."""
+        board = self.board
+        cells = board.size * board.size
+        if code < cells:
+            board.make_cell_move(player, code)  # A pawn move's code is its destination cell
+            return True
+        return board.make_fence_slot(code - cells, player)
+
+    def has_won(self, player):
+        """Returns True if the player's pawn stands on their goal row."""
+        return self.board.has_won(player)
+
+    def playout(self, player):
+        """
+        Plays the game on from the current position with the shortest-path
+        policy and undoes it afterwards.
+
+        Args:
+            player (int): Player to move.
+
+        Returns:
+            float: Reward for player 1 (1 win, 0 loss, in between when the
+            playout was cut off and scored from the path lengths).
+        """
+        board = self.board
+        plies = 0
+        reward = None
+        while plies < self.max_playout_plies:
+            opponent = 2 if player == 1 else 1
+            played = False
+            if board.fences_left[player] > 0 and self.random.random() < self.fence_probability:
+                slots = self.path_fences(opponent)
+                if slots:
+                    played = board.make_fence_slot(self.random.choice(slots), player)
+            if not played:
+                # Step along a shortest path, breaking ties at random
+                distances = board.distances[player]
+                moves = self.pawn_moves(player)
+                best = min(distances[cell] for cell in moves)
+                cell = self.random.choice([cell for cell in moves if distances[cell] == best])
+                board.make_cell_move(player, cell)
+            plies += 1
+
+            if self.has_won(player):
+                reward = 1.0 if player == 1 else 0.0
+                break
+            player = opponent
+
+        if reward is None:
+            # Cut off: the shorter remaining path (counting the move) is ahead
+            lead = board.distance_to_goal(2) - board.distance_to_goal(1) + (0.5 if player == 1 else -0.5)
+            reward = 1.0 / (1.0 + math.exp(-lead))
+
+        for _ in range(plies):
+            board.unmake()
+        return reward
+
+    def run_playout(self, player):
+        """Runs one selection, expansion, playout and backpropagation step from the root."""
+        board = self.board
+        node = self.root
+        path = [node]
+        applied = 0
+        to_move = player
+        reward = None
+
+        while True:
+            if self.first_child[node] < 0:
+                if self.visits[node] == 0 and node != self.root:
+                    break  # Play out from a fresh leaf before expanding it
+                if not self.expand(node, to_move):
+                    break
+
+            child = self.select_child(node)
+            while child >= 0 and not self.apply(self.action[child], to_move):
+                self.illegal[child] = 1  # Fence would cut a player off
+                child = self.select_child(node)
+            if child < 0:
+                break
+
+            applied += 1
+            node = child
+            path.append(node)
+            if not self.hash[node]:
+                self.hash[node] = board.hash
+            if self.has_won(to_move):
+                reward = 1.0 if to_move == 1 else 0.0
+                break
+            to_move = 2 if to_move == 1 else 1
+
+        if reward is None:
+            reward = self.playout(to_move)
+        for _ in range(applied):
+            board.unmake()
+
+        for node in path:
+            self.visits[node] += 1
+            self.wins[node] += reward if self.mover[node] == 1 else 1.0 - reward
+
+    def search(self, player, time_limit=None, playout_limit=None):
+        """
+        Runs playouts from the current position until the time or playout
+        budget is used up.
+
+        Args:
+            player (int): Player to move.
+            time_limit (float, optional): Seconds to search; defaults to self.time_limit.
+            playout_limit (int, optional): Playouts to run; defaults to self.playout_limit.
+
+        Returns:
+            tuple: (action, win rate) for the most visited root action, or
+            (None, 0.0) if the player has no action.
+        """
+        time_limit = self.time_limit if time_limit is None else time_limit
+        playout_limit = self.playout_limit if playout_limit is None else playout_limit
+        start = time.perf_counter()
+        deadline = start + time_limit if time_limit is not None else None
+
+        reused = self.reuse_tree(player)
+        if not reused:
+            self.reset_tree(player)
+        reused_visits = self.visits[self.root]
+
+        playouts = 0
+        while playout_limit is None or playouts < playout_limit:
+            if deadline is not None and playouts % 16 == 0 and time.perf_counter() >= deadline:
+                break
+            self.run_playout(player)
+            playouts += 1
+
+        elapsed = time.perf_counter() - start
+        self.last_search = {
+            "playouts": playouts,
+            "time": elapsed,
+            "playouts_per_second": playouts / elapsed if elapsed else 0.0,
+            "nodes": self.node_count,
+            "reused_tree": reused,
+            "reused_visits": reused_visits,
+        }
+
+        best, best_visits = -1, -1
+        start_child = self.first_child[self.root]
+        if start_child >= 0:
+            for child in range(start_child, start_child + self.child_count[self.root]):
+                if not self.illegal[child] and self.visits[child] > best_visits:
+                    best, best_visits = child, self.visits[child]
+        if best < 0:
+            return None, 0.0
+
+        self.last_search["win_rate"] = self.wins[best] / max(self.visits[best], 1)
+        return self.board.decode_action(self.action[best]), self.last_search["win_rate"]
+
+    def close(self):
+        """Nothing to release (see AI.close); the tree is freed with the engine."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def make_move(self, player):
+        """Searches and plays the best action for the player on the board."""
+        start = time.perf_counter()
+        action, win_rate = self.search(player)
+        if action is None:
+            logger.info(f"MCTS has no valid moves for player {player}")
+            return
+
+        if action[0] == "move":
+            self.board.move_pawn(player, action[1])
+            logger.info(f"MCTS moved to {action[1]} (win rate {win_rate:.2f}, "
+                        f"{self.last_search['playouts_per_second']:.0f} playouts/s).")
+        else:
+            x, y, orientation = action[1]
+            self.board.place_fence(x, y, orientation, player)
+            logger.info(f"MCTS placed fence at ({x}, {y}, {orientation}) (win rate {win_rate:.2f}, "
+                        f"{self.last_search['playouts_per_second']:.0f} playouts/s).")
+
+        # Move the root to the position after our action, so the next search reuses it
+        key = self.board.hash
+        start_child = self.first_child[self.root]
+        if start_child >= 0:
+            for child in range(start_child, start_child + self.child_count[self.root]):
+                if self.hash[child] == key:
+                    self.root = child
+                    break
+
+        if self.telemetry_log is not None:
+            record = dict(self.last_search, engine="mcts", player=player, ply=len(self.board.history),
+                          action=[action[0], list(action[1])], wall_time=time.perf_counter() - start)
+            self.telemetry_log.write(record)
@@ -0,0 +1,197 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+
+from quoridor_board import QuoridorBoard
+
+BOOK_MAGIC = b"QBK1"
+# File header: magic, board size, number of entries, padded to 16 bytes
+BOOK_HEADER = struct.Struct("<4sHxxQ")
+# Entry: Zobrist hash, encoded action (see QuoridorBoard.encode_action),
+# search depth and score from the side to move's point of view
+BOOK_ENTRY = struct.Struct("<QHBxf")
+
+
+def write_book(path, entries, size=9):
+    """
+    Writes an opening book file: the header followed by the entries sorted by
+    hash, so lookups can binary-search the file.
+
+    Args:
+        path (str): Book file.
+        entries (dict): Zobrist hash -> (encoded action, depth, score).
+        size (int): Board size the hashes were computed for.
+    """
+    with open(path, "wb") as file:
+        file.write(BOOK_HEADER.pack(BOOK_MAGIC, size, len(entries)))
+        for key in sorted(entries):
+            move, depth, score = entries[key]
+            file.write(BOOK_ENTRY.pack(key, move, depth, score))
+
+
+class OpeningBook:
+    """
+    Opening book: precomputed best actions for early positions, stored as a
+    table sorted by Zobrist hash. The file is memory-mapped on the first probe
+    and searched in place, so loading a book costs nothing up front.
+
+    Attributes:
+        path (str): Book file.
+        probes (int): Lookups made.
+        hits (int): Lookups that found the position.
+        time_saved (float): Estimated search seconds saved by the hits
+            (maintained by the AI, see AI.make_move).
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Book file written by write_book.
+        """
+        self.path = path
+        self.file = None
+        self.map = None
+        self.size = None
+        self.count = 0
+        self.probes = 0
+        self.hits = 0
+        self.time_saved = 0.0
+
+    def open(self):
+        """Maps the book file; called by the first probe."""
+        self.file = open(self.path, "rb")
+        magic, self.size, self.count = BOOK_HEADER.unpack(self.file.read(BOOK_HEADER.size))
+        if magic != BOOK_MAGIC:
+            raise ValueError(f"{self.path} is not an opening book")
+        if os.path.getsize(self.path) != BOOK_HEADER.size + self.count * BOOK_ENTRY.size:
+            raise ValueError(f"{self.path} is truncated")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        if self.map is None:
+            self.open()
+        return self.count
+
+    def probe(self, board):
+        """
+        Looks up the board's position.
+
+        Args:
+            board (QuoridorBoard): Position to look up.
+
+        Returns:
+            tuple or None: (action, depth, score) of the book move, or None if
+            the position is not in the book.
+        """
+        if self.map is None:
+            self.open()
+        self.probes += 1
+        if board.size != self.size:
+            return None
+
+        key = board.hash
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry_key, move, depth, score = BOOK_ENTRY.unpack_from(self.map, BOOK_HEADER.size + middle * BOOK_ENTRY.size)
+            if entry_key < key:
+                low = middle + 1
+            elif entry_key > key:
+                high = middle
+            else:
+                self.hits += 1
+                return board.decode_action(move), depth, score
+        return None
+
+    def stats(self):
+        """
+        Returns the book counters.
+
+        Returns:
+            dict: Entries, probes, hits, hit rate and estimated time saved.
+        """
+        return {
+            "entries": self.count,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "time_saved": self.time_saved,
+        }
+
+    def close(self):
+        """Unmaps the file."""
+        if self.map is not None:
+            self.map.close()
+            self.file.close()
+            self.map = None
+
+
+def build_book(plies=4, depth=4, **ai_options):
+    """
+    Builds opening book entries with deep fixed-depth searches. Starting from
+    the initial position, every position reached within plies plies by any
+    pawn move or by the searched best action is searched and stored.
+
+    Args:
+        plies (int): Depth of the opening tree covered by the book.
+        depth (int): Search depth per position.
+        **ai_options: Other AI keyword arguments (fence_pruning, ...).
+
+    Returns:
+        dict: Zobrist hash -> (encoded action, depth, score), for write_book.
+    """
+    from ai import AI  # Imported here so the AI can import this module
+
+    entries = {}
+    frontier = [[]]  # Action sequences leading to the positions of the current ply
+    for ply in range(plies + 1):
+        next_frontier = []
+        for line in frontier:
+            board = QuoridorBoard()
+            ai = AI(board, time_limit=None, max_depth=depth, **ai_options)
+            player = 1
+            for action in line:
+                ai.apply_action(player, action)
+                player = 2 if player == 1 else 1
+            opponent = 2 if player == 1 else 1
+            if board.hash in entries or board.has_won(opponent):
+                continue  # Already in the book, or the game is over
+
+            action, value, reached = ai.search(player)
+            if action is None:
+                continue
+            entries[board.hash] = (action, reached, value)
+            print(f"ply {ply}: {len(entries)} positions, {board.decode_action(action)} "
+                  f"({value:+.1f} at depth {reached})")
+
+            if ply < plies:
+                children = list(board.pawn_targets(player))  # Pawn move codes (see QuoridorBoard.encode_action)
+                if action not in children:
+                    children.append(action)
+                next_frontier.extend(line + [child] for child in children)
+        frontier = next_frontier
+    return entries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect an opening book")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="search the opening positions and write a book")
+    build.add_argument("output")
+    build.add_argument("--plies", type=int, default=4, help="opening plies covered")
+    build.add_argument("--depth", type=int, default=4, help="search depth per position")
+    info = subparsers.add_parser("info", help="print the book move of the initial position")
+    info.add_argument("book")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        entries = build_book(args.plies, args.depth)
+        write_book(args.output, entries)
+        print(f"Wrote {len(entries)} positions to {args.output} in {time.perf_counter() - start:.1f}s")
+    else:
+        book = OpeningBook(args.book)
+        print(json.dumps({"entries": len(book), "initial": book.probe(QuoridorBoard())}))
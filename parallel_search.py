@@ -0,0 +1,216 @@
+import argparse
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+from ai import AI, WIN_SCORE
+from quoridor_board import QuoridorBoard
+from transposition import TranspositionTable
+
+
+def search_worker(index, shm, tt_bytes, ai_options, jobs, results, stop_event):
+    """
+    Entry point of a Lazy SMP worker process. Waits for search jobs and runs
+    them on its own copy of the board, sharing the transposition table.
+
+    Args:
+        index (int): Worker number; selects the move ordering and depth offset.
+        shm (SharedMemory): Block holding the shared transposition table.
+        tt_bytes (int): Memory cap the table was sized with.
+        ai_options (dict): Keyword arguments for the worker's AI.
+        jobs (Queue): Incoming (board, player, time_limit, node_limit, excluded) jobs, None to exit.
+        results (Queue): Outgoing (index, action, value, depth, stats) results.
+        stop_event (Event): Set to ask every worker to stop searching.
+    """
+    tt = TranspositionTable(tt_bytes, buffer=shm.buf)
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+
+            board, player, time_limit, node_limit, excluded = job
+            ai = AI(board, tt=tt, **ai_options)
+            # Worker 0 searches like the single-core AI; the others start one ply
+            # deeper on odd indices and shuffle the root order, so they diverge
+            action, value, depth = ai.search(player, time_limit=time_limit, node_limit=node_limit,
+                                             stop_event=stop_event, excluded=excluded,
+                                             start_depth=1 + index % 2,
+                                             ordering_seed=index if index else None)
+            results.put((index, action, value, depth, ai.last_search))
+    finally:
+        tt.release()
+        shm.close()
+
+
+class LazySMPSearch:
+    """
+    Lazy SMP search: several worker processes search the same root at the same
+    time with different move orderings and depth offsets, and cooperate only
+    through one lock-free transposition table in shared memory. The deepest
+    completed result wins.
+
+    Attributes:
+        workers (int): Number of worker processes.
+        last_search (dict): Combined statistics of the latest search.
+    """
+
+    def __init__(self, workers=2, tt_megabytes=64, time_limit=1.0, node_limit=None, **ai_options):
+        """
+        Allocates the shared table and starts the worker processes.
+
+        Args:
+            workers (int): Number of worker processes.
+            tt_megabytes (float): Memory cap of the shared transposition table.
+            time_limit (float): Default seconds per search.
+            node_limit (int): Default nodes per worker and search (None for no limit).
+            **ai_options: Other AI keyword arguments for the workers (max_depth, fence_pruning, ...).
+        """
+        self.workers = workers
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.last_search = {}
+
+        tt_bytes = int(tt_megabytes * 1024 * 1024)
+        self.shm = shared_memory.SharedMemory(create=True, size=TranspositionTable.buffer_size(tt_bytes))
+        self.stop_event = multiprocessing.Event()
+        self.results = multiprocessing.Queue()
+        self.jobs = []
+        self.processes = []
+        for index in range(workers):
+            jobs = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=search_worker,
+                args=(index, self.shm, tt_bytes, ai_options, jobs, self.results, self.stop_event),
+                daemon=True,
+            )
+            process.start()
+            self.jobs.append(jobs)
+            self.processes.append(process)
+
+    def search(self, board, player, time_limit=None, node_limit=None, excluded=None):
+        """
+        Searches the board's position with every worker and returns the deepest
+        completed result.
+
+        Args:
+            board (QuoridorBoard): Position to search (copied to the workers).
+            player (int): Player to move.
+            time_limit (float, optional): Seconds to search; defaults to self.time_limit.
+            node_limit (int, optional): Nodes per worker; defaults to self.node_limit.
+            excluded (set, optional): Action codes that must not be chosen at the root.
+
+        Returns:
+            tuple: (action code, value, depth), like AI.search.
+        """
+        time_limit = self.time_limit if time_limit is None else time_limit
+        node_limit = self.node_limit if node_limit is None else node_limit
+        start = time.perf_counter()
+        self.stop_event.clear()
+        for jobs in self.jobs:
+            jobs.put((board, player, time_limit, node_limit, excluded))
+
+        results = []
+        for _ in range(self.workers):
+            result = self.results.get()
+            results.append(result)
+            if abs(result[2]) >= WIN_SCORE:
+                self.stop_event.set()  # Forced result, the other workers can stop
+        elapsed = time.perf_counter() - start
+
+        # Deepest completed iteration first, lower worker index on ties
+        results.sort(key=lambda result: (-result[3], result[0]))
+        _, action, value, depth, _ = results[0]
+
+        nodes = sum(result[4].get("nodes", 0) for result in results)
+        counters = {}
+        for result in results:
+            for key in ("leaves", "path_searches", "distance_searches", "kernel_batches", "tt_hits", "tt_misses"):
+                counters[key] = counters.get(key, 0) + result[4].get(key, 0)
+        probes = counters["tt_hits"] + counters["tt_misses"]
+        depth_times = {}
+        for result in results:
+            for reached, at in result[4].get("depth_times", []):
+                depth_times[reached] = min(at, depth_times.get(reached, at))
+        self.last_search = {
+            "depth": depth,
+            "value": value,
+            "nodes": nodes,
+            "time": elapsed,
+            "nodes_per_second": nodes / elapsed if elapsed else 0.0,
+            **counters,
+            "tt_hit_rate": counters["tt_hits"] / probes if probes else 0.0,
+            "depth_times": sorted(depth_times.items()),
+            "worker_depths": [result[3] for result in sorted(results)],
+        }
+        return action, value, depth
+
+    def close(self):
+        """Stops the workers and frees the shared memory block."""
+        for jobs in self.jobs:
+            jobs.put(None)
+        for process in self.processes:
+            process.join()
+        self.shm.close()
+        self.shm.unlink()
+
+
+def benchmark_board():
+    """
+    Builds the midgame position used by the scaling benchmark.
+
+    Returns:
+        QuoridorBoard: Board with a few fences placed and player 2 to move.
+    """
+    board = QuoridorBoard()
+    for x, y, orientation, player in [(3, 2, 'H', 1), (4, 5, 'H', 2), (2, 4, 'V', 1), (5, 3, 'V', 2)]:
+        board.make_fence(x, y, orientation, player)
+    board.make_pawn_move(1, (4, 1))
+    board.make_pawn_move(2, (4, 7))
+    board.make_pawn_move(1, (4, 2))
+    return board
+
+
+def benchmark_scaling(max_workers, time_limit=5.0, **ai_options):
+    """
+    Runs the benchmark position with 1 to max_workers workers and prints the
+    nodes/sec and time-to-depth scaling.
+
+    Args:
+        max_workers (int): Largest worker count to measure.
+        time_limit (float): Seconds per search.
+        **ai_options: AI keyword arguments for the workers.
+
+    Returns:
+        list: One dict of search statistics per worker count.
+    """
+    board = benchmark_board()
+    rows = []
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        search = LazySMPSearch(workers, time_limit=time_limit, **ai_options)
+        try:
+            action, value, depth = search.search(board, board.turn)
+        finally:
+            search.close()
+
+        stats = search.last_search
+        stats["workers"] = workers
+        rows.append(stats)
+        if baseline is None:
+            baseline = stats["nodes_per_second"] or 1.0
+
+        times = ", ".join(f"d{reached}={at:.2f}s" for reached, at in stats["depth_times"])
+        print(f"{workers:2d} workers: {stats['nodes_per_second']:10.0f} nodes/s "
+              f"(x{stats['nodes_per_second'] / baseline:.2f}), depth {depth}, "
+              f"best {board.decode_action(action) if action is not None else None} | {times}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lazy SMP scaling benchmark")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--time", type=float, default=5.0, help="seconds per search")
+    parser.add_argument("--tt-megabytes", type=float, default=64)
+    args = parser.parse_args()
+    benchmark_scaling(args.workers, time_limit=args.time, tt_megabytes=args.tt_megabytes)
@@ -0,0 +1,207 @@
+import argparse
+import copy
+import threading
+import time
+
+from ai import AI, WIN_SCORE
+from quoridor_board import QuoridorBoard
+
+
+class Ponderer:
+    """
+    Searches during the opponent's turn. As soon as the AI has moved, a
+    background thread predicts the opponent's likely replies and searches the
+    AI's answer to each of them, on its own copy of the board but in the AI's
+    transposition table. When the actual reply arrives, promote stops the
+    thread and, on a ponder hit, hands the pondered result to the AI, whose
+    search then continues from it (see AI.search).
+
+    The thread only checks a stop event between nodes, so stopping it takes
+    at most a few milliseconds, and it never touches the game's board, so
+    the input loop is not blocked. Requires a single-process minimax engine.
+
+    Attributes:
+        ai (AI): Engine whose transposition table and settings are used.
+        replies (int): Predicted replies searched.
+        results (dict): Zobrist hash of a predicted position -> (action, value, depth, seconds).
+        hits (int): Promotions that found the actual position pondered.
+        misses (int): Promotions that did not.
+    """
+
+    def __init__(self, ai, replies=2):
+        """
+        Args:
+            ai (AI): Single-process minimax engine to ponder for.
+            replies (int): Predicted replies searched, most likely first.
+        """
+        if ai.workers > 1:
+            raise ValueError("Pondering needs a single-process search (workers=1)")
+        self.ai = ai
+        self.replies = replies
+        self.results = {}
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, player):
+        """
+        Starts pondering for the AI, playing player, while the opponent thinks.
+
+        Args:
+            player (int): The AI's player; the opponent is the side to move.
+        """
+        self.stop()
+        self.results = {}
+        self.stop_event.clear()
+        board = copy.deepcopy(self.ai.board)  # The game's board stays untouched
+        self.thread = threading.Thread(target=self.run, args=(board, player), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops the pondering thread, if any, and waits for it to finish."""
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def predict_replies(self, ai, opponent):
+        """
+        Ranks the opponent's legal actions by the opponent's heuristic score
+        after them, best first.
+
+        Returns:
+            list: The replies most likely to be played, at most self.replies.
+        """
+        ranked = []
+        for action in ai.get_actions(opponent):
+            if ai.apply_action(opponent, action):
+                ranked.append((ai.heuristic(opponent), action))
+                ai.board.unmake()
+        ranked.sort(key=lambda pair: pair[0], reverse=True)
+        return [action for _, action in ranked[:self.replies]]
+
+    def run(self, board, player):
+        """
+        Body of the pondering thread: deepens the search of every predicted
+        reply one ply per round, so the likeliest replies are never starved,
+        until stopped, max_depth is reached or every reply is decided.
+        """
+        engine = self.ai
+        ai = AI(board, tt=engine.tt, time_limit=None, max_depth=engine.max_depth,
+                fence_pruning=engine.fence_pruning, fence_radius=engine.fence_radius,
+                fence_ordering=engine.fence_ordering, endgame=engine.endgame is not None)
+        opponent = 2 if player == 1 else 1
+        replies = self.predict_replies(ai, opponent)
+        open_replies = list(replies)
+        for depth in range(1, engine.max_depth + 1):
+            for reply in list(open_replies):
+                if self.stop_event.is_set():
+                    return
+                ai.apply_action(opponent, reply)
+                key = board.hash
+                start = time.perf_counter()
+                ai.max_depth = depth
+                action, value, reached = ai.search(player, stop_event=self.stop_event, start_depth=depth)
+                board.unmake()
+                if reached < depth:
+                    return  # Stopped inside the iteration
+                seconds = self.results[key][3] if key in self.results else 0.0
+                self.results[key] = (action, value, reached, seconds + time.perf_counter() - start)
+                if action is None or abs(value) >= WIN_SCORE:
+                    open_replies.remove(reply)
+            if not open_replies:
+                return
+
+    def promote(self, board):
+        """
+        Stops pondering once the opponent has moved and, if the resulting
+        position was pondered, promotes its result to the AI's next search.
+
+        Args:
+            board (QuoridorBoard): The game's board, after the opponent's move.
+
+        Returns:
+            bool: True on a ponder hit.
+        """
+        self.stop()
+        result = self.results.get(board.hash)
+        if result is None:
+            self.misses += 1
+            return False
+        self.hits += 1
+        self.ai.pondered = (board.hash,) + result
+        return True
+
+    def stats(self):
+        """Returns the hit and miss counts and the hit rate."""
+        promotions = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / promotions if promotions else 0.0}
+
+
+def measure_response(think_time=1.0, moves=8, ponder=True, time_limit=1.0):
+    """
+    Plays the AI (player 2) against a scripted opponent that plays its legal
+    move closest to its goal after "thinking" for think_time seconds, like a
+    human at the input prompt, and measures the AI's response time.
+
+    Args:
+        think_time (float): Seconds the opponent waits before each move.
+        moves (int): AI moves measured.
+        ponder (bool): Ponder during the opponent's turns.
+        time_limit (float): The AI's search time per move.
+
+    Returns:
+        dict: Mean and maximum response time, search depths and the ponder statistics.
+    """
+    board = QuoridorBoard()
+    ai = AI(board, time_limit=time_limit)
+    ponderer = Ponderer(ai) if ponder else None
+    times = []
+    depths = []
+    if ponderer is not None:
+        ponderer.start(2)
+    try:
+        for _ in range(moves):
+            time.sleep(think_time)  # The opponent thinks; the GIL is free, as in input()
+            step = min(board.pawn_targets(1), key=board.distances[1].__getitem__)
+            board.make_cell_move(1, step)
+            if board.has_won(1):
+                break
+            if ponderer is not None:
+                ponderer.promote(board)
+
+            start = time.perf_counter()
+            ai.make_move(2)
+            times.append(time.perf_counter() - start)
+            depths.append(ai.last_search.get("depth", 0))
+            if board.has_won(2):
+                break
+            if ponderer is not None:
+                ponderer.start(2)
+    finally:
+        if ponderer is not None:
+            ponderer.stop()
+    return {
+        "moves": len(times),
+        "mean_response": sum(times) / len(times) if times else 0.0,
+        "max_response": max(times, default=0.0),
+        "mean_depth": sum(depths) / len(depths) if depths else 0.0,
+        "ponder": ponderer.stats() if ponderer is not None else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the AI's response time with and without pondering")
+    parser.add_argument("--think-time", type=float, default=1.0, help="seconds the scripted opponent thinks")
+    parser.add_argument("--moves", type=int, default=8, help="AI moves measured")
+    parser.add_argument("--time-limit", type=float, default=1.0, help="AI search seconds per move")
+    args = parser.parse_args()
+
+    for ponder in (False, True):
+        result = measure_response(args.think_time, args.moves, ponder, args.time_limit)
+        label = "pondering" if ponder else "no pondering"
+        print(f"{label:13s} mean response {result['mean_response'] * 1000:7.1f} ms, "
+              f"max {result['max_response'] * 1000:7.1f} ms, mean depth {result['mean_depth']:.1f}"
+              + (f", hit rate {result['ponder']['hit_rate']:.0%}" if ponder else ""))
@@ -0,0 +1,282 @@
+import mmap
+import os
+import struct
+
+from quoridor_board import GameState, QuoridorBoard, get_board_tables
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only CorpusReader.as_array needs it
+    np = None
+
+# Fixed part of an encoded position: both pawn cells (y * size + x), both
+# fence counts (16 bits, as a 17x17 board allows 256 fences per player) and
+# the side to move, padded to 12 bytes. The fence occupancy bitboard follows
+# (see fence_bytes).
+POSITION_HEADER = struct.Struct("<HHHHBxxx")
+
+CORPUS_MAGIC = b"QPOS"
+CORPUS_VERSION = 2
+# File header of a corpus: magic, version, board size, record size, padded to 16 bytes
+CORPUS_HEADER = struct.Struct("<4sHHI4x")
+
+
+def fence_bytes(size: int) -> int:
+    """Returns the bytes of the fence occupancy bitboard of a board size (16 for 9x9)."""
+    return (2 * get_board_tables(size).slots + 7) // 8
+
+
+def record_size(size: int) -> int:
+    """Returns the length of an encoded position of a board size (28 bytes for 9x9)."""
+    return POSITION_HEADER.size + fence_bytes(size)
+
+
+def encode_position(board: QuoridorBoard) -> bytes:
+    """
+    Encodes a board position in the fixed-width binary format.
+
+    Args:
+        board (QuoridorBoard): Position to encode.
+
+    Returns:
+        bytes: record_size(board.size) bytes: pawn cells, fences left, side to
+        move and the fence bitboard (little-endian, one bit per fence slot).
+    """
+    return encode_state(board.state)
+
+
+def encode_state(state: GameState) -> bytes:
+    """Encodes a game state in the fixed-width binary format (see encode_position)."""
+    header = POSITION_HEADER.pack(*state.cells, *state.fences_left, state.turn)
+    return header + state.fence_mask.to_bytes(fence_bytes(state.size), "little")
+
+
+def unpack_position(data, size: int = 9, offset: int = 0) -> tuple:
+    """
+    Reads the fields of an encoded position without building a board.
+
+    Args:
+        data: Buffer holding the position (bytes, memoryview, mmap, ...).
+        size (int): Board size the position was encoded with.
+        offset (int): Start of the position in the buffer.
+
+    Returns:
+        tuple: (player 1 cell, player 2 cell, player 1 fences left,
+        player 2 fences left, side to move, fence mask).
+    """
+    cell1, cell2, left1, left2, turn = POSITION_HEADER.unpack_from(data, offset)
+    start = offset + POSITION_HEADER.size
+    fence_mask = int.from_bytes(data[start:start + fence_bytes(size)], "little")
+    return cell1, cell2, left1, left2, turn, fence_mask
+
+
+def decode_position(data, size: int = 9, offset: int = 0) -> QuoridorBoard:
+    """
+    Builds a board from an encoded position.
+
+    Args:
+        data: Buffer holding the position.
+        size (int): Board size the position was encoded with.
+        offset (int): Start of the position in the buffer.
+
+    Returns:
+        QuoridorBoard: New board in that position, with an empty history.
+    """
+    state = decode_state(data, size, offset)
+    # The starting fence count is not encoded; the larger count left stands in for it
+    board = QuoridorBoard(size=size, fences=max(state.fences_left))
+    board.restore(state)  # Rebuilds the edge masks, distances and hash
+    return board
+
+
+def decode_state(data, size: int = 9, offset: int = 0) -> GameState:
+    """Reads an encoded position as a game state, without building a board (see decode_position)."""
+    cell1, cell2, left1, left2, turn, fence_mask = unpack_position(data, size, offset)
+    return GameState(size, (cell1, cell2), (left1, left2), turn, fence_mask)
+
+
+def state_to_position(state: dict, size: int = 9) -> bytes:
+    """
+    Encodes a game state dict (as built by QuoridorBoard.update_gui_game_state
+    or read back from JSON) in the binary format.
+
+    Args:
+        state (dict): Game state.
+        size (int): Board size.
+
+    Returns:
+        bytes: The encoded position.
+    """
+    return encode_state(GameState.from_json(state, size))
+
+
+def position_to_state(data, size: int = 9, offset: int = 0) -> dict:
+    """
+    Decodes a binary position into the game state dict format.
+
+    Args:
+        data: Buffer holding the position.
+        size (int): Board size the position was encoded with.
+        offset (int): Start of the position in the buffer.
+
+    Returns:
+        dict: Game state, with walls in slot order.
+    """
+    return decode_state(data, size, offset).to_json()
+
+
+class CorpusWriter:
+    """
+    Appends encoded positions to a corpus file: a 16-byte header followed by
+    fixed-width records, so record i lives at a computable offset.
+
+    Attributes:
+        path (str): Corpus file.
+        size (int): Board size of the positions.
+        count (int): Records in the file.
+    """
+
+    def __init__(self, path: str, size: int = 9):
+        """
+        Opens a corpus for appending, creating it if needed.
+
+        Args:
+            path (str): Corpus file.
+            size (int): Board size; must match an existing file's.
+        """
+        self.path = path
+        self.size = size
+        self.record_size = record_size(size)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as file:
+                read_header(file.read(CORPUS_HEADER.size), size)
+            self.file = open(path, "ab")
+        else:
+            self.file = open(path, "wb")
+            self.file.write(CORPUS_HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, size, self.record_size))
+        self.count = (self.file.tell() - CORPUS_HEADER.size) // self.record_size
+
+    def write(self, board: QuoridorBoard):
+        """Appends a board position."""
+        self.write_record(encode_position(board))
+
+    def write_record(self, record: bytes):
+        """Appends an already encoded position."""
+        if len(record) != self.record_size:
+            raise ValueError(f"Record of {len(record)} bytes, expected {self.record_size}")
+        self.file.write(record)
+        self.count += 1
+
+    def close(self):
+        """Flushes and closes the file."""
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_header(data: bytes, size: int = None) -> tuple:
+    """
+    Checks a corpus file header.
+
+    Args:
+        data (bytes): First CORPUS_HEADER.size bytes of the file.
+        size (int, optional): Expected board size.
+
+    Returns:
+        tuple: (board size, record size).
+
+    Raises:
+        ValueError: If the header is not a corpus header of a supported version and size.
+    """
+    magic, version, board_size, stored_record_size = CORPUS_HEADER.unpack(data)
+    if magic != CORPUS_MAGIC or version != CORPUS_VERSION:
+        raise ValueError("Not a position corpus (or an unsupported version)")
+    if size is not None and board_size != size:
+        raise ValueError(f"Corpus holds {board_size}x{board_size} positions, expected {size}x{size}")
+    if stored_record_size != record_size(board_size):
+        raise ValueError("Corpus record size does not match its board size")
+    return board_size, stored_record_size
+
+
+class CorpusReader:
+    """
+    Read-only, memory-mapped view of a corpus file. Records are read straight
+    from the mapping on demand, so a corpus of millions of positions is not
+    loaded into Python objects.
+
+    Attributes:
+        path (str): Corpus file.
+        size (int): Board size of the positions.
+        record_size (int): Bytes per record.
+    """
+
+    def __init__(self, path: str):
+        """
+        Maps a corpus file.
+
+        Args:
+            path (str): Corpus file.
+        """
+        self.path = path
+        self.file = open(path, "rb")
+        self.size, self.record_size = read_header(self.file.read(CORPUS_HEADER.size))
+        length = os.path.getsize(path)
+        self.count = (length - CORPUS_HEADER.size) // self.record_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if length else None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def offset(self, index: int) -> int:
+        """Returns the byte offset of a record."""
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return CORPUS_HEADER.size + index * self.record_size
+
+    def record(self, index: int) -> bytes:
+        """Returns the encoded position of a record."""
+        start = self.offset(index)
+        return self.map[start:start + self.record_size]
+
+    def fields(self, index: int) -> tuple:
+        """Returns the fields of a record, as unpack_position does, without building a board."""
+        return unpack_position(self.map, self.size, self.offset(index))
+
+    def board(self, index: int) -> QuoridorBoard:
+        """Builds the board of a record."""
+        return decode_position(self.map, self.size, self.offset(index))
+
+    def __iter__(self):
+        """Yields the fields of every record, in file order."""
+        for index in range(self.count):
+            yield unpack_position(self.map, self.size, CORPUS_HEADER.size + index * self.record_size)
+
+    def as_array(self):
+        """
+        Returns a zero-copy NumPy structured array over the records, for
+        vectorized analysis of a whole corpus. Requires NumPy.
+        """
+        if np is None:
+            raise RuntimeError("CorpusReader.as_array needs NumPy")
+        dtype = np.dtype([("player1", "<u2"), ("player2", "<u2"), ("fences_left1", "<u2"),
+                          ("fences_left2", "<u2"), ("turn", "u1"), ("pad", "u1", (3,)),
+                          ("fences", "u1", (fence_bytes(self.size),))])
+        if self.map is None:
+            return np.zeros(0, dtype=dtype)
+        return np.frombuffer(self.map, dtype=dtype, count=self.count, offset=CORPUS_HEADER.size)
+
+    def close(self):
+        """Unmaps and closes the file."""
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
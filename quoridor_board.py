@@ -1,9 +1,302 @@
 from collections import deque
-from typing import List, Tuple, Set
+from functools import lru_cache
+import heapq
+import random
+from typing import Dict, List, Tuple, Set
 import time
 import json
 import os
 
+import telemetry
+from telemetry import logger
+
+# Direction bits used in the per-cell blocked-edge masks.
+NORTH = 1  # towards y - 1
+SOUTH = 2  # towards y + 1
+WEST = 4   # towards x - 1
+EAST = 8   # towards x + 1
+
+OPPOSITE = {NORTH: SOUTH, SOUTH: NORTH, WEST: EAST, EAST: WEST}
+PERPENDICULAR = {NORTH: WEST | EAST, SOUTH: WEST | EAST, WEST: NORTH | SOUTH, EAST: NORTH | SOUTH}
+
+# Distance-to-goal value of cells that cannot reach the goal row.
+UNREACHABLE = 1 << 20
+
+# Cells the local search of is_fence_legal may visit before falling back to
+# the exact check.
+LOCAL_SEARCH_LIMIT = 64
+
+
+class BoardTables:
+    """
+    Precomputed lookup tables for the bitboard representation of a board size.
+
+    Cells are indexed as ``y * size + x``. Fence slots are indexed with all
+    horizontal slots first (``y * (size - 1) + x``) followed by all vertical
+    slots, so a set of fences is a single integer with one bit per slot.
+
+    Attributes:
+        size (int): The board size the tables were built for.
+        slots (int): Number of fence slots per orientation.
+        neighbours (list): For every cell, a tuple of (direction bit, neighbour cell).
+        cell_positions (list): For every cell, its (x, y) position.
+        steps (list): For every cell, the tuple of neighbour cells a pawn can step
+            to, indexed by the cell's blocked-edge bits (16 entries per cell).
+        adjacent (list): For every cell, a dict mapping each neighbour cell to
+            the direction bit leading to it.
+        jumps (list): For every cell holding the opponent, a dict mapping the
+            direction bit of the jump to the landing cells, indexed by the
+            opponent cell's blocked-edge bits: the cell straight behind it, or
+            the diagonal side-steps if a fence or the border is in the way.
+        fence_edges (list): For every fence slot, the (cell, direction bit) pairs it blocks.
+        fence_conflicts (list): For every fence slot, a mask of the slots it overlaps or crosses.
+        offsets (dict): Cell index offset of the neighbour in each direction bit.
+        edge_fences (list): For every cell, a dict mapping a direction bit to the
+            fence slots that would block that edge.
+        cell_fences (list): For every cell, the fence slots lying along one of its sides.
+        fence_points (list): For every fence slot, the three lattice points it
+            runs through (ends and middle), indexed ``j * (size + 1) + i`` on the
+            grid of cell corners.
+        border_points (list): For every lattice point, 1 if it lies on the border.
+        zobrist_pawns (dict): Per player, a random 64-bit key for every cell.
+        zobrist_fences (list): A random 64-bit key for every fence slot.
+        zobrist_fences_left (dict): Per player, a random 64-bit key for every fence count.
+        zobrist_turn (int): Key toggled in when player 2 is to move.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.slots = (size - 1) * (size - 1)
+        self.neighbours = []
+        self.cell_positions = [(cell % size, cell // size) for cell in range(size * size)]
+        self.fence_edges = []
+        self.fence_conflicts = []
+        self.offsets = {NORTH: -size, SOUTH: size, WEST: -1, EAST: 1}
+
+        # Fixed seed, so hashes are identical across processes and runs
+        rng = random.Random(size)
+        cells = size * size
+        self.zobrist_pawns = {player: [rng.getrandbits(64) for _ in range(cells)] for player in (1, 2)}
+        self.zobrist_fences = [rng.getrandbits(64) for _ in range(2 * self.slots)]
+        self.zobrist_fences_left = {player: [rng.getrandbits(64) for _ in range(self.slots + 1)] for player in (1, 2)}
+        self.zobrist_turn = rng.getrandbits(64)
+
+        steps = ((NORTH, 0, -1), (SOUTH, 0, 1), (WEST, -1, 0), (EAST, 1, 0))
+        for cell in range(size * size):
+            x, y = cell % size, cell // size
+            self.neighbours.append(tuple(
+                (bit, (y + dy) * size + x + dx)
+                for bit, dx, dy in steps
+                if 0 <= x + dx < size and 0 <= y + dy < size
+            ))
+
+        self.steps = []
+        self.adjacent = []
+        self.jumps = []
+        for cell in range(size * size):
+            neighbours = self.neighbours[cell]
+            self.steps.append([tuple(neighbour for bit, neighbour in neighbours if not walls & bit)
+                               for walls in range(16)])
+            self.adjacent.append({neighbour: bit for bit, neighbour in neighbours})
+            jumps = {}
+            for bit in (NORTH, SOUTH, WEST, EAST):
+                # A pawn moving towards bit onto this cell, over the opponent standing here
+                landings = []
+                for walls in range(16):
+                    beyond = tuple(target for side, target in neighbours if side == bit and not walls & bit)
+                    if not beyond:
+                        # Fence or border behind the opponent: step diagonally instead
+                        beyond = tuple(target for side, target in neighbours
+                                       if side & PERPENDICULAR[bit] and not walls & side)
+                    landings.append(beyond)
+                jumps[bit] = landings
+            self.jumps.append(jumps)
+        self.jump_moves = {}  # (cell, walls, opponent cell, opponent walls) -> pawn targets
+
+        for orientation in ("H", "V"):
+            for y in range(size - 1):
+                for x in range(size - 1):
+                    top_left = y * size + x
+                    if orientation == "H":
+                        # Lies under cells (x, y) and (x + 1, y)
+                        self.fence_edges.append((
+                            (top_left, SOUTH), (top_left + size, NORTH),
+                            (top_left + 1, SOUTH), (top_left + 1 + size, NORTH),
+                        ))
+                        overlapping = [(x - 1, y, "H"), (x, y, "H"), (x + 1, y, "H"), (x, y, "V")]
+                    else:
+                        # Lies right of cells (x, y) and (x, y + 1)
+                        self.fence_edges.append((
+                            (top_left, EAST), (top_left + 1, WEST),
+                            (top_left + size, EAST), (top_left + size + 1, WEST),
+                        ))
+                        overlapping = [(x, y - 1, "V"), (x, y, "V"), (x, y + 1, "V"), (x, y, "H")]
+
+                    mask = 0
+                    for ox, oy, orient in overlapping:
+                        if 0 <= ox < size - 1 and 0 <= oy < size - 1:
+                            mask |= 1 << self.fence_slot(ox, oy, orient)
+                    self.fence_conflicts.append(mask)
+
+        points = size + 1
+        self.fence_points = []
+        for slot in range(2 * self.slots):
+            x, y, orientation = self.slot_to_fence(slot)
+            if orientation == "H":
+                self.fence_points.append(tuple((y + 1) * points + x + step for step in range(3)))
+            else:
+                self.fence_points.append(tuple((y + step) * points + x + 1 for step in range(3)))
+        self.border_points = [int(i in (0, size) or j in (0, size)) for j in range(points) for i in range(points)]
+
+        self.edge_fences = [{} for _ in range(size * size)]
+        self.cell_fences = [[] for _ in range(size * size)]
+        for slot, edges in enumerate(self.fence_edges):
+            for cell, bit in edges:
+                self.edge_fences[cell].setdefault(bit, []).append(slot)
+                if slot not in self.cell_fences[cell]:
+                    self.cell_fences[cell].append(slot)
+
+    def jump_targets(self, cell: int, walls: int, other: int, other_walls: int) -> Tuple[int, ...]:
+        """
+        Returns the pawn targets of a pawn next to the opponent, with the edge
+        between them open: the free steps plus the jump (or the diagonal
+        side-steps) over the opponent. Results are cached, so repeated calls
+        return the same tuple.
+
+        Args:
+            cell (int): Cell of the moving pawn.
+            walls (int): Blocked-edge bits of that cell.
+            other (int): Cell of the opponent, a neighbour of cell.
+            other_walls (int): Blocked-edge bits of the opponent's cell.
+
+        Returns:
+            Tuple[int, ...]: Target cells.
+        """
+        key = (cell, walls, other, other_walls)
+        targets = self.jump_moves.get(key)
+        if targets is None:
+            landings = self.jumps[other][self.adjacent[cell][other]][other_walls]
+            targets = tuple(target for target in self.steps[cell][walls] if target != other) + \
+                tuple(target for target in landings if target != cell)
+            self.jump_moves[key] = targets
+        return targets
+
+    def fence_slot(self, x: int, y: int, orientation: str) -> int:
+        """Returns the bit index of the fence slot at (x, y) with the given orientation."""
+        offset = 0 if orientation == "H" else self.slots
+        return offset + y * (self.size - 1) + x
+
+    def slot_to_fence(self, slot: int) -> Tuple[int, int, str]:
+        """Returns the (x, y, orientation) triple for a fence slot index."""
+        orientation = "H" if slot < self.slots else "V"
+        x, y = (slot % self.slots) % (self.size - 1), (slot % self.slots) // (self.size - 1)
+        return x, y, orientation
+
+
+@lru_cache(maxsize=None)
+def get_board_tables(size: int) -> BoardTables:
+    """Returns the (shared, cached) lookup tables for a board size."""
+    return BoardTables(size)
+
+
+class GameState:
+    """
+    Immutable, hashable snapshot of a position in the board's own
+    representation: pawn cells as y * size + x indices and the fences as the
+    fence-slot bitboard (see BoardTables). It is the value the board hands to
+    its users (QuoridorBoard.state) and takes back (QuoridorBoard.restore);
+    game state dicts are only built from it where the state leaves the
+    process (GUI channel, snapshot file, server replies).
+
+    Attributes:
+        size (int): Board size.
+        cells (Tuple[int, int]): Cells of player 1's and player 2's pawns.
+        fences_left (Tuple[int, int]): Fences left to player 1 and player 2.
+        turn (int): Player to move.
+        fence_mask (int): Bitboard of the placed fences.
+    """
+
+    __slots__ = ("size", "cells", "fences_left", "turn", "fence_mask", "_hash")
+
+    def __init__(self, size: int, cells: Tuple[int, int], fences_left: Tuple[int, int], turn: int,
+                 fence_mask: int):
+        set_field = object.__setattr__
+        set_field(self, "size", size)
+        set_field(self, "cells", tuple(cells))
+        set_field(self, "fences_left", tuple(fences_left))
+        set_field(self, "turn", turn)
+        set_field(self, "fence_mask", fence_mask)
+        set_field(self, "_hash", hash((size, self.cells, self.fences_left, turn, fence_mask)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameState is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("GameState is immutable")
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return (self._hash == other._hash and self.cells == other.cells and self.fence_mask == other.fence_mask
+                and self.fences_left == other.fences_left and self.turn == other.turn and self.size == other.size)
+
+    def __reduce__(self):
+        return GameState, (self.size, self.cells, self.fences_left, self.turn, self.fence_mask)
+
+    def __repr__(self) -> str:
+        return (f"GameState(size={self.size}, cells={self.cells}, fences_left={self.fences_left}, "
+                f"turn={self.turn}, fence_mask={self.fence_mask:#x})")
+
+    def position(self, player: int) -> Tuple[int, int]:
+        """Returns the (x, y) position of a player's pawn."""
+        cell = self.cells[player - 1]
+        return cell % self.size, cell // self.size
+
+    def walls(self) -> List[Tuple[int, int, str]]:
+        """Returns the placed fences as (x, y, orientation) triples, in slot order."""
+        tables = get_board_tables(self.size)
+        walls = []
+        mask = self.fence_mask
+        while mask:
+            low = mask & -mask
+            walls.append(tables.slot_to_fence(low.bit_length() - 1))
+            mask ^= low
+        return walls
+
+    def to_json(self) -> dict:
+        """Returns the state as a JSON-compatible game state dict, the format the GUI reads."""
+        return {
+            "player_positions": {"player1": list(self.position(1)), "player2": list(self.position(2))},
+            "walls": [list(wall) for wall in self.walls()],
+            "walls_remaining": {"player_1": self.fences_left[0], "player_2": self.fences_left[1]},
+            "turn": f"player{self.turn}",
+            "board": []
+        }
+
+    @classmethod
+    def from_json(cls, data: dict, size: int = 9) -> "GameState":
+        """
+        Builds a state from a game state dict (see to_json).
+
+        Args:
+            data (dict): Game state dict; without a "turn", player 1 is to move.
+            size (int): Board size.
+
+        Returns:
+            GameState: The parsed state.
+        """
+        tables = get_board_tables(size)
+        (x1, y1), (x2, y2) = data["player_positions"]["player1"], data["player_positions"]["player2"]
+        fence_mask = 0
+        for x, y, orientation in data["walls"]:
+            fence_mask |= 1 << tables.fence_slot(x, y, orientation)
+        remaining = data["walls_remaining"]
+        return cls(size, (y1 * size + x1, y2 * size + x2), (remaining["player_1"], remaining["player_2"]),
+                   int(data.get("turn", "player1")[len("player"):]), fence_mask)
+
 
 class QuoridorBoard:
     """
@@ -11,29 +304,98 @@ class QuoridorBoard:
     
     Attributes:
         size (int): The board size (9x9 in standard Quoridor).
-        player_positions (dict): Maps player number to their current position.
-        fences (set): Tracks all placed fences as tuples ((x1, y1), (x2, y2), orientation).
-        fences_gui (set): Subset of fences formatted for GUI rendering.
-        game_state (dict): Stores current game state to be exported as JSON.
+        fences_per_player (int): Fences each player starts with (10 in standard Quoridor).
+        pawn_cells (dict): Maps player number to the cell index (y * size + x) of their pawn.
+        player_positions (dict): Maps player number to their (x, y) position, derived
+            from pawn_cells on every access (for the GUI and coordinate-based callers).
+        fences (set): All placed fences as tuples ((x1, y1), (x2, y2), orientation),
+            derived from the fence bitboard.
+        fence_mask (int): Bitboard of occupied fence slots (see BoardTables).
+        blocked (list): Per-cell mask of the direction bits blocked by a fence.
+        distances (dict): Maps player number to a per-cell BFS distance-to-goal grid,
+            repaired incrementally whenever a fence is added or removed.
+        distance_searches (int): Number of distance-grid searches (full BFS or
+            incremental repair) run so far, reported in the search telemetry.
+        contacts (list): Per lattice point (see BoardTables.fence_points), the
+            number of placed fences and borders touching it.
+        legality_checks (dict): How is_fence_legal settled its checks: "contact"
+            (fewer than two contacts), "local" (bounded search) or "full".
+        game_state (dict): Last game state exported by update_gui_game_state (JSON-compatible).
+        publisher (StatePublisher): Channel the game state is pushed to, or None.
+        snapshot_path (str): File the game state is also saved to, or None.
         fences_left (dict): Number of remaining walls for each player.
+        turn (int): Player to move next.
+        hash (int): Zobrist hash of (pawn positions, fences, fences left, turn),
+            updated incrementally by every board change.
+        history (list): Undo stack of the actions applied to the board, as
+            ("move", player, previous_cell) or ("fence", player, slot, repaired_cells)
+            tuples, where repaired_cells holds the previous distance values per player.
     """
 
-    def __init__(self):
+    def __init__(self, publisher=None, snapshot_path: str = None, size: int = 9, fences: int = 10):
         """
         Initializes the Quoridor board, placing players at their start positions and resetting fences.
-        Also deletes any previous game state JSON file to start fresh.
+        Also deletes any previous game state snapshot file to start fresh.
+
+        Args:
+            publisher (StatePublisher, optional): Channel that update_gui_game_state
+                pushes the game state to (see state_channel).
+            snapshot_path (str, optional): JSON file that update_gui_game_state
+                also saves the full game state to, e.g. "game_state.json".
+            size (int): Cells per side, at least 3 (9 in standard Quoridor).
+            fences (int): Fences each player starts with, at most one per fence slot of a kind.
         """
-        self.size = 9  # 9x9 Board
-        self.player_positions = {1: (4, 0), 2: (4, 8)}  # Player 1 starts at (4,0), Player 2 at (4,8)
-        self.fences = set()
-        self.fences_gui = set()
+        if size < 3:
+            raise ValueError(f"The board needs at least 3x3 cells, got {size}x{size}")
+        self.size = size
+        self.tables = get_board_tables(self.size)
+        if not 0 <= fences <= self.tables.slots:
+            raise ValueError(f"A {size}x{size} board allows 0 to {self.tables.slots} fences per player, got {fences}")
+        self.fences_per_player = fences
+        # Both pawns start in the middle column of their own back row
+        self.pawn_cells = {1: size // 2, 2: (size - 1) * size + size // 2}
+        self.fence_mask = 0
+        self.blocked = [0] * (self.size * self.size)
         self.game_state = {}
-        self.fences_left = {1: 10, 2: 10}  # Every player has 10 walls
+        self.fences_left = {1: fences, 2: fences}
+        self.history = []
+        self.turn = 1
+        self.distances = {}
+        self.distance_searches = 0
+        self.contacts = list(self.tables.border_points)
+        self.legality_checks = {"contact": 0, "local": 0, "full": 0}
+        self.reset_distances()
+        self.hash = self.compute_hash()
+        self.cached_state = None  # GameState built by state, reused while the hash is unchanged
+        self.publisher = publisher
+        self.snapshot_path = snapshot_path
+
+        # Delete the previous snapshot file if it exists
+        if snapshot_path is not None and os.path.exists(snapshot_path):
+            os.remove(snapshot_path)  # Delete the file completely
+            logger.debug("Game state file deleted.")
+
+    def __getstate__(self) -> dict:
+        """
+        Pickles the position only: the lookup tables are shared per board size,
+        and neither the undo history nor the state channel is carried over.
+        """
+        state = self.__dict__.copy()
+        del state["tables"]
+        state["history"] = []
+        state["publisher"] = None
+        return state
+
+    def __setstate__(self, state: dict):
+        """Restores a pickled board and re-attaches the shared lookup tables."""
+        self.__dict__.update(state)
+        self.tables = get_board_tables(self.size)
 
-        # Delete the game_state.json file if it exists
-        if os.path.exists("game_state.json"):
-            os.remove("game_state.json")  # Delete the file completely
-            print("Game state file deleted.")
+    @property
+    def player_positions(self) -> Dict[int, Tuple[int, int]]:
+        """Returns the (x, y) positions of both pawns, built from pawn_cells."""
+        cell_positions = self.tables.cell_positions
+        return {1: cell_positions[self.pawn_cells[1]], 2: cell_positions[self.pawn_cells[2]]}
 
     def move_pawn(self, player: int, new_position: Tuple[int, int]) -> bool:
         """
@@ -49,12 +411,68 @@ class QuoridorBoard:
         if not self.is_valid_pawn_move(player, new_position):
             return False
 
-        self.player_positions[player] = new_position
+        self.make_pawn_move(player, new_position)
         return True
 
+    def make_pawn_move(self, player: int, new_position: Tuple[int, int]):
+        """
+        Moves a pawn in memory and records the move on the undo stack.
+        The move is not validated, so callers must only pass legal moves.
+
+        Args:
+            player (int): Player number (1 or 2).
+            new_position (Tuple[int, int]): Destination position (x, y).
+        """
+        x, y = new_position
+        self.make_cell_move(player, y * self.size + x)
+
+    def make_cell_move(self, player: int, cell: int):
+        """
+        make_pawn_move with the destination as a cell index, as the move
+        generators return it. Not validated either.
+
+        Args:
+            player (int): Player number (1 or 2).
+            cell (int): Destination cell index.
+        """
+        old_cell = self.pawn_cells[player]
+        keys = self.tables.zobrist_pawns[player]
+        self.hash ^= keys[old_cell] ^ keys[cell]
+        self.set_turn(2 if player == 1 else 1)
+
+        self.history.append(("move", player, old_cell))
+        self.pawn_cells[player] = cell
+
+    def pawn_targets_from(self, cell: int, other: int) -> Tuple[int, ...]:
+        """
+        Pawn move generator shared by validation and search: the cells a pawn
+        on cell can move to with the opponent on other. A pawn steps to a free
+        orthogonal neighbour; if the opponent stands there, it jumps straight
+        over it, or diagonally beside it when a fence or the border is behind
+        the opponent. The result is a precomputed tuple, so the search loop
+        allocates nothing.
+
+        Args:
+            cell (int): Cell index of the moving pawn.
+            other (int): Cell index of the opponent's pawn.
+
+        Returns:
+            Tuple[int, ...]: Target cell indices.
+        """
+        walls = self.blocked[cell]
+        bit = self.tables.adjacent[cell].get(other)
+        if bit is None or walls & bit:
+            return self.tables.steps[cell][walls]
+        return self.tables.jump_targets(cell, walls, other, self.blocked[other])
+
+    def pawn_targets(self, player: int) -> Tuple[int, ...]:
+        """Returns the cell indices the player's pawn can move to (see pawn_targets_from)."""
+        return self.pawn_targets_from(self.pawn_cells[player], self.pawn_cells[2 if player == 1 else 1])
+
     def is_valid_pawn_move(self, player: int, new_position: Tuple[int, int]) -> bool:
         """
-        Validates if a pawn move is legal based on board boundaries and fence positions.
+        Validates if a pawn move is legal: a step not cut by a fence, or a
+        jump over the opponent (see pawn_targets_from).
 
         Args:
             player (int): Player number (1 or 2).
@@ -63,24 +481,21 @@ class QuoridorBoard:
         Returns:
             bool: True if the move is allowed, False otherwise.
         """
-        x, y = self.player_positions[player]
         new_x, new_y = new_position
 
-
         # Ensure the move is within board boundaries
         if not (0 <= new_x < self.size and 0 <= new_y < self.size):
-            print("Move is outside the board boundaries.")
+            if telemetry.DEBUG:
+                logger.debug("Move is outside the board boundaries.")
             return False
 
-        # Check for simple adjacent moves (orthogonal only)
-        if (abs(new_x - x) == 1 and new_y == y) or (abs(new_y - y) == 1 and new_x == x):
-            if self.is_fence_blocking(x, y, new_x, new_y):
-                print("Fence is blocking the move.")
-                return False
-            print("Move is valid (simple adjacent).")
+        if new_y * self.size + new_x in self.pawn_targets(player):
+            if telemetry.DEBUG:
+                logger.debug("Move is valid.")
             return True
 
-        print("Move is invalid (no valid conditions met).")
+        if telemetry.DEBUG:
+            logger.debug("Move is invalid (blocked by a fence, the opponent or too far).")
         return False
 
     def place_fence(self, x: int, y: int, orientation: str, player: int) -> bool:
@@ -96,128 +511,596 @@ class QuoridorBoard:
         Returns:
             bool: True if fence placement was successful, False otherwise.
         """
+        if not self.make_fence(x, y, orientation, player):
+            return False
+
+        if telemetry.DEBUG:
+            logger.debug(f"Fences:{self.fences}")
+        return True
+
+    def make_fence(self, x: int, y: int, orientation: str, player: int) -> bool:
+        """
+        Places a fence in memory if it is legal and records it on the undo stack.
+        Unlike update_gui_game_state, nothing is written to disk.
+
+        Args:
+            x (int): Horizontal coordinate of the fence origin.
+            y (int): Vertical coordinate of the fence origin.
+            orientation (str): Fence orientation, either 'H' (horizontal) or 'V' (vertical).
+            player (int): Player number (1 or 2).
+
+        Returns:
+            bool: True if the fence was placed, False if it is illegal (nothing is recorded).
+        """
         if self.fences_left[player] <= 0:
             return False
 
-        # Check if a fence already exists in that location
-        for wall in self.fences:
-            coord1, coord2, orient = wall  # Unpack the wall coordinates and orientation
-            if (coord1 == (x, y) or coord2 == (x, y)) and orient == orientation:  # 
-                return False
-            if coord1 == (x+1, y) and orient == orientation:
-                return False
-            if (coord1 == (x, y) and orient != orientation):  # Prevent crossing walls
-                return False  # If there's a cross, return False
+        # Fences must lie fully inside the board
+        if orientation not in ('H', 'V'):
+            return False
+        if x < 0 or x >= self.size - 1 or y < 0 or y >= self.size - 1:
+            return False
 
-        # Handle horizontal fence placement
-        if orientation == 'H':
-            if y < 0 or y >= self.size - 1 or x < 0 or x >= self.size - 1:
-                return False
-            wall = ((x, y), (x + 1, y), 'H')
+        return self.make_fence_slot(self.tables.fence_slot(x, y, orientation), player)
 
-        # Handle vertical fence placement
-        elif orientation == 'V':
-            if x < 0 or x >= self.size - 1 or y < 0 or y >= self.size - 1:
-                return False
-            wall = ((x, y), (x, y + 1), 'V')
+    def make_fence_slot(self, slot: int, player: int) -> bool:
+        """
+        make_fence with the fence given as its slot, as the move generators
+        return it. Legality is checked the same way.
 
-        self.fences.add(wall)
-        print(f"Fences:{self.fences}")
+        Args:
+            slot (int): Fence slot (see BoardTables).
+            player (int): Player number (1 or 2).
+
+        Returns:
+            bool: True if the fence was placed, False if it is illegal (nothing is recorded).
+        """
+        if self.fences_left[player] <= 0:
+            return False
+
+        # Check if an existing fence overlaps or crosses this one
+        if self.fence_mask & self.tables.fence_conflicts[slot]:
+            return False
+
+        repaired_cells = self.add_fence_slot(slot)
 
         # Ensure both players still have a valid path to goal
         if not self.has_path_to_goal(1) or not self.has_path_to_goal(2):
-            self.fences.remove((wall))
+            self.remove_fence_slot(slot, repaired_cells)
             return False
 
+        keys = self.tables.zobrist_fences_left[player]
+        self.hash ^= keys[self.fences_left[player]] ^ keys[self.fences_left[player] - 1]
         self.fences_left[player] -= 1
+        self.set_turn(2 if player == 1 else 1)
+
+        self.history.append(("fence", player, slot, repaired_cells))
         return True
 
-    def is_fence_blocking(self, x1: int, y1: int, x2: int, y2: int) -> bool:
+    def is_fence_legal(self, slot: int) -> bool:
         """
-        Determines if a fence blocks the move between two adjacent cells.
+        Checks whether a fence slot can take a fence, without placing it: it
+        must be free of overlaps and leave both pawns a path to their goal row.
+
+        Only a fence closing a loop of walls can cut the board, and that needs
+        two of its three points to touch an existing fence or the border, so
+        most fences are accepted from the contact counts alone. Otherwise a
+        bounded search checks that the cells on both sides of each edge the
+        fence covers still reach each other; only if that fails are the
+        distance grids repaired to settle the question exactly.
 
         Args:
-            x1, y1, x2, y2 (int): Coordinates of the movement direction.
+            slot (int): Fence slot index (see BoardTables.fence_slot).
 
         Returns:
-            bool: True if the path is blocked by a fence, False otherwise.
+            bool: True if the fence is legal (fence counts are not checked).
         """
-        for wall in self.fences:
-            (fx1, fy1), (fx2, fy2), orient = wall
+        tables = self.tables
+        if self.fence_mask & tables.fence_conflicts[slot]:
+            return False
+
+        contacts = self.contacts
+        touching = 0
+        for point in tables.fence_points[slot]:
+            if contacts[point]:
+                touching += 1
+        if touching < 2:
+            self.legality_checks["contact"] += 1
+            return True
 
-            if orient == 'H':
-                if ((y1 > y2 and (fx1, fy1) == (x1, y2)) or (y2 > y1 and (fx1, fy1) == (x1, y1)) or
-                    (y1 > y2 and (fx2, fy2) == (x1, y2)) or (y2 > y1 and (fx2, fy2) == (x1, y1))):
-                    return True
+        edges = tables.fence_edges[slot]
+        blocked = self.blocked
+        for cell, bit in edges:
+            blocked[cell] |= bit
+        reconnected = (self.cells_connected(edges[0][0], edges[1][0]) and
+                       self.cells_connected(edges[2][0], edges[3][0]))
+        for cell, bit in edges:
+            blocked[cell] &= ~bit
+        if reconnected:
+            self.legality_checks["local"] += 1
+            return True
+
+        self.legality_checks["full"] += 1
+        repaired_cells = self.add_fence_slot(slot)
+        legal = self.has_path_to_goal(1) and self.has_path_to_goal(2)
+        self.remove_fence_slot(slot, repaired_cells)
+        return legal
 
-            elif orient == 'V':
-                if ((x1 > x2 and (fx1, fy1) == (x2, y1)) or (x2 > x1 and (fx1, fy1) == (x1, y1)) or
-                    (x1 > x2 and (fx2, fy2) == (x2, y1)) or (x2 > x1 and (fx2, fy2) == (x1, y1))):
-                    return True
+    def cells_connected(self, start: int, target: int, limit: int = LOCAL_SEARCH_LIMIT) -> bool:
+        """
+        Bounded breadth-first search between two cells.
 
+        Returns:
+            bool: True if target was reached within limit visited cells; False
+            if it is unreachable or too far to tell.
+        """
+        neighbours = self.tables.neighbours
+        blocked = self.blocked
+        seen = {start}
+        queue = deque((start,))
+        while queue and len(seen) <= limit:
+            cell = queue.popleft()
+            walls = blocked[cell]
+            for bit, neighbour in neighbours[cell]:
+                if not walls & bit and neighbour not in seen:
+                    if neighbour == target:
+                        return True
+                    seen.add(neighbour)
+                    queue.append(neighbour)
         return False
 
-    def has_path_to_goal(self, player: int) -> bool:
+    def legal_fence_slots(self) -> List[int]:
+        """Returns every fence slot where a fence is legal now (see is_fence_legal)."""
+        return [slot for slot in range(2 * self.tables.slots) if self.is_fence_legal(slot)]
+
+    def unmake(self):
+        """
+        Reverts the most recent action recorded by make_pawn_move, make_cell_move,
+        make_fence or make_fence_slot (including the ones applied through
+        move_pawn and place_fence).
+        """
+        entry = self.history.pop()
+        player = entry[1]
+        if entry[0] == "move":
+            keys = self.tables.zobrist_pawns[player]
+            self.hash ^= keys[entry[2]] ^ keys[self.pawn_cells[player]]
+            self.pawn_cells[player] = entry[2]
+        else:
+            _, _, slot, repaired_cells = entry
+            self.remove_fence_slot(slot, repaired_cells)
+            keys = self.tables.zobrist_fences_left[player]
+            self.hash ^= keys[self.fences_left[player]] ^ keys[self.fences_left[player] + 1]
+            self.fences_left[player] += 1
+
+        # The player who made the undone action is to move again
+        self.set_turn(player)
+
+    def set_turn(self, player: int):
+        """Sets the player to move, keeping the Zobrist hash in sync."""
+        if player != self.turn:
+            self.hash ^= self.tables.zobrist_turn
+            self.turn = player
+
+    def compute_hash(self) -> int:
+        """
+        Computes the Zobrist hash of the position from scratch.
+
+        Returns:
+            int: XOR of the keys for both pawns, every placed fence, both fence
+            counts and the side to move.
+        """
+        tables = self.tables
+        value = 0
+        for player in (1, 2):
+            value ^= tables.zobrist_pawns[player][self.pawn_cells[player]]
+            value ^= tables.zobrist_fences_left[player][self.fences_left[player]]
+
+        mask = self.fence_mask
+        while mask:
+            low = mask & -mask
+            value ^= tables.zobrist_fences[low.bit_length() - 1]
+            mask ^= low
+
+        if self.turn == 2:
+            value ^= tables.zobrist_turn
+        return value
+
+    def encode_action(self, action: Tuple) -> int:
+        """
+        Encodes an action as a small integer: pawn moves map to the destination
+        cell index, fences to the number of cells plus their fence slot.
+
+        Args:
+            action (Tuple): ("move", (x, y)) or ("fence", (x, y, orientation)).
+
+        Returns:
+            int: The action code.
+        """
+        kind, target = action
+        if kind == "move":
+            x, y = target
+            return y * self.size + x
+        return self.size * self.size + self.tables.fence_slot(*target)
+
+    def decode_action(self, code: int) -> Tuple:
+        """
+        Decodes an action code produced by encode_action.
+
+        Args:
+            code (int): The action code.
+
+        Returns:
+            Tuple: ("move", (x, y)) or ("fence", (x, y, orientation)).
+        """
+        cells = self.size * self.size
+        if code < cells:
+            return ("move", (code % self.size, code // self.size))
+        return ("fence", self.tables.slot_to_fence(code - cells))
+
+    def add_fence_slot(self, slot: int) -> dict:
+        """
+        Marks a fence slot as occupied, blocks the four edges it covers and
+        repairs both distance-to-goal grids. No legality checks are performed.
+
+        Args:
+            slot (int): Fence slot index (see BoardTables.fence_slot).
+
+        Returns:
+            dict: Per player, the (cell, previous distance) pairs changed by the repair.
+        """
+        self.fence_mask |= 1 << slot
+        self.hash ^= self.tables.zobrist_fences[slot]
+        blocked = self.blocked
+        edges = self.tables.fence_edges[slot]
+        for cell, bit in edges:
+            blocked[cell] |= bit
+        for point in self.tables.fence_points[slot]:
+            self.contacts[point] += 1
+
+        seeds = [cell for cell, _ in edges]
+        return {player: self.repair_after_cut(player, seeds) for player in (1, 2)}
+
+    def remove_fence_slot(self, slot: int, repaired_cells: dict = None):
+        """
+        Frees a fence slot, unblocks the four edges it covered and repairs both
+        distance-to-goal grids.
+
+        Args:
+            slot (int): Fence slot index (see BoardTables.fence_slot).
+            repaired_cells (dict, optional): Value returned by the matching
+                add_fence_slot call. When given, the old distances are restored
+                directly instead of being recomputed.
+        """
+        self.fence_mask &= ~(1 << slot)
+        self.hash ^= self.tables.zobrist_fences[slot]
+        blocked = self.blocked
+        edges = self.tables.fence_edges[slot]
+        for cell, bit in edges:
+            blocked[cell] &= ~bit
+        for point in self.tables.fence_points[slot]:
+            self.contacts[point] -= 1
+
+        for player in (1, 2):
+            if repaired_cells is not None:
+                distances = self.distances[player]
+                for cell, old in repaired_cells[player]:
+                    distances[cell] = old
+            else:
+                self.repair_after_join(player, edges)
+
+    def goal_row(self, player: int) -> int:
+        """Returns the row a player has to reach to win."""
+        return self.size - 1 if player == 1 else 0
+
+    def has_won(self, player: int) -> bool:
+        """Returns True if the player's pawn stands on their goal row."""
+        return self.pawn_cells[player] // self.size == self.goal_row(player)
+
+    def reset_distances(self):
+        """Recomputes both distance-to-goal grids from scratch with a BFS from the goal rows."""
+        neighbours = self.tables.neighbours
+        blocked = self.blocked
+        self.distance_searches += 2
+        for player in (1, 2):
+            goal_start = self.goal_row(player) * self.size
+            distances = [UNREACHABLE] * (self.size * self.size)
+            queue = deque(range(goal_start, goal_start + self.size))
+            for cell in queue:
+                distances[cell] = 0
+
+            while queue:
+                cell = queue.popleft()
+                next_distance = distances[cell] + 1
+                walls = blocked[cell]
+                for bit, neighbour in neighbours[cell]:
+                    if not walls & bit and distances[neighbour] > next_distance:
+                        distances[neighbour] = next_distance
+                        queue.append(neighbour)
+
+            self.distances[player] = distances
+
+    def repair_after_cut(self, player: int, seeds: List[int]) -> List[Tuple[int, int]]:
         """
-        Uses DFS to determine if a player still has a valid path to their goal row.
+        Repairs a player's distance grid after edges were blocked. Only cells
+        that lost every neighbour one step closer to the goal (and the cells
+        that depended on them) are recomputed.
 
         Args:
             player (int): Player number (1 or 2).
+            seeds (List[int]): Cells whose edges were just blocked.
 
         Returns:
-            bool: True if a path exists, False if blocked.
+            List[Tuple[int, int]]: (cell, previous distance) pairs that were recomputed.
         """
-        start_x, start_y = self.player_positions[player]
-        goal_row = 8 if player == 1 else 0
-        stack = [(start_x, start_y)]
-        visited = set()
+        distances = self.distances[player]
+        neighbours = self.tables.neighbours
+        blocked = self.blocked
+        self.distance_searches += 1
 
+        # 1. Collect the cells that are no longer supported by a shorter neighbour
+        invalid = []
+        marked = set()
+        stack = list(seeds)
         while stack:
-            x, y = stack.pop()
+            cell = stack.pop()
+            distance = distances[cell]
+            if cell in marked or distance == 0 or distance >= UNREACHABLE:
+                continue
+            walls = blocked[cell]
+            supported = False
+            for bit, neighbour in neighbours[cell]:
+                if not walls & bit and neighbour not in marked and distances[neighbour] == distance - 1:
+                    supported = True
+                    break
+            if supported:
+                continue
+
+            marked.add(cell)
+            invalid.append(cell)
+            for bit, neighbour in neighbours[cell]:
+                if not walls & bit and distances[neighbour] == distance + 1:
+                    stack.append(neighbour)
 
-            if (player == 1 and y == goal_row) or (player == 2 and y == goal_row):
-                return True
+        if not invalid:
+            return []
 
-            if (x, y) in visited:
+        # 2. Recompute them from the valid cells around the invalidated region
+        changed = [(cell, distances[cell]) for cell in invalid]
+        for cell in invalid:
+            distances[cell] = UNREACHABLE
+
+        heap = []
+        for cell in invalid:
+            walls = blocked[cell]
+            best = UNREACHABLE
+            for bit, neighbour in neighbours[cell]:
+                if not walls & bit and neighbour not in marked and distances[neighbour] + 1 < best:
+                    best = distances[neighbour] + 1
+            if best < UNREACHABLE:
+                distances[cell] = best
+                heapq.heappush(heap, (best, cell))
+
+        while heap:
+            distance, cell = heapq.heappop(heap)
+            if distance != distances[cell]:
                 continue
-            visited.add((x, y))
+            walls = blocked[cell]
+            for bit, neighbour in neighbours[cell]:
+                if not walls & bit and neighbour in marked and distances[neighbour] > distance + 1:
+                    distances[neighbour] = distance + 1
+                    heapq.heappush(heap, (distance + 1, neighbour))
+
+        return changed
+
+    def repair_after_join(self, player: int, edges: Tuple[Tuple[int, int], ...]):
+        """
+        Repairs a player's distance grid after edges were unblocked. Distances
+        can only shrink, so they are relaxed outwards from the reopened edges.
 
-            # Explore adjacent tiles
-            for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.size and 0 <= ny < self.size and (nx, ny) not in visited:
-                    if not self.is_fence_blocking(x, y, nx, ny):
-                        stack.append((nx, ny))
+        Args:
+            player (int): Player number (1 or 2).
+            edges (Tuple): (cell, direction bit) pairs that were just unblocked.
+        """
+        distances = self.distances[player]
+        neighbours = self.tables.neighbours
+        blocked = self.blocked
+        offsets = self.tables.offsets
+        self.distance_searches += 1
 
-        print(f'Player {player} has no path to goal.')
+        queue = deque()
+        for cell, bit in edges:
+            through = distances[cell + offsets[bit]] + 1
+            if through < distances[cell]:
+                distances[cell] = through
+                queue.append(cell)
+
+        while queue:
+            cell = queue.popleft()
+            next_distance = distances[cell] + 1
+            walls = blocked[cell]
+            for bit, neighbour in neighbours[cell]:
+                if not walls & bit and distances[neighbour] > next_distance:
+                    distances[neighbour] = next_distance
+                    queue.append(neighbour)
+
+    def path_to_goal(self, player: int) -> List[int]:
+        """
+        Follows the distance-to-goal grid downhill from the player's pawn.
+
+        Args:
+            player (int): Player number (1 or 2).
+
+        Returns:
+            List[int]: Cell indices of one shortest path, starting at the pawn,
+            or an empty list if the goal row is unreachable.
+        """
+        distances = self.distances[player]
+        neighbours = self.tables.neighbours
+        cell = self.pawn_cells[player]
+        if distances[cell] >= UNREACHABLE:
+            return []
+
+        path = [cell]
+        while distances[cell]:
+            walls = self.blocked[cell]
+            for bit, neighbour in neighbours[cell]:
+                if not walls & bit and distances[neighbour] == distances[cell] - 1:
+                    cell = neighbour
+                    break
+            path.append(cell)
+        return path
+
+    def distance_to_goal(self, player: int, position: Tuple[int, int] = None) -> int:
+        """
+        Looks up the length of a player's shortest path to their goal row.
+
+        Args:
+            player (int): Player number (1 or 2).
+            position (Tuple[int, int], optional): Cell to measure from. Defaults
+                to the player's current position.
+
+        Returns:
+            int: Number of steps to the goal row, or UNREACHABLE if it is cut off.
+        """
+        if position is None:
+            return self.distances[player][self.pawn_cells[player]]
+        x, y = position
+        return self.distances[player][y * self.size + x]
+
+    @property
+    def fences(self) -> Set[Tuple[Tuple[int, int], Tuple[int, int], str]]:
+        """
+        Returns the placed fences as ((x1, y1), (x2, y2), orientation) tuples,
+        rebuilt from the fence bitboard.
+        """
+        walls = set()
+        mask = self.fence_mask
+        while mask:
+            low = mask & -mask
+            x, y, orientation = self.tables.slot_to_fence(low.bit_length() - 1)
+            if orientation == 'H':
+                walls.add(((x, y), (x + 1, y), 'H'))
+            else:
+                walls.add(((x, y), (x, y + 1), 'V'))
+            mask ^= low
+        return walls
+
+    @fences.setter
+    def fences(self, walls: Set[Tuple[Tuple[int, int], Tuple[int, int], str]]):
+        """Replaces all placed fences, rebuilding the fence bitboard and edge masks."""
+        fence_mask = 0
+        for (x, y), _, orientation in walls:
+            fence_mask |= 1 << self.tables.fence_slot(x, y, orientation)
+        self.set_fence_mask(fence_mask)
+
+    def set_fence_mask(self, fence_mask: int):
+        """
+        Replaces all placed fences by a fence bitboard, rebuilding the edge
+        masks, contact counts, distance grids and hash. No legality checks.
+        """
+        self.fence_mask = fence_mask
+        self.blocked = [0] * (self.size * self.size)
+        self.contacts = list(self.tables.border_points)
+        mask = fence_mask
+        while mask:
+            low = mask & -mask
+            slot = low.bit_length() - 1
+            for cell, bit in self.tables.fence_edges[slot]:
+                self.blocked[cell] |= bit
+            for point in self.tables.fence_points[slot]:
+                self.contacts[point] += 1
+            mask ^= low
+        self.reset_distances()
+        self.hash = self.compute_hash()
+
+    @property
+    def state(self) -> GameState:
+        """
+        Returns an immutable snapshot of the current position. The snapshot is
+        reused until the position changes (the Zobrist hash covers all of it).
+        """
+        cached = self.cached_state
+        if cached is None or cached[0] != self.hash:
+            cached = self.cached_state = (self.hash, GameState(
+                self.size, (self.pawn_cells[1], self.pawn_cells[2]), (self.fences_left[1], self.fences_left[2]),
+                self.turn, self.fence_mask))
+        return cached[1]
+
+    def restore(self, state: GameState):
+        """
+        Sets the board to a position, as returned by state. The undo history
+        is cleared, since it no longer leads back to this position.
+
+        Args:
+            state (GameState): Position to set, for a board of the same size.
+        """
+        if state.size != self.size:
+            raise ValueError(f"State of a {state.size}x{state.size} board, the board is {self.size}x{self.size}")
+        self.pawn_cells = {1: state.cells[0], 2: state.cells[1]}
+        self.fences_left = {1: state.fences_left[0], 2: state.fences_left[1]}
+        self.turn = state.turn
+        self.history = []
+        self.set_fence_mask(state.fence_mask)  # Also recomputes the hash
+
+    def is_fence_blocking(self, x1: int, y1: int, x2: int, y2: int) -> bool:
+        """
+        Determines if a fence blocks the move between two adjacent cells.
+
+        Args:
+            x1, y1, x2, y2 (int): Coordinates of the movement direction.
+
+        Returns:
+            bool: True if the path is blocked by a fence, False otherwise.
+        """
+        if x1 == x2:
+            if y2 > y1:
+                bit = SOUTH
+            elif y2 < y1:
+                bit = NORTH
+            else:
+                return False
+        elif y1 == y2:
+            bit = EAST if x2 > x1 else WEST
+        else:
+            return False
+
+        return bool(self.blocked[y1 * self.size + x1] & bit)
+
+    def has_path_to_goal(self, player: int) -> bool:
+        """
+        Determines if a player still has a valid path to their goal row, using
+        the incrementally maintained distance-to-goal grid.
+
+        Args:
+            player (int): Player number (1 or 2).
+
+        Returns:
+            bool: True if a path exists, False if blocked.
+        """
+        if self.distance_to_goal(player) < UNREACHABLE:
+            return True
+
+        if telemetry.DEBUG:
+            logger.debug(f'Player {player} has no path to goal.')
         return False
 
     def update_gui_game_state(self):
         """
-        Serializes and saves the current game state to a JSON file,
-        so that the GUI component can read and reflect the latest status.
-        """
-        walls = list(self.fences)
-        for wall in walls:
-            coord1, coord2, orient = wall
-            x, y = coord1
-            self.fences_gui.add((x, y, orient))
-
-        player1 = self.player_positions[1]
-        player2 = self.player_positions[2]
-
-        self.game_state = {
-            "player_positions": {"player1": player1, "player2": player2},
-            "walls": list(self.fences_gui),
-            "walls_remaining": {
-                "player_1": self.fences_left[1],
-                "player_2": self.fences_left[2]
-            },
-            "turn": "player1",
-            "board": []
-        }
+        Serializes the current game state and pushes it to the GUI through the
+        state channel, so that the GUI can reflect the latest status. If a
+        snapshot path is set, the state is also saved there as JSON.
+        """
+        self.game_state = self.state.to_json()
+
+        if self.publisher is not None:
+            self.publisher.publish(self.game_state)
 
-        with open("game_state.json", "w") as file:
-            json.dump(self.game_state, file)
+        if self.snapshot_path is not None:
+            # Write a temporary file and swap it in, so readers never see a partial file
+            temporary_path = self.snapshot_path + ".tmp"
+            with open(temporary_path, "w") as file:
+                json.dump(self.game_state, file)
+            os.replace(temporary_path, self.snapshot_path)
 
-        print("Game state saved to file:", self.game_state)
+        if telemetry.DEBUG:
+            logger.debug(f"Game state published: {self.game_state}")
@@ -0,0 +1,573 @@
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing.util
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engines import ENGINES, create_engine
+from quoridor_board import QuoridorBoard
+from state_channel import HEADER, encode_message
+from telemetry import configure_logging, logger
+
+# Default Unix domain socket of the game server
+DEFAULT_SERVER_ADDRESS = os.path.join(tempfile.gettempdir(), "quoridor_server.sock")
+
+# Largest request body accepted, in bytes
+MAX_MESSAGE = 64 * 1024
+
+# Engine options a client may set per session; anything else (files, logs) stays server-side
+SESSION_OPTIONS = {
+    "minimax": {"node_limit", "max_depth", "fence_pruning", "fence_radius", "fence_ordering"},
+    "mcts": {"playout_limit", "policy", "exploration", "max_nodes", "max_playout_plies", "fence_probability", "seed"},
+}
+
+# Engines of a worker process, reused across moves:
+# (engine name, options, board size, fences per player) -> engine
+worker_engines = {}
+
+
+def close_worker_engines():
+    """Closes the engines cached by a worker process (see compute_ai_move)."""
+    for engine in worker_engines.values():
+        engine.close()
+    worker_engines.clear()
+
+
+def init_worker():
+    """Closes the worker's engines when the worker process exits."""
+    multiprocessing.util.Finalize(None, close_worker_engines, exitpriority=10)
+
+
+def compute_ai_move(board, player, engine, options, submitted):
+    """
+    Plays the AI's move on a copy of a session's board. Runs in the server's
+    process pool; the engines are cached per worker process and board shape,
+    so their tables (transposition table, race tables) are allocated once and
+    never see a board of another size.
+
+    Args:
+        board (QuoridorBoard): Copy of the session's board.
+        player (int): Player the AI moves for.
+        engine (str): Engine name (see engines.ENGINES).
+        options (dict): Engine keyword arguments, time_limit included.
+        submitted (float): Wall-clock time the job was submitted at.
+
+    Returns:
+        tuple: (encoded action or None, seconds queued before the job started,
+        seconds the move took).
+    """
+    started = time.time()
+    key = (engine, json.dumps(options, sort_keys=True), board.size, board.fences_per_player)
+    ai = worker_engines.get(key)
+    if ai is None:
+        ai = worker_engines[key] = create_engine(engine, board, **options)
+    else:
+        ai.board = board
+
+    history_length = len(board.history)
+    ai.make_move(player)
+    action = None
+    if len(board.history) > history_length:
+        entry = board.history[-1]
+        if entry[0] == "move":
+            action = board.pawn_cells[player]  # A pawn move's code is its destination cell
+        else:
+            action = board.encode_action(("fence", board.tables.slot_to_fence(entry[2])))
+    return action, started - submitted, time.time() - started
+
+
+class ServerError(Exception):
+    """Raised while handling a request; the message is sent back to the client."""
+
+
+class Session:
+    """
+    One game hosted by the server: the client plays player 1, the engine
+    player 2. The board lives in memory only; no file is read or written.
+
+    Attributes:
+        id (int): Session number.
+        board (QuoridorBoard): The game's board.
+        engine (str): Engine name.
+        options (dict): Engine keyword arguments.
+        winner (int): Winning player, or None while the game is running.
+        last_active (float): Monotonic time of the latest request.
+    """
+
+    def __init__(self, session_id, engine, options, size=9, fences=10):
+        self.id = session_id
+        self.board = QuoridorBoard(size=size, fences=fences)
+        self.engine = engine
+        self.options = options
+        self.winner = None
+        self.last_active = time.monotonic()
+        self.lock = asyncio.Lock()  # One action at a time per game
+
+    def state(self):
+        """Returns the game state dict, as the GUI receives it, plus the winner."""
+        return dict(self.board.state.to_json(), winner=self.winner)
+
+    def check_winner(self, player):
+        """Records player as the winner if their pawn reached the goal row."""
+        if self.board.has_won(player):
+            self.winner = player
+
+
+class GameServer:
+    """
+    Asyncio server hosting many concurrent games over a local socket.
+
+    Requests and replies are JSON objects framed like the state channel (a
+    4-byte length, then the body; see state_channel.encode_message). A
+    request names an operation:
+
+    - {"op": "new", "engine": "minimax", "time_limit": 0.5, "options": {...}, "size": 9, "fences": 10}
+    - {"op": "move", "session": id, "action": ["move", [x, y]] or ["fence", [x, y, "H"]]}
+      plays the client's action, then the AI's reply
+    - {"op": "state", "session": id}, {"op": "close", "session": id}
+    - {"op": "metrics"}
+
+    AI moves run in a bounded process pool, so the event loop only parses
+    requests and applies actions. At most max_pending AI moves are in flight;
+    further requests wait for a slot (backpressure), and the time they wait
+    and the time they spend queued in the pool are reported in the metrics.
+
+    Attributes:
+        sessions (dict): Session id -> Session.
+        metrics (dict): Counters and timings (see get_metrics).
+    """
+
+    def __init__(self, workers=None, max_sessions=256, max_pending=None, max_time_limit=5.0,
+                 default_time_limit=1.0, idle_timeout=600.0, max_size=17):
+        """
+        Args:
+            workers (int, optional): AI worker processes; defaults to the CPU count.
+            max_sessions (int): Concurrent games accepted.
+            max_pending (int, optional): AI moves in flight at once; defaults to twice the workers.
+            max_time_limit (float): Largest per-move time limit a session may ask for.
+            default_time_limit (float): Per-move time limit of sessions that do not set one.
+            idle_timeout (float): Seconds after which an inactive session is closed.
+            max_size (int): Largest board size a session may ask for.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_sessions = max_sessions
+        self.max_pending = max_pending or 2 * self.workers
+        self.max_time_limit = max_time_limit
+        self.default_time_limit = default_time_limit
+        self.idle_timeout = idle_timeout
+        self.max_size = max_size
+        self.sessions = {}
+        self.session_ids = itertools.count(1)
+        self.executor = None
+        self.slots = None
+        self.server = None
+        self.clients = set()  # Tasks serving the open connections
+        self.metrics = {
+            "connections": 0, "sessions_opened": 0, "peak_sessions": 0, "ai_moves": 0,
+            "ai_timeouts": 0, "rejected": 0, "errors": 0, "pending": 0, "peak_pending": 0,
+        }
+        self.waits = []  # Seconds AI moves waited for a pending slot
+        self.queue_delays = []  # Seconds AI moves waited in the process pool
+        self.move_times = []  # Seconds the AI moves took in the workers
+
+    async def start(self, address=DEFAULT_SERVER_ADDRESS, port=None):
+        """
+        Starts the worker pool and listens for clients.
+
+        Args:
+            address (str): Unix socket path, or the host when port is given.
+            port (int, optional): TCP port; if None, address is a Unix socket.
+        """
+        self.executor = ProcessPoolExecutor(self.workers, initializer=init_worker)
+        self.slots = asyncio.Semaphore(self.max_pending)
+        if port is None:
+            if os.path.exists(address):
+                os.remove(address)
+            self.server = await asyncio.start_unix_server(self.handle_client, address)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, address, port)
+        self.reaper = asyncio.ensure_future(self.reap_idle_sessions())
+        logger.info(f"Game server listening on {address if port is None else f'{address}:{port}'}")
+
+    async def close(self):
+        """Stops listening and shuts the worker pool down."""
+        self.reaper.cancel()
+        self.server.close()
+        for task in list(self.clients):
+            task.cancel()
+        await asyncio.gather(*self.clients, return_exceptions=True)
+        await self.server.wait_closed()
+        self.executor.shutdown(cancel_futures=True)
+
+    async def reap_idle_sessions(self):
+        """Closes the sessions idle for longer than idle_timeout."""
+        while True:
+            await asyncio.sleep(min(self.idle_timeout, 60.0))
+            now = time.monotonic()
+            for session_id in [key for key, session in self.sessions.items()
+                               if now - session.last_active > self.idle_timeout]:
+                del self.sessions[session_id]
+                logger.info(f"Session {session_id} closed after {self.idle_timeout:.0f}s idle")
+
+    async def handle_client(self, reader, writer):
+        """Serves one connection: reads requests and answers them in order."""
+        self.metrics["connections"] += 1
+        task = asyncio.current_task()
+        self.clients.add(task)
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                (length,) = HEADER.unpack(header)
+                if length > MAX_MESSAGE:
+                    writer.write(encode_message({"ok": False, "error": "message too large"}))
+                    break
+                body = await reader.readexactly(length)
+                try:
+                    reply = await self.dispatch(json.loads(body))
+                    reply["ok"] = True
+                except ServerError as error:
+                    reply = {"ok": False, "error": str(error)}
+                except (ValueError, KeyError, TypeError) as error:
+                    self.metrics["errors"] += 1
+                    reply = {"ok": False, "error": f"bad request: {error}"}
+                writer.write(encode_message(reply))
+                await writer.drain()  # A client that stops reading stops being served
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # Client gone, or the server is closing
+        finally:
+            self.clients.discard(task)
+            writer.close()
+
+    async def dispatch(self, request):
+        """Runs one request and returns its reply."""
+        op = request["op"]
+        if op == "new":
+            return self.new_session(request)
+        if op == "metrics":
+            return {"metrics": self.get_metrics()}
+
+        session = self.sessions.get(request.get("session"))
+        if session is None:
+            raise ServerError("unknown session")
+        session.last_active = time.monotonic()
+        if op == "move":
+            return await self.play(session, request["action"])
+        if op == "state":
+            return {"state": session.state()}
+        if op == "close":
+            del self.sessions[session.id]
+            return {}
+        raise ServerError(f"unknown op '{op}'")
+
+    def new_session(self, request):
+        """Opens a game with the requested engine, per-move time limit, board size and fences."""
+        if len(self.sessions) >= self.max_sessions:
+            self.metrics["rejected"] += 1
+            raise ServerError("server full")
+        engine = request.get("engine", "minimax")
+        if engine not in ENGINES:
+            raise ServerError(f"unknown engine '{engine}'")
+        options = request.get("options", {})
+        unknown = set(options) - SESSION_OPTIONS[engine]
+        if unknown:
+            raise ServerError(f"options not allowed: {', '.join(sorted(unknown))}")
+        time_limit = float(request.get("time_limit", self.default_time_limit))
+        options = dict(options, time_limit=min(max(time_limit, 0.01), self.max_time_limit))
+
+        try:
+            size, fences = int(request.get("size", 9)), int(request.get("fences", 10))
+            if size > self.max_size:
+                raise ValueError(f"board size above {self.max_size}")
+            session = Session(next(self.session_ids), engine, options, size, fences)
+        except (TypeError, ValueError) as error:
+            raise ServerError(str(error))
+        self.sessions[session.id] = session
+        self.metrics["sessions_opened"] += 1
+        self.metrics["peak_sessions"] = max(self.metrics["peak_sessions"], len(self.sessions))
+        return {"session": session.id, "time_limit": options["time_limit"], "state": session.state()}
+
+    async def play(self, session, action):
+        """Plays the client's action (player 1) and then the AI's reply (player 2)."""
+        async with session.lock:
+            if session.winner is not None:
+                raise ServerError("game over")
+            board = session.board
+            kind, target = action
+            if kind == "move":
+                if not board.move_pawn(1, tuple(target)):
+                    raise ServerError("illegal move")
+            elif kind == "fence":
+                x, y, orientation = target
+                if not board.place_fence(int(x), int(y), orientation, 1):
+                    raise ServerError("illegal fence")
+            else:
+                raise ServerError(f"unknown action '{kind}'")
+            session.check_winner(1)
+            if session.winner is not None:
+                return {"ai_action": None, "state": session.state()}
+
+            try:
+                code, queue_delay, move_time = await self.run_ai(session)
+            except ServerError:
+                board.unmake()  # Take the client's action back, so it can be retried
+                raise
+            except Exception:
+                logger.exception(f"AI move of session {session.id} failed")
+                self.metrics["errors"] += 1
+                board.unmake()
+                raise ServerError("AI move failed")
+            if code is None:
+                session.winner = 1  # The AI has no legal action
+                return {"ai_action": None, "state": session.state()}
+            ai_action = board.decode_action(code)
+            if ai_action[0] == "move":
+                board.make_pawn_move(2, ai_action[1])
+            else:
+                board.make_fence(*ai_action[1], 2)
+            session.check_winner(2)
+            return {"ai_action": [ai_action[0], list(ai_action[1])], "state": session.state(),
+                    "ai_time": move_time, "queue_delay": queue_delay}
+
+    async def run_ai(self, session):
+        """
+        Computes the AI's move in the process pool, waiting for a free pending
+        slot first. The move is given its time limit plus a grace period;
+        beyond that the request fails instead of holding the game forever.
+        The slot is held until the pool job itself ends, even after a timeout,
+        so a stuck job keeps counting against max_pending.
+        """
+        loop = asyncio.get_running_loop()
+        wait_start = time.perf_counter()
+        await self.slots.acquire()
+        self.waits.append(time.perf_counter() - wait_start)
+        self.metrics["pending"] += 1
+        self.metrics["peak_pending"] = max(self.metrics["peak_pending"], self.metrics["pending"])
+
+        def release(done=None):
+            self.metrics["pending"] -= 1
+            self.slots.release()
+            if done is not None and not done.cancelled():
+                done.exception()  # Retrieved, so an abandoned job's error is not reported as unhandled
+
+        try:
+            future = loop.run_in_executor(self.executor, compute_ai_move, session.board, 2,
+                                          session.engine, session.options, time.time())
+        except BaseException:
+            release()
+            raise
+        future.add_done_callback(release)
+        # Waiting behind max_pending - workers other moves is part of the budget
+        budget = session.options["time_limit"] * (1 + self.max_pending / self.workers) + 5.0
+        try:
+            # Shielded, so a timeout leaves the job's future (and its slot) alone until the job ends
+            code, queue_delay, move_time = await asyncio.wait_for(asyncio.shield(future), budget)
+        except asyncio.TimeoutError:
+            self.metrics["ai_timeouts"] += 1
+            raise ServerError("AI move timed out")
+        self.metrics["ai_moves"] += 1
+        self.queue_delays.append(queue_delay)
+        self.move_times.append(move_time)
+        return code, queue_delay, move_time
+
+    def get_metrics(self):
+        """
+        Returns the server metrics: session and move counters, the AI moves in
+        flight, and mean/p99 of the pending-slot wait, the pool queueing delay
+        and the AI move time (seconds, over the latest 10000 moves).
+        """
+        def summary(values):
+            values = sorted(values[-10000:])
+            return {"mean": sum(values) / len(values) if values else 0.0,
+                    "p99": values[min(len(values) - 1, int(len(values) * 0.99))] if values else 0.0}
+
+        return dict(self.metrics, sessions=len(self.sessions), workers=self.workers,
+                    max_pending=self.max_pending, slot_wait=summary(self.waits),
+                    queue_delay=summary(self.queue_delays), ai_time=summary(self.move_times))
+
+
+class GameClient:
+    """Asyncio client of the game server."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, address=DEFAULT_SERVER_ADDRESS, port=None):
+        """Connects to a server on a Unix socket, or on TCP if port is given."""
+        if port is None:
+            reader, writer = await asyncio.open_unix_connection(address)
+        else:
+            reader, writer = await asyncio.open_connection(address, port)
+        return cls(reader, writer)
+
+    async def request(self, message):
+        """
+        Sends a request and waits for its reply.
+
+        Raises:
+            ServerError: If the server answered with an error.
+        """
+        self.writer.write(encode_message(message))
+        await self.writer.drain()
+        (length,) = HEADER.unpack(await self.reader.readexactly(HEADER.size))
+        reply = json.loads(await self.reader.readexactly(length))
+        if not reply.pop("ok"):
+            raise ServerError(reply["error"])
+        return reply
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def play_load_game(address, port, engine, time_limit, max_plies, rng, latencies, size=9, fences=10):
+    """
+    Plays one game as a client, with a quick scripted player 1 (the legal pawn
+    move closest to its goal, or now and then a random fence), recording the
+    latency of every move request.
+    """
+    client = await GameClient.connect(address, port)
+    try:
+        session = (await client.request({"op": "new", "engine": engine, "time_limit": time_limit,
+                                         "size": size, "fences": fences}))["session"]
+        board = QuoridorBoard(size=size, fences=fences)  # Local mirror of the game, to choose legal actions
+        for _ in range(max_plies // 2):
+            action = None
+            if board.fences_left[1] and rng.random() < 0.1:
+                slots = board.legal_fence_slots()
+                if slots:
+                    action = ["fence", list(board.tables.slot_to_fence(rng.choice(slots)))]
+            if action is None:
+                target = min(board.pawn_targets(1), key=board.distances[1].__getitem__)
+                action = ["move", list(board.tables.cell_positions[target])]
+
+            start = time.perf_counter()
+            reply = await client.request({"op": "move", "session": session, "action": action})
+            latencies.append(time.perf_counter() - start)
+
+            for player, played in ((1, action), (2, reply["ai_action"])):
+                if played is None:
+                    break
+                kind, target = played
+                if kind == "move":
+                    board.make_pawn_move(player, tuple(target))
+                else:
+                    board.make_fence(*target, player)
+            if reply["state"]["winner"] is not None:
+                break
+        await client.request({"op": "close", "session": session})
+    finally:
+        await client.close()
+
+
+async def run_load(address=DEFAULT_SERVER_ADDRESS, port=None, sessions=16, games=32, engine="minimax",
+                   time_limit=0.1, max_plies=60, seed=0, size=9, fences=10):
+    """
+    Load generator: plays games against a running server with a fixed number
+    of concurrent sessions and measures the throughput.
+
+    Args:
+        address (str): Server Unix socket, or host when port is given.
+        port (int, optional): Server TCP port.
+        sessions (int): Games played at the same time.
+        games (int): Games played in total.
+        engine (str): Server engine of every game.
+        time_limit (float): Per-move time limit of every game.
+        max_plies (int): Plies after which a game is abandoned.
+        seed (int): Seed of the scripted player's fence choices.
+        size (int): Board size of every game.
+        fences (int): Fences each player starts with.
+
+    Returns:
+        dict: Games and moves per second, request latency mean/p50/p99 and the
+        server's metrics at the end.
+    """
+    rng = random.Random(seed)
+    latencies = []
+    pending = iter(range(games))
+    start = time.perf_counter()
+
+    async def player():
+        for _ in pending:  # The iterator is shared, so each game is played once
+            await play_load_game(address, port, engine, time_limit, max_plies, rng, latencies, size, fences)
+
+    await asyncio.gather(*(player() for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    client = await GameClient.connect(address, port)
+    metrics = (await client.request({"op": "metrics"}))["metrics"]
+    await client.close()
+    latencies.sort()
+    return {
+        "games": games,
+        "sessions": sessions,
+        "elapsed": elapsed,
+        "games_per_second": games / elapsed,
+        "moves_per_second": len(latencies) / elapsed,
+        "latency_mean": sum(latencies) / len(latencies) if latencies else 0.0,
+        "latency_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+        "latency_p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0.0,
+        "server": metrics,
+    }
+
+
+async def serve(args):
+    """Runs the server until interrupted."""
+    server = GameServer(workers=args.workers, max_sessions=args.max_sessions, max_pending=args.max_pending,
+                        max_time_limit=args.max_time_limit, default_time_limit=args.time_limit,
+                        max_size=args.max_size)
+    await server.start(args.address, args.port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-session Quoridor game server and load generator")
+    parser.add_argument("--address", default=DEFAULT_SERVER_ADDRESS, help="Unix socket, or host with --port")
+    parser.add_argument("--port", type=int, help="listen on / connect to TCP instead of a Unix socket")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="host games")
+    serve_parser.add_argument("--workers", type=int, help="AI worker processes (default: CPU count)")
+    serve_parser.add_argument("--max-sessions", type=int, default=256)
+    serve_parser.add_argument("--max-pending", type=int, help="AI moves in flight (default: 2 per worker)")
+    serve_parser.add_argument("--time-limit", type=float, default=1.0, help="default AI seconds per move")
+    serve_parser.add_argument("--max-time-limit", type=float, default=5.0, help="largest AI seconds per move")
+    serve_parser.add_argument("--max-size", type=int, default=17, help="largest board size of a session")
+    serve_parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    load_parser = subparsers.add_parser("load", help="benchmark a running server")
+    load_parser.add_argument("--sessions", type=int, default=16, help="concurrent games")
+    load_parser.add_argument("--games", type=int, default=32)
+    load_parser.add_argument("--engine", choices=sorted(ENGINES), default="minimax")
+    load_parser.add_argument("--time-limit", type=float, default=0.1, help="AI seconds per move")
+    load_parser.add_argument("--max-plies", type=int, default=60)
+    load_parser.add_argument("--size", type=int, default=9, help="board size of every game")
+    load_parser.add_argument("--fences", type=int, default=10, help="fences per player of every game")
+    load_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        configure_logging(args.log_level)
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+    else:
+        result = asyncio.run(run_load(args.address, args.port, args.sessions, args.games, args.engine,
+                                      args.time_limit, args.max_plies, args.seed, args.size, args.fences))
+        server = result.pop("server")
+        print(json.dumps(result, indent=2))
+        print(f"Server: {server['sessions_opened']} sessions opened (peak {server['peak_sessions']}), "
+              f"{server['ai_moves']} AI moves, queue delay mean {server['queue_delay']['mean'] * 1000:.1f} ms "
+              f"p99 {server['queue_delay']['p99'] * 1000:.1f} ms, slot wait p99 "
+              f"{server['slot_wait']['p99'] * 1000:.1f} ms")
@@ -0,0 +1,273 @@
+import json
+import os
+import select
+import socket
+import struct
+import tempfile
+import threading
+import time
+
+from telemetry import logger
+
+# Default Unix domain socket the game publishes its state on
+DEFAULT_ADDRESS = os.path.join(tempfile.gettempdir(), "quoridor_state.sock")
+
+HEADER = struct.Struct("!I")  # Big-endian length of the JSON body that follows
+
+
+def encode_message(message):
+    """
+    Frames a message for the channel: a 4-byte length prefix and a compact JSON body.
+
+    Args:
+        message (dict): JSON-serializable message.
+
+    Returns:
+        bytes: The framed message.
+    """
+    body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(len(body)) + body
+
+
+def normalize_state(state):
+    """Returns the game state as it looks after a JSON round trip (tuples become lists)."""
+    return json.loads(json.dumps(state))
+
+
+def diff_state(old, new):
+    """
+    Computes the delta message that turns one game state into another. Walls
+    only accumulate during a game, so they are sent as the list of new walls;
+    any other change (including fewer walls) resends the changed keys whole.
+
+    Args:
+        old (dict): Previous normalized state.
+        new (dict): New normalized state.
+
+    Returns:
+        dict or None: {"set": {key: value}, "walls_added": [...]}, or None if
+        nothing changed.
+    """
+    changed = {key: value for key, value in new.items() if key != "walls" and old.get(key) != value}
+    delta = {"set": changed, "walls_added": []}
+
+    old_walls = {tuple(wall) for wall in old.get("walls", [])}
+    new_walls = {tuple(wall) for wall in new.get("walls", [])}
+    if not old_walls <= new_walls:
+        changed["walls"] = new.get("walls", [])
+    else:
+        delta["walls_added"] = [wall for wall in new.get("walls", []) if tuple(wall) not in old_walls]
+
+    if not changed and not delta["walls_added"]:
+        return None
+    return delta
+
+
+def apply_delta(state, delta):
+    """
+    Applies a delta message from diff_state to a state in place.
+
+    Args:
+        state (dict): State to update.
+        delta (dict): Delta message.
+    """
+    state.update(delta.get("set", {}))
+    if delta.get("walls_added"):
+        state["walls"] = state.get("walls", []) + delta["walls_added"]
+
+
+class StatePublisher:
+    """
+    Game side of the state channel. Listens on a Unix domain socket and pushes
+    every game state change to the connected subscribers (the GUI) as a
+    length-prefixed JSON delta. A subscriber that connects late first
+    receives a full snapshot.
+
+    Attributes:
+        address (str): Path of the Unix domain socket.
+        sequence (int): Number of the last published message.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS):
+        """
+        Binds the socket (replacing a stale one) and starts accepting subscribers.
+
+        Args:
+            address (str): Path of the Unix domain socket.
+        """
+        self.address = address
+        self.sequence = 0
+        self.state = None
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+        if os.path.exists(address):
+            os.remove(address)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(address)
+        self.server.listen()
+        self.running = True
+        self.thread = threading.Thread(target=self.accept_loop, daemon=True)
+        self.thread.start()
+
+    def accept_loop(self):
+        """Accepts subscribers and sends each of them the current snapshot."""
+        while self.running:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                break  # Socket closed
+            with self.lock:
+                if self.state is not None:
+                    message = {"type": "snapshot", "seq": self.sequence, "state": self.state}
+                    if not self.send(connection, encode_message(message)):
+                        continue
+                self.subscribers.append(connection)
+            logger.debug("GUI connected to the state channel.")
+
+    def send(self, connection, data):
+        """Sends framed data to one subscriber, closing it if it went away. Returns success."""
+        try:
+            connection.sendall(data)
+            return True
+        except OSError:
+            connection.close()
+            return False
+
+    def publish(self, state):
+        """
+        Pushes a game state to every subscriber as a delta against the last
+        published state (a snapshot for the first one).
+
+        Args:
+            state (dict): Game state, as built by QuoridorBoard.update_gui_game_state.
+        """
+        state = normalize_state(state)
+        with self.lock:
+            if self.state is None:
+                message = {"type": "snapshot", "state": state}
+            else:
+                delta = diff_state(self.state, state)
+                if delta is None:
+                    return
+                message = dict(delta, type="delta")
+            self.state = state
+            self.sequence += 1
+            message["seq"] = self.sequence
+            data = encode_message(message)
+            self.subscribers = [connection for connection in self.subscribers if self.send(connection, data)]
+
+    def close(self):
+        """Disconnects the subscribers and removes the socket."""
+        self.running = False
+        self.server.close()
+        with self.lock:
+            for connection in self.subscribers:
+                connection.close()
+            self.subscribers = []
+        if os.path.exists(self.address):
+            os.remove(self.address)
+
+
+class StateSubscriber:
+    """
+    GUI side of the state channel. Connects to the game's socket (again after
+    the game restarts) and keeps the latest game state up to date from the
+    pushed snapshots and deltas.
+
+    Attributes:
+        address (str): Path of the Unix domain socket.
+        state (dict or None): Latest game state, None before the first snapshot.
+        sequence (int): Number of the last applied message.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS):
+        """
+        Creates the subscriber; the connection is opened lazily by receive.
+
+        Args:
+            address (str): Path of the Unix domain socket.
+        """
+        self.address = address
+        self.connection = None
+        self.buffer = b""
+        self.state = None
+        self.sequence = 0
+
+    def connect(self):
+        """Tries to connect to the game. Returns True if connected."""
+        if self.connection is not None:
+            return True
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(self.address)
+        except OSError:
+            connection.close()
+            return False
+        self.connection = connection
+        self.buffer = b""
+        return True
+
+    def disconnect(self):
+        """Closes the connection; the last state is kept until a new snapshot arrives."""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def fileno(self):
+        """Returns the socket's file descriptor (for select), or -1 when disconnected."""
+        return self.connection.fileno() if self.connection is not None else -1
+
+    def receive(self, timeout=0.0):
+        """
+        Waits up to timeout seconds for state messages and applies every
+        complete one received.
+
+        Args:
+            timeout (float): Seconds to wait for data (0 to only poll).
+
+        Returns:
+            bool: True if the state changed.
+        """
+        if not self.connect():
+            time.sleep(timeout)  # Game not running (yet), try again on the next call
+            return False
+
+        readable, _, _ = select.select([self.connection], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            data = self.connection.recv(65536)
+        except OSError:
+            data = b""
+        if not data:
+            self.disconnect()  # The game closed the channel
+            return False
+
+        self.buffer += data
+        changed = False
+        while len(self.buffer) >= HEADER.size:
+            (length,) = HEADER.unpack_from(self.buffer)
+            if len(self.buffer) < HEADER.size + length:
+                break  # Partial message, wait for the rest
+            body = self.buffer[HEADER.size:HEADER.size + length]
+            self.buffer = self.buffer[HEADER.size + length:]
+            changed |= self.apply(json.loads(body))
+        return changed
+
+    def apply(self, message):
+        """Applies one snapshot or delta message. Returns True if the state changed."""
+        if message["type"] == "snapshot":
+            self.state = message["state"]
+        elif self.state is not None and message["seq"] == self.sequence + 1:
+            apply_delta(self.state, message)
+        else:
+            # Missed a message: reconnect to get a fresh snapshot
+            self.disconnect()
+            return False
+        self.sequence = message["seq"]
+        return True
+
+    def close(self):
+        """Closes the connection."""
+        self.disconnect()
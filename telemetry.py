@@ -0,0 +1,138 @@
+import argparse
+import json
+import logging
+import sys
+import time
+
+# Logger shared by the board, the engines and the game loop
+logger = logging.getLogger("quoridor")
+
+# True when debug messages are emitted. Hot paths test this flag before building
+# a message, so disabled debug logging costs one attribute lookup and no formatting.
+# Kept in sync with the logger by set_log_level.
+DEBUG = False
+
+# Record fields that identify a move rather than measure it, left out of the means
+ID_FIELDS = ("timestamp", "player", "ply")
+
+
+def set_log_level(level):
+    """
+    Sets the level of the quoridor logger and updates the DEBUG gate.
+
+    Args:
+        level (int or str): Logging level, e.g. logging.INFO or "DEBUG".
+    """
+    global DEBUG
+    logger.setLevel(level)
+    DEBUG = logger.isEnabledFor(logging.DEBUG)
+
+
+def configure_logging(level="INFO", stream=None):
+    """
+    Sends the quoridor log messages to a stream as plain text lines, the way
+    the game printed them before, and sets the level.
+
+    Args:
+        level (int or str): Logging level; "INFO" shows the moves, "DEBUG" the search details.
+        stream (optional): Output stream; defaults to sys.stdout.
+    """
+    handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.handlers = [handler]
+    logger.propagate = False
+    set_log_level(level)
+
+
+class TelemetryLog:
+    """
+    Appends one JSON object per line to a file, so per-move search records of
+    many games can be concatenated and aggregated later (see summarize).
+
+    Attributes:
+        path (str): File the records are appended to.
+        records (int): Records written by this instance.
+    """
+
+    def __init__(self, path):
+        """
+        Opens the telemetry file for appending.
+
+        Args:
+            path (str): File to append the records to.
+        """
+        self.path = path
+        self.records = 0
+        self.file = open(path, "a")
+
+    def write(self, record):
+        """
+        Appends a record, stamped with the current time.
+
+        Args:
+            record (dict): JSON-serializable record.
+        """
+        record = dict(record, timestamp=time.time())
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.file.flush()
+        self.records += 1
+
+    def close(self):
+        """Closes the file."""
+        self.file.close()
+
+
+def load_records(paths):
+    """
+    Reads the telemetry records of one or more JSON-lines files. Blank and
+    truncated lines (e.g. from an interrupted game) are skipped.
+
+    Args:
+        paths (list): Files to read.
+
+    Returns:
+        list: The records, in file order.
+    """
+    records = []
+    for path in paths:
+        with open(path) as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return records
+
+
+def summarize(records):
+    """
+    Aggregates telemetry records per engine.
+
+    Args:
+        records (list): Records as written by TelemetryLog.
+
+    Returns:
+        dict: Per engine, the move count and the mean of every numeric field,
+        plus the total nodes per second.
+    """
+    summary = {}
+    for record in records:
+        engine = summary.setdefault(record.get("engine", "unknown"), {"moves": 0, "totals": {}})
+        engine["moves"] += 1
+        for field, value in record.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and field not in ID_FIELDS:
+                engine["totals"][field] = engine["totals"].get(field, 0) + value
+
+    for engine in summary.values():
+        totals = engine.pop("totals")
+        engine["mean"] = {field: total / engine["moves"] for field, total in sorted(totals.items())}
+        wall_time = totals.get("wall_time", 0)
+        engine["nodes_per_second"] = totals.get("nodes", 0) / wall_time if wall_time else 0.0
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate per-move search telemetry")
+    parser.add_argument("files", nargs="+", help="JSON-lines telemetry files")
+    args = parser.parse_args()
+    print(json.dumps(summarize(load_records(args.files)), indent=2))
@@ -0,0 +1,96 @@
+import random
+import unittest
+from collections import deque
+
+from quoridor_board import QuoridorBoard, UNREACHABLE
+
+
+def pawns_reach_goal_rows(size, walls, cells):
+    """
+    Plain full search: True if player 1's pawn can reach the bottom row and
+    player 2's the top row with the given fences, (x, y, orientation) triples.
+    """
+    edges = set()
+    for x, y, orientation in walls:
+        if orientation == "H":
+            pairs = (((x, y), (x, y + 1)), ((x + 1, y), (x + 1, y + 1)))
+        else:
+            pairs = (((x, y), (x + 1, y)), ((x, y + 1), (x + 1, y + 1)))
+        for a, b in pairs:
+            edges.add((a, b))
+            edges.add((b, a))
+
+    for cell, goal_y in ((cells[1], size - 1), (cells[2], 0)):
+        start = (cell % size, cell // size)
+        seen = {start}
+        queue = deque(seen)
+        while queue:
+            x, y = queue.popleft()
+            if y == goal_y:
+                break
+            for nx, ny in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+                if 0 <= nx < size and 0 <= ny < size and (nx, ny) not in seen and ((x, y), (nx, ny)) not in edges:
+                    seen.add((nx, ny))
+                    queue.append((nx, ny))
+        else:
+            return False
+    return True
+
+
+def random_board(rng, size, fence_attempts):
+    """
+    Returns a board with random legal fences, placed through make_fence, and
+    the pawns moved to random cells from which they still reach their goal row.
+    """
+    board = QuoridorBoard(size=size, fences=(size - 1) * (size - 1))
+    for _ in range(fence_attempts):
+        board.make_fence(rng.randrange(size - 1), rng.randrange(size - 1), rng.choice("HV"), 1)
+    cell1 = rng.choice([cell for cell in range(size * size) if board.distances[1][cell] < UNREACHABLE])
+    cell2 = rng.choice([cell for cell in range(size * size)
+                        if cell != cell1 and board.distances[2][cell] < UNREACHABLE])
+    board.make_cell_move(1, cell1)
+    board.make_cell_move(2, cell2)
+    return board
+
+
+class FenceLegalityTest(unittest.TestCase):
+    """is_fence_legal (contact counts, bounded search) against make_fence and a full search."""
+
+    def test_is_fence_legal_matches_make_fence(self):
+        rng = random.Random(0)
+        for _ in range(1200):  # About 75k checks
+            size = rng.choice((4, 5, 7, 9))
+            board = random_board(rng, size, rng.randint(0, 3 * size))
+            key, history_length = board.hash, len(board.history)
+            for slot in range(2 * board.tables.slots):
+                legal = board.is_fence_legal(slot)
+                placed = board.make_fence(*board.tables.slot_to_fence(slot), 1)
+                if placed:
+                    board.unmake()
+                self.assertEqual(legal, placed, f"{size}x{size}, slot {slot}, fences {board.state.walls()}")
+            self.assertEqual((board.hash, len(board.history)), (key, history_length))
+
+    def test_is_fence_legal_matches_a_full_search(self):
+        rng = random.Random(1)
+        for _ in range(150):
+            size = rng.choice((3, 5, 9))
+            board = random_board(rng, size, rng.randint(size, 4 * size))
+            walls = board.state.walls()
+            for slot in range(2 * board.tables.slots):
+                if board.fence_mask & board.tables.fence_conflicts[slot]:
+                    continue  # Overlaps are a table lookup; the search part is what is checked here
+                expected = pawns_reach_goal_rows(size, walls + [board.tables.slot_to_fence(slot)], board.pawn_cells)
+                self.assertEqual(board.is_fence_legal(slot), expected,
+                                 f"{size}x{size}, slot {slot}, fences {walls}")
+
+    def test_legality_check_counters(self):
+        rng = random.Random(2)
+        board = random_board(rng, 9, 40)
+        board.legal_fence_slots()
+        checks = board.legality_checks
+        self.assertGreater(checks["contact"], 0)
+        self.assertGreater(checks["local"] + checks["full"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import random
+import unittest
+
+from quoridor_board import QuoridorBoard
+
+# (dx, dy) of the four orthogonal steps
+DIRECTIONS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+
+def random_board(rng, size, fence_attempts):
+    """Returns a board of the given size with random legal fences, placed through make_fence."""
+    board = QuoridorBoard(size=size, fences=(size - 1) * (size - 1))
+    for _ in range(fence_attempts):
+        board.make_fence(rng.randrange(size - 1), rng.randrange(size - 1), rng.choice("HV"), 1)
+    return board
+
+
+def blocked_edges(board):
+    """
+    Returns the cell pairs separated by a fence, worked out from the fence
+    geometry alone: a horizontal fence at (x, y) lies under cells (x, y) and
+    (x + 1, y), a vertical one right of cells (x, y) and (x, y + 1).
+    """
+    edges = set()
+    for x, y, orientation in board.state.walls():
+        if orientation == "H":
+            pairs = (((x, y), (x, y + 1)), ((x + 1, y), (x + 1, y + 1)))
+        else:
+            pairs = (((x, y), (x + 1, y)), ((x, y + 1), (x + 1, y + 1)))
+        for a, b in pairs:
+            edges.add((a, b))
+            edges.add((b, a))
+    return edges
+
+
+def reference_targets(size, edges, own, other):
+    """
+    The pawn moves of the rules, written out directly: a step to a free
+    neighbour; over an adjacent opponent, a straight jump, or a diagonal
+    step beside the opponent when a fence or the border is behind it.
+    """
+    def inside(x, y):
+        return 0 <= x < size and 0 <= y < size
+
+    targets = set()
+    x, y = own
+    for dx, dy in DIRECTIONS:
+        step = (x + dx, y + dy)
+        if not inside(*step) or (own, step) in edges:
+            continue
+        if step != other:
+            targets.add(step)
+            continue
+        beyond = (step[0] + dx, step[1] + dy)
+        if inside(*beyond) and (step, beyond) not in edges:
+            targets.add(beyond)
+            continue
+        for sx, sy in ((dy, dx), (-dy, -dx)):  # The two perpendicular directions
+            side = (step[0] + sx, step[1] + sy)
+            if inside(*side) and (step, side) not in edges:
+                targets.add(side)
+    return targets
+
+
+class PawnMoveTest(unittest.TestCase):
+    """The table-driven move generator against the rules on random positions."""
+
+    def test_pawn_targets_match_the_rules(self):
+        rng = random.Random(0)
+        for _ in range(800):
+            size = rng.choice((3, 5, 7, 9))
+            board = random_board(rng, size, rng.randint(0, 2 * size))
+            edges = blocked_edges(board)
+            positions = board.tables.cell_positions
+            for _ in range(20):
+                cell1, cell2 = rng.sample(range(size * size), 2)
+                board.pawn_cells = {1: cell1, 2: cell2}
+                for player, own, other in ((1, cell1, cell2), (2, cell2, cell1)):
+                    expected = reference_targets(size, edges, positions[own], positions[other])
+                    targets = board.pawn_targets(player)
+                    self.assertEqual(len(targets), len(set(targets)))
+                    self.assertEqual({positions[cell] for cell in targets}, expected,
+                                     f"{size}x{size}, pawn {positions[own]}, opponent {positions[other]}, "
+                                     f"fences {board.state.walls()}")
+
+    def test_validation_agrees_with_the_generator(self):
+        rng = random.Random(1)
+        for _ in range(100):
+            size = rng.choice((3, 5, 9))
+            board = random_board(rng, size, rng.randint(0, 2 * size))
+            board.pawn_cells = dict(zip((1, 2), rng.sample(range(size * size), 2)))
+            for player in (1, 2):
+                targets = set(board.pawn_targets(player))
+                for cell, position in enumerate(board.tables.cell_positions):
+                    self.assertEqual(board.is_valid_pawn_move(player, position), cell in targets)
+                self.assertFalse(board.is_valid_pawn_move(player, (-1, 0)))
+                self.assertFalse(board.is_valid_pawn_move(player, (size, size - 1)))
+
+
+if __name__ == "__main__":
+    unittest.main()
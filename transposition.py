@@ -0,0 +1,162 @@
+class TranspositionTable:
+    """
+    Fixed-size transposition table for the AI search, indexed by the board's
+    Zobrist hash.
+
+    Entries live in flat typed views over one buffer, so the memory used is
+    fixed when the table is created and the buffer can be shared between
+    processes (see parallel_search). Each slot holds the 64-bit key, the score
+    and a packed word with the search depth, bound type, best move and search
+    age. The key is stored XOR-ed with the other two words, so an entry torn by
+    concurrent writers fails the key check instead of returning mixed data.
+    A stored entry is only replaced by a search of at least the same depth,
+    unless it was written during an older search (depth-preferred replacement).
+
+    Attributes:
+        slots (int): Number of entries (a power of two).
+        hits (int): Probes that found an entry for the same position.
+        misses (int): Probes that found nothing for the position.
+        collisions (int): Misses where the slot held a different position.
+        stores (int): Entries written.
+        rejected (int): Writes skipped because the stored entry was deeper.
+    """
+
+    EXACT = 1
+    LOWER = 2  # Score is a lower bound (fail high)
+    UPPER = 3  # Score is an upper bound (fail low)
+
+    ENTRY_BYTES = 24  # 8 key + 8 score + 8 packed depth/bound/move/age
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, buffer=None):
+        """
+        Allocates the table.
+
+        Args:
+            max_bytes (int): Memory cap for the entries. The number of slots is
+                the largest power of two that fits in it.
+            buffer (optional): Writable buffer of at least buffer_size(max_bytes)
+                bytes to keep the entries in, e.g. SharedMemory.buf. A private
+                buffer is allocated if omitted.
+        """
+        slots = self.slot_count(max_bytes)
+        self.slots = slots
+        self.mask = slots - 1
+        self.buffer = memoryview(bytearray(slots * self.ENTRY_BYTES) if buffer is None else buffer)
+        self.buffer = self.buffer[:slots * self.ENTRY_BYTES]
+        self.keys = self.buffer[:8 * slots].cast('Q')
+        self.scores = self.buffer[8 * slots:16 * slots].cast('d')
+        self.score_bits = self.buffer[8 * slots:16 * slots].cast('Q')
+        self.meta = self.buffer[16 * slots:].cast('Q')
+        self.age = 1
+        self.reset_stats()
+
+    @classmethod
+    def slot_count(cls, max_bytes: int) -> int:
+        """Returns the number of slots of a table capped at max_bytes."""
+        slots = 1
+        while slots * 2 * cls.ENTRY_BYTES <= max_bytes:
+            slots *= 2
+        return slots
+
+    @classmethod
+    def buffer_size(cls, max_bytes: int) -> int:
+        """Returns the buffer size in bytes needed by a table capped at max_bytes."""
+        return cls.slot_count(max_bytes) * cls.ENTRY_BYTES
+
+    def release(self):
+        """Releases the views on the buffer, so a shared memory block can be closed."""
+        for view in (self.keys, self.scores, self.score_bits, self.meta, self.buffer):
+            view.release()
+
+    def reset_stats(self):
+        """Resets the hit, miss and collision counters."""
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.rejected = 0
+
+    def new_search(self):
+        """Marks the start of a new search, so entries from older searches can be replaced."""
+        self.age = self.age % 255 + 1
+
+    def clear(self):
+        """Removes every entry and resets the counters."""
+        self.buffer[:] = bytes(len(self.buffer))
+        self.reset_stats()
+
+    def probe(self, key: int):
+        """
+        Looks up a position.
+
+        Args:
+            key (int): Zobrist hash of the position.
+
+        Returns:
+            tuple or None: (depth, score, bound, move) where move is an encoded
+            action or None, or None if the position is not stored.
+        """
+        index = key & self.mask
+        meta = self.meta[index]
+        score = self.scores[index]
+        if meta and self.keys[index] ^ meta ^ self.score_bits[index] == key:
+            self.hits += 1
+            move = (meta >> 16) & 0xFFFF
+            return meta & 0xFF, score, (meta >> 8) & 0xFF, move - 1 if move else None
+
+        self.misses += 1
+        if meta:
+            self.collisions += 1
+        return None
+
+    def store(self, key: int, depth: int, score: float, bound: int, move: int = None):
+        """
+        Stores a search result, following the depth-preferred replacement policy.
+
+        Args:
+            key (int): Zobrist hash of the position.
+            depth (int): Remaining search depth the score was computed with.
+            score (float): Score from the point of view of the side to move.
+            bound (int): EXACT, LOWER or UPPER.
+            move (int, optional): Encoded best action (see QuoridorBoard.encode_action).
+        """
+        index = key & self.mask
+        meta = self.meta[index]
+        if meta and (meta >> 32) == self.age and depth < (meta & 0xFF):
+            self.rejected += 1
+            return
+
+        if move is None and meta and self.keys[index] ^ meta ^ self.score_bits[index] == key:
+            move = ((meta >> 16) & 0xFFFF) - 1  # Keep the known best move
+            if move < 0:
+                move = None
+
+        meta = (self.age << 32) | ((0 if move is None else move + 1) << 16) | (bound << 8) | depth
+        self.scores[index] = score
+        self.meta[index] = meta
+        self.keys[index] = key ^ meta ^ self.score_bits[index]
+        self.stores += 1
+
+    def used(self) -> int:
+        """Returns the number of occupied slots."""
+        return self.slots - self.meta.tolist().count(0)
+
+    def stats(self) -> dict:
+        """
+        Returns the table counters, so the table can be sized per deployment.
+
+        Returns:
+            dict: Size, occupancy and hit/miss/collision counters.
+        """
+        probes = self.hits + self.misses
+        return {
+            "slots": self.slots,
+            "bytes": self.slots * self.ENTRY_BYTES,
+            "used": self.used(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "rejected": self.rejected,
+            "hit_rate": self.hits / probes if probes else 0.0,
+        }